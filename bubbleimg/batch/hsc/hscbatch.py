@@ -5,6 +5,8 @@ import numpy as np
 
 from ..batch import Batch
 from ... import imgdownload
+from ... import obsobj
+from ...imgdownload.hsc import hscimgloader
 
 
 class hscBatch(Batch):
@@ -13,7 +15,7 @@ class hscBatch(Batch):
 		super(self.__class__, self).__init__(**kwargs)
 
 
-	def build(self, func_build=None, overwrite=False, **kwargs):
+	def build(self, func_build=None, overwrite=False, bulk=False, n_per_request=1000, **kwargs):
 		"""
 		build the batch
 
@@ -22,6 +24,9 @@ class hscBatch(Batch):
 		func_build=self._func_build (funcion):
 			a funciton that takes (ra, dec, dir_parent, overwrite, **kwargs) as param and returns status (bool)
 		overwrite=False (bool)
+		bulk=False (bool):
+			if True, the stamps and psfs of all the objects are first downloaded with bulk requests, see make_files_bulk(), and the objects are then built without downloading them again. 
+		n_per_request=1000 (int): maximum number of files per bulk request
 		**kwargs:
 			 to be entered into func_build() in the kwargs part, e.g., 'environment'='iaa'. 
 
@@ -33,16 +38,58 @@ class hscBatch(Batch):
 		if func_build is None:
 			func_build = self._func_build
 
+		if bulk:
+			kwargs_loader = {key: kwargs[key] for key in kwargs if key != 'processes'}
+			self.make_files_bulk(overwrite=overwrite, n_per_request=n_per_request, **kwargs_loader)
+			kwargs['bulk'] = True
+
 		status = super(self.__class__, self)._batch__build_core(func_build, overwrite=overwrite, **kwargs)
 		return status
 
 
-	def _func_build(self, obj, overwrite=False, **kwargs):
+	def make_files_bulk(self, overwrite=False, n_per_request=1000, **kwargs):
+		"""
+		download the stamps and psfs of all the objects in the list that are not yet built into their directories under dir_good with bulk requests, see hscimgloader.make_stamps_bulk(). Objects not identified in hsc are skipped. 
+
+		Params
+		------
+		overwrite=False (bool)
+		n_per_request=1000 (int): maximum number of files per bulk request
+		**kwargs:
+			to be entered into hscimgLoader(), e.g., username, password, img_width
+
+		Return 
+		------
+		status (bool): True if the stamps and psfs of all the hsc objects are made
+		"""
+		self.mkdir_batch()
+
+		loaders = []
+		for row in self.list:
+			if overwrite or ((row['obj_name'] not in self.list_good['obj_name']) and (row['obj_name'] not in self.list_except['obj_name'])):
+				obj = obsobj.obsObj(ra=row['ra'], dec=row['dec'], dir_parent=self.dir_good, obj_naming_sys=self.obj_naming_sys, overwrite=overwrite)
+				obj.survey = self.survey
+				L = imgdownload.hscimgLoader(obj=obj, **kwargs)
+
+				if L.status:
+					loaders += [L]
+
+		statuss = 	[
+					hscimgloader.make_stamps_bulk(loaders, overwrite=overwrite, n_per_request=n_per_request),
+					hscimgloader.make_psfs_bulk(loaders, overwrite=overwrite, n_per_request=n_per_request),
+					]
+
+		return all(all(status) for status in statuss)
+
+
+	def _func_build(self, obj, overwrite=False, bulk=False, **kwargs):
 		"""
 		Params
 		------
 		obj
 		overwrite=False
+		bulk=False:
+			if True, the stamps and psfs made by make_files_bulk() are not overwritten
 
 		**kwargs:
 			environment='iaa'
@@ -60,8 +107,8 @@ class hscBatch(Batch):
 
 		if L.status:
 			statuss = 	[ 
-						L.make_stamps(overwrite=overwrite), 
-						L.make_psfs(overwrite=overwrite), 
+						L.make_stamps(overwrite=overwrite and not bulk), 
+						L.make_psfs(overwrite=overwrite and not bulk), 
 						L.plot_colorimg(bands=humvi_bands, img_type='stamp', overwrite=overwrite),
 						L.add_obj_sdss(), 
 						L.obj.sdss.make_spec(overwrite=overwrite),
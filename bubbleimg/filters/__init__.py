@@ -10,10 +10,18 @@ from bubbleimg.filters import getzrange_line
 from bubbleimg.filters import getllambda
 from bubbleimg.filters import surveysetup
 from bubbleimg.filters import inttools
+from bubbleimg.filters import filterbank
+from bubbleimg.filters import synphot
+from bubbleimg.filters import linetranstable
 
 from bubbleimg.filters.filtertools import getFilterResponseFunc
 from bubbleimg.filters.filtertools import getNormTransFunc
+from bubbleimg.filters.filtertools import getNormTransBank
 from bubbleimg.filters.filtertools import getFilterCentroids
 from bubbleimg.filters.filtertools import getlocalpath
 from bubbleimg.filters.filtertools import accessFile
-from bubbleimg.filters.getllambda import getllambda
\ No newline at end of file
+from bubbleimg.filters.filtertools import assignBandConfigs
+from bubbleimg.filters.filterbank import FilterBank
+from bubbleimg.filters.linetranstable import LineTransTable
+from bubbleimg.filters.getllambda import getllambda
+from bubbleimg.filters.getllambda import getllambdas
\ No newline at end of file
@@ -0,0 +1,113 @@
+# filterbank.py
+
+"""
+vectorized evaluation of the normalized filter transmission functions of a survey
+"""
+
+import numpy as np
+
+from . import filtertools
+from .surveysetup import surveybands
+
+
+class FilterBank(object):
+
+    def __init__(self, survey='sdss', bands=None):
+        """
+        FilterBank, the normalized filter transmission functions of the bands of a survey, see filtertools.getNormTransBank().
+
+        The transmission functions are evaluated by linear interpolation (np.interp) on their precomputed sorted wavelength grids, such that the transmissions at many wavelengths in all the bands are obtained in one call without constructing interpolating objects.
+
+        Params
+        ------
+        survey='sdss' (str)
+        bands=None (list of str)
+            if not provided, use all the bands of the survey
+
+        Attributes
+        ----------
+        survey (str)
+        bands (list of str)
+        """
+        self.survey = survey
+
+        if bands is None:
+            self.bands = list(surveybands[survey])
+        else:
+            self.bands = list(bands)
+
+        bank = filtertools.getNormTransBank(survey=survey)
+
+        self._funcs = {}
+        for band in self.bands:
+            if band not in bank:
+                raise ValueError("[filterbank] band {} not recognized for survey {}".format(band, survey))
+
+            self._funcs[band] = bank[band]
+
+
+    def get_norm_trans_func(self, band):
+        """
+        return the normalized transmission function of the band and its wavelength coordinate
+
+        Return
+        ------
+        trans (array)
+        ws (array) [AA]
+        """
+        return self._funcs[band]
+
+
+    def get_norm_trans(self, ws, bands=None, bounds_error=False):
+        """
+        return the normalized transmission functions evaluated at wavelengths ws in each of the bands. The transmission is zero outside of the filter and is non-negative, see filtertools.getNormTrans().
+
+        Params
+        ------
+        ws (float or array): wavelengths [AA]
+        bands=None (list of str)
+            if not provided, use self.bands
+        bounds_error=False (bool)
+            if True, raise ValueError when any of the wavelengths is outside of the range of the transmission function
+
+        Return
+        ------
+        trans (array of shape (n_bands,) + np.shape(ws))
+        """
+        if bands is None:
+            bands = self.bands
+
+        ws = np.asarray(ws, dtype='float')
+        out = np.empty((len(bands), ) + ws.shape)
+
+        for i, band in enumerate(bands):
+            trans_band, ws_band = self._funcs[band]
+
+            if bounds_error and np.any((ws < ws_band[0]) | (ws > ws_band[-1])):
+                raise ValueError("[filterbank] wavelength outside of the range of the transmission function of band {}".format(band))
+
+            out[i] = np.interp(ws, ws_band, trans_band, left=0., right=0.)
+
+        np.clip(out, 0., None, out=out)
+        return out
+
+
+    def get_norm_trans_max(self, bands=None):
+        """ return the peak values of the normalized transmission functions of the bands as an array """
+        if bands is None:
+            bands = self.bands
+
+        return np.array([self._funcs[band][0].max() for band in bands])
+
+
+
+# filter banks of each survey that are shared within the process, see get_filterbank(), dropped by filtertools.writeNormTransBank()
+_filterbanks = {}
+
+
+def get_filterbank(survey='sdss'):
+    """ return the FilterBank of all the bands of a survey, which is constructed once per process """
+    if survey not in _filterbanks:
+        _filterbanks[survey] = FilterBank(survey=survey)
+
+    return _filterbanks[survey]
@@ -16,6 +16,7 @@ from scipy.interpolate import interp1d
 from scipy.optimize import fsolve
 
 import glob
+import re
 
 from .surveysetup import surveybands
 from .surveysetup import waverange
@@ -274,18 +275,14 @@ def get_fn_FilterBoundaries(threshold):
 
 def getFilterBoundaries(threshold=0.6, band='u', survey='sdss', withunit=True):
     """
-    Return the filter boundary of a band in a survey given threshold
+    Return the filter boundary of a band in a survey given threshold. The boundaries of the survey are read from file once per process, see getFilterBoundariesBank(). 
     """
-    fn = get_fn_FilterBoundaries(threshold)
+    bank = getFilterBoundariesBank(threshold=threshold, survey=survey)
 
-    if not isFile(filename=fn, survey=survey):
-        writeFilterBoundaries(threshold=threshold, toplot=False, survey=survey)
+    if band not in bank:
+        raise ValueError("[filtertools] band {} not recognized for survey {}".format(band, survey))
 
-    tab = accessFile(filename=fn, survey=survey, joinsurveys=False)
-
-    i = [tab['band']==band]
-    w1 = tab['w1'][i][0]
-    w2 = tab['w2'][i][0]
+    w1, w2 = bank[band]
 
     if withunit: 
         unit = u.AA
@@ -295,6 +292,29 @@ def getFilterBoundaries(threshold=0.6, band='u', survey='sdss', withunit=True):
     return w1*unit, w2*unit
 
 
+# filter boundaries of each survey and threshold, loaded once per process, see getFilterBoundariesBank()
+_filterboundaries_banks = {}
+
+
+def getFilterBoundariesBank(threshold=0.6, survey='sdss'):
+    """
+    return the filter boundaries of all the bands of a survey as a dictionary {band: (w1, w2)}, which is read from filterboundary file (written if not exist) on first access and kept in memory for the rest of the process
+    """
+    key = (survey, threshold)
+
+    if key not in _filterboundaries_banks:
+        fn = get_fn_FilterBoundaries(threshold)
+
+        if not isFile(filename=fn, survey=survey):
+            writeFilterBoundaries(threshold=threshold, toplot=False, survey=survey)
+
+        tab = accessFile(filename=fn, survey=survey, joinsurveys=False)
+
+        _filterboundaries_banks[key] = {str(band): (w1, w2) for band, w1, w2 in zip(tab['band'], tab['w1'], tab['w2'])}
+
+    return _filterboundaries_banks[key]
+
+
 def accessTabZranges(lineconfig = 'wOIII_nHaNIISII', survey='sdss', joinsurveys=True):
     """
     access zranges table
@@ -309,7 +329,7 @@ def accessTabZranges(lineconfig = 'wOIII_nHaNIISII', survey='sdss', joinsurveys=
 
     if lineconfig !='all':
         filenames = ['zranges_band_'+lineconfig+'.txt']
-        tab = accessFile(filename=f, survey=survey, joinsurveys=joinsurveys)
+        tab = accessFile(filename=filenames[0], survey=survey, joinsurveys=joinsurveys)
 
     else:
         dir_survey = getlocalpath()+survey+'/'
@@ -324,6 +344,129 @@ def accessTabZranges(lineconfig = 'wOIII_nHaNIISII', survey='sdss', joinsurveys=
     return tab
 
 
+def assignBandConfigs(zs, lineconfig='wOIII0.6_nHaNIISII0.2', survey='sdss', joinsurveys=True):
+    """
+    assign to each of the redshifts the band configuration (bandline, bandconti) of the zranges table whose redshift range contains it, see accessTabZranges(). 
+
+    The boundaries of the redshift ranges are sorted into elementary segments, the best configuration is decided once per segment, and the redshifts are located in the segments with np.searchsorted, such that large catalogs are assigned in one call. Where several ranges contain the same redshift, the one with the largest margin to its boundaries is preferred, and then the one listed first. 
+
+    PARAMS
+    ----------
+    zs (float or array): redshifts
+    lineconfig = 'wOIII0.6_nHaNIISII0.2'
+        if 'all' then all the line configs available in the survey are considered
+    survey = 'sdss'
+    joinsurveys=True
+
+    RETURN
+    ----------
+    tab (astropy table): 
+        with one row per redshift and columns z, lineconfig, bandline, bandconti, z0, z1, inzrange, frac_wline, frac_nline. Redshifts that are not in any of the ranges have inzrange False, empty strings and nan z0, z1, frac_wline, frac_nline. The columns can be added to a batch list and passed as listargs to Batch.iterlist(). 
+
+        frac_wline: the lowest transmission of the lines that should be in bandline (e.g., OIII), in fraction of the peak of bandline
+        frac_nline: the highest transmission of the lines that should not be in bandconti (e.g., HaNIISII), in fraction of the peak of bandconti
+        see calcLineFractions()
+    """
+    zs = np.atleast_1d(np.asarray(zs, dtype='float'))
+
+    if lineconfig != 'all':
+        lineconfigs = [lineconfig]
+    else:
+        filenames = sorted(glob.glob(getlocalpath()+survey+'/zranges_band_*.txt'))
+        lineconfigs = [os.path.basename(f)[len('zranges_band_'):-len('.txt')] for f in filenames]
+
+    tabs = []
+    for lc in lineconfigs:
+        tab = accessTabZranges(lineconfig=lc, survey=survey, joinsurveys=joinsurveys)
+        tab['lineconfig'] = lc
+        tabs += [tab[['lineconfig', 'bandline', 'bandconti', 'z0', 'z1']]]
+    tab = at.vstack(tabs)
+
+    z0 = np.array(tab['z0']).astype('float')
+    z1 = np.array(tab['z1']).astype('float')
+    isvalid = np.isfinite(z0) & np.isfinite(z1) & (z1 > z0)
+
+    # best range of each of the elementary segments between sorted boundaries. The margins are linear and do not cross within a segment when the segments are also split at the points where margins of two ranges are equal, (z0_i + z1_j)/2. 
+    z0_valid, z1_valid = z0[isvalid], z1[isvalid]
+    edges = np.unique(np.concatenate([z0_valid, z1_valid, ((z0_valid[:, np.newaxis] + z1_valid)/2.).ravel()]))
+    seg0, seg1 = edges[:-1, np.newaxis], edges[1:, np.newaxis]
+    iscovered = isvalid & (z0 <= seg0) & (z1 >= seg1)
+    zmid = (seg0 + seg1)/2.
+    margin = np.where(iscovered, np.minimum(zmid - z0, z1 - zmid), -np.inf)
+    iseg_range = np.where(iscovered.any(axis=1), np.argmax(margin, axis=1), -1)
+    iseg_range = np.append(iseg_range, -1) # for redshifts outside of all the segments
+
+    # locate redshifts in segments
+    iseg = np.searchsorted(edges, zs, side='right') - 1
+    if len(edges) > 0:
+        iseg[zs == edges[-1]] = len(edges) - 2
+        iseg[~((zs >= edges[0]) & (zs <= edges[-1]))] = len(edges) - 1
+    else:
+        iseg[:] = -1
+    irange = iseg_range[iseg]
+
+    # redshifts on a boundary that only belongs to the lower segment
+    isonedge = (irange == -1) & (iseg > 0) & (iseg < len(edges) - 1)
+    isonedge[isonedge] = zs[isonedge] == edges[iseg[isonedge]]
+    irange[isonedge] = iseg_range[iseg[isonedge] - 1]
+
+    # the last entries represent no assignment
+    inzrange = irange >= 0
+    tabout = at.Table()
+    tabout['z'] = zs
+    for col, fill in [('lineconfig', ''), ('bandline', ''), ('bandconti', ''), ('z0', np.nan), ('z1', np.nan)]:
+        values = np.array(tab[col])
+        values = np.append(values, np.array([fill]).astype(values.dtype) if isinstance(fill, str) else fill)
+        tabout[col] = values[irange]
+    tabout['inzrange'] = inzrange
+    tabout['frac_wline'], tabout['frac_nline'] = calcLineFractions(tabout, survey=survey)
+
+    return tabout
+
+
+def calcLineFractions(tab, survey='sdss'):
+    """
+    return the transmission of the lines of the line configurations at the redshifts of the band configurations, see assignBandConfigs(). The transmissions are looked up in linetranstable.LineTransTable once per distinct (lineconfig, bandline, bandconti). 
+
+    PARAMS
+    ----------
+    tab (astropy table): 
+        with columns z, lineconfig, bandline, bandconti, e.g., 'wOIII0.6_nHaNIISII0.2', 'r', 'i'
+    survey = 'sdss'
+
+    RETURN
+    ----------
+    frac_wline (array): the lowest transmission of the wlines in bandline relative to its peak
+    frac_nline (array): the highest transmission of the nlines in bandconti relative to its peak
+        both are nan for rows without band configuration or with line sets not in getzrange_line
+    """
+    from . import getzrange_line
+    from . import linetranstable
+
+    frac_wline = np.full(len(tab), np.nan)
+    frac_nline = np.full(len(tab), np.nan)
+
+    keys = list(zip(tab['lineconfig'], tab['bandline'], tab['bandconti']))
+    for key in set(keys):
+        lineconfig, bandline, bandconti = key
+        m = re.match(r'^w([A-Za-z]+)[\d.]*_n([A-Za-z]+)[\d.]*$', lineconfig)
+
+        if (m is not None) and (m.group(1) in getzrange_line.wlinesets) and (m.group(2) in getzrange_line.nlinesets):
+            sel = np.array([k == key for k in keys])
+            zs = np.array(tab['z'][sel]).astype('float')
+
+            wlines = getzrange_line.wlinesets[m.group(1)]
+            nlines = getzrange_line.nlinesets[m.group(2)]
+
+            ltt = linetranstable.get_linetranstable(wlines, survey=survey)
+            frac_wline[sel] = ltt.get_norm_trans_rel(zs, bands=[bandline])[:, :, 0].min(axis=-1)
+
+            ltt = linetranstable.get_linetranstable(nlines, survey=survey)
+            frac_nline[sel] = ltt.get_norm_trans_rel(zs, bands=[bandconti])[:, :, 0].max(axis=-1)
+
+    return frac_wline, frac_nline
+
+
 def calc_int_response_dlnl(band='r', survey='sdss'):
     """ calculate int{ T(l)  d lnl } """
 
@@ -394,6 +537,8 @@ def writeNormTransFunc(survey='sdss'):
         band2.csv
         ...
     that records the normalized filter transmission function that has int {T{l} dlnl} = 1.
+
+    The binary bank normtrans.npz is rewritten accordingly, see writeNormTransBank(). 
     """
     localpath = getlocalpath()
     dir_out = localpath+survey+'/normtrans/'
@@ -410,9 +555,11 @@ def writeNormTransFunc(survey='sdss'):
 
         tabout.write(fp, format='ascii.csv', overwrite=True)
 
+    writeNormTransBank(survey=survey)
 
-def getNormTransFunc(band='r', survey='sdss'):
-    """ return the normalized filter transmission function that is precalculated and stored in normtrans/ """
+
+def readNormTransFunc(band='r', survey='sdss'):
+    """ read the normalized filter transmission function from normtrans/band.csv, which is written if not exist """
     localpath = getlocalpath()
     fn = localpath+survey+'/normtrans/'+band+'.csv'
 
@@ -427,12 +574,97 @@ def getNormTransFunc(band='r', survey='sdss'):
     return trans, ws
 
 
+def get_fn_NormTransBank():
+    """ return the file name of the binary bank of normalized transmission functions """
+    return 'normtrans.npz'
+
+
+def writeNormTransBank(survey='sdss'):
+    """ 
+    write file normtrans.npz under the survey directory that packs the normalized filter transmission functions of all the bands, as in normtrans/band.csv, into one binary file with arrays 'trans_{band}' and 'ws_{band}'. The functions are sorted by wavelength, as required by np.interp. 
+
+    The in-memory bank and filter bank of the survey are dropped so that they are reloaded on next access. 
+    """
+    from . import filterbank
+
+    localpath = getlocalpath()
+    fileout = localpath+survey+'/'+get_fn_NormTransBank()
+
+    arrays = {}
+    for band in surveybands[survey]:
+        trans, ws = _sort_by_ws(*readNormTransFunc(band=band, survey=survey))
+        arrays['trans_'+band] = trans
+        arrays['ws_'+band] = ws
+
+    np.savez(fileout, **arrays)
+
+    _normtrans_banks.pop(survey, None)
+    filterbank._filterbanks.pop(survey, None)
+
+
+def _sort_by_ws(trans, ws):
+    """ return the transmission function sorted by wavelength if it is not """
+    if np.any(np.diff(ws) < 0):
+        isort = np.argsort(ws, kind='mergesort')
+        trans, ws = trans[isort], ws[isort]
+
+    return trans, ws
+
+
+# normalized transmission functions of each survey, loaded once per process, see getNormTransBank()
+_normtrans_banks = {}
+
+
+def getNormTransBank(survey='sdss'):
+    """ 
+    return the normalized filter transmission functions of all the bands of a survey as a dictionary {band: (trans, ws)}. 
+
+    The bank is read from normtrans.npz (written if not exist) on first access and then kept in memory for the rest of the process, such that subsequent calls are dictionary lookups. The functions are sorted by wavelength. The arrays are shared by all callers (and by forked workers) and are therefore set read-only. 
+
+    Params
+    ------
+    survey='sdss'
+
+    Return
+    ------
+    bank (dict)
+    """
+    if survey not in _normtrans_banks:
+        fn = getlocalpath()+survey+'/'+get_fn_NormTransBank()
+
+        if not os.path.isfile(fn):
+            writeNormTransBank(survey=survey)
+
+        bank = {}
+        with np.load(fn) as data:
+            for band in surveybands[survey]:
+                trans, ws = _sort_by_ws(data['trans_'+band], data['ws_'+band])
+                trans.flags.writeable = False
+                ws.flags.writeable = False
+                bank[band] = (trans, ws)
+
+        _normtrans_banks[survey] = bank
+
+    return _normtrans_banks[survey]
+
+
+def getNormTransFunc(band='r', survey='sdss'):
+    """ return the normalized filter transmission function that is precalculated and stored in normtrans/, see getNormTransBank() """
+    bank = getNormTransBank(survey=survey)
+
+    if band not in bank:
+        raise ValueError("[filtertools] band {} not recognized for survey {}".format(band, survey))
+
+    return bank[band]
+
+
 
 def getNormTrans(l, band='r', survey='sdss', bounds_error=False):
     """ 
     return the value of the normalized transmission function at wavelength l. 
     the function is from getNormTransFunc. 
-    it is linear intrapolated to wavelength
+    it is linear intrapolated to wavelength. 
+    To evaluate many wavelengths or bands at once, see filterbank.FilterBank. 
 
     Params
     ------
@@ -440,11 +672,9 @@ def getNormTrans(l, band='r', survey='sdss', bounds_error=False):
     band='r'
     survey='sdss'
     bounds_error=False
-            see interp1d
             If True, a ValueError is raised any time interpolation is attempted on
-            a value outside of the range of x (where extrapolation is
-            necessary). If False, out of bounds values are assigned `fill_value`.
-            By default, an error is raised unless `fill_value="extrapolate"`.
+            a value outside of the range of the transmission function. If False, 
+            out of bounds values are assigned 0. 
 
 
     Return
@@ -454,6 +684,9 @@ def getNormTrans(l, band='r', survey='sdss', bounds_error=False):
     """
     trans, ws = getNormTransFunc(band=band, survey=survey)
 
-    f = interp1d(ws, trans, kind='linear', bounds_error=bounds_error, fill_value=0.)
+    if bounds_error and np.any((np.asarray(l) < ws[0]) | (np.asarray(l) > ws[-1])):
+        raise ValueError("[filtertools] wavelength outside of the range of the transmission function")
+
+    t = np.interp(l, ws, trans, left=0., right=0.)
 
-    return max(f(l), 0)
+    return max(t, 0)
@@ -2,11 +2,12 @@
 # ALS 2016/12/05
 
 """
-Get wavelength of line in AA (in vacuum by default). The data is read from file linelist.txt. 
+Get wavelength of line in AA (in vacuum by default). The data is read from file linelist.txt once per process and kept in memory. 
 """
 
 import numpy as np
 import re
+import functools
 
 import astropy.table as at
 from PyAstronomy import pyasl
@@ -39,32 +40,125 @@ def getllambda(ion='OIII', lid=0, vacuum=True):
     ------
     line wavelengths in Angstrom
     """
-    localpath = filtertools.getlocalpath()
-    filein = localpath+'linelist.txt'
-    linelist = at.Table.read(filein,format='ascii',delimiter='\t')
+    index = _get_line_index(ion, int(lid))
+    lam = get_linecatalog()['ws_vac'][index]
 
-    lid=int(lid)
+    if vacuum:
+        return lam
+    else:
+        return np.array([_vactoair(l) for l in lam], dtype='float')
+
+
+def getllambdas(ions, vacuum=True):
+    """
+    PURPOSE: Get the wavelengths of a list of lines in Angstrom in one call.
+
+    Params
+    ------
+    ions (list of str):
+        e.g., ['OIII5008', 'Hb', 'NII']. Each of the entries is looked up as in getllambda(ion=ion, vacuum=vacuum).
+    vacuum=True
+
+    Return
+    ------
+    line wavelengths in Angstrom (array), the concatenation of the wavelengths of each of the entries.
+    """
+    index = _get_lines_index(tuple(ions))
+    lam = get_linecatalog()['ws_vac'][index]
+
+    if vacuum or len(lam) == 0:
+        return lam
+    else:
+        return pyasl.vactoair2(lam)
+
+
+def _get_line_index(ion, lid=0):
+    """ return the indices in the line catalogue of the lines of ion (and lid), see getllambda() """
+    ion, lid = _parse_ion_lid(ion, lid)
+
+    catalog = get_linecatalog()
+    index = catalog['byion_index'].get(ion, catalog['empty_index'])
+
+    if lid != 0:
+        if index.size > 1:
+            index = catalog['byionlid_index'].get((ion, lid), catalog['empty_index'])
+        elif index.size == 0:
+            raise NameError("[llambda] no line found for {} {}".format(ion, str(lid)))
+
+    return index
+
+
+@functools.lru_cache(maxsize=256)
+def _get_lines_index(ions):
+    """ return the indices in the line catalogue of the lines of a tuple of ions as one read-only array, such that getllambdas() indexes the catalogue once for all the lines """
+    index = np.concatenate([get_linecatalog()['empty_index']] + [_get_line_index(ion) for ion in ions])
+    index.flags.writeable = False
+    return index
 
-    # if ion has trailing wavelength number then parse it to lid
+
+@functools.lru_cache(maxsize=None)
+def _parse_ion_lid(ion, lid):
+    """ if ion has trailing wavelength number then parse it to lid, e.g., ('OIII5008', 0) -> ('OIII', 5008) """
     m = re.search(r'\d+$', ion)
     if m is not None: # there is trailing number
         if lid == 0:
             lid = int(m.group())
             ion = str(ion[:-len(str(lid))])
-        else: 
+        else:
             raise Exception("lid specified twice")
 
-    if lid == 0:
-        lam=linelist[linelist['Line']==ion]['Wavelength'].data
-    else:
-        if (linelist['Line']==ion).sum()==1:
-            lam=linelist[linelist['Line']==ion]['Wavelength'].data
-        elif (linelist['Line']==ion).sum()>1:
-            lam=linelist[np.all([linelist['Line']==ion,linelist['Identifier']==lid],axis=0)]['Wavelength'].data
-        else:
-            raise NameError("[llambda] no line found for {} {}".format(ion, str(lid)))
+    return ion, lid
 
-    if vacuum:
-        return lam
-    else:
-        return pyasl.vactoair2(lam)
+
+@functools.lru_cache(maxsize=None)
+def _vactoair(l):
+    """ memoized conversion of a vacuum wavelength (float) to air wavelength, see pyasl.vactoair2() """
+    return float(pyasl.vactoair2(np.array([l]))[0])
+
+
+# line catalogue read from linelist.txt, see get_linecatalog()
+_linecatalog = {}
+
+
+def get_linecatalog():
+    """
+    return the line catalogue of linelist.txt, which is read on the first call and kept in memory for the rest of the process.
+
+    Return
+    ------
+    catalog (dict) with entries
+        'ions', 'lids', 'ws_vac' (arrays): the lines, their identifiers and vacuum wavelengths
+        'byion_index' (dict): ion -> indices of all the lines of the ion
+        'byionlid_index' (dict): (ion, lid) -> indices of the line
+    """
+    if not _linecatalog:
+        localpath = filtertools.getlocalpath()
+        filein = localpath+'linelist.txt'
+        linelist = at.Table.read(filein,format='ascii',delimiter='\t')
+
+        ions = np.array([str(ion).strip() for ion in linelist['Line']])
+        lids = np.array(linelist['Identifier']).astype('int')
+        ws_vac = np.array(linelist['Wavelength']).astype('float')
+
+        byion_index = {}
+        byionlid_index = {}
+        for i, (ion, lid) in enumerate(zip(ions, lids)):
+            byion_index.setdefault(ion, []).append(i)
+            byionlid_index.setdefault((ion, lid), []).append(i)
+
+        byion_index = {key: np.array(value) for key, value in byion_index.items()}
+        byionlid_index = {key: np.array(value) for key, value in byionlid_index.items()}
+
+        for arr in [ions, lids, ws_vac]:
+            arr.flags.writeable = False
+
+        _linecatalog.update({
+                            'ions': ions,
+                            'lids': lids,
+                            'ws_vac': ws_vac,
+                            'byion_index': byion_index,
+                            'byionlid_index': byionlid_index,
+                            'empty_index': np.array([], dtype='int'),
+                            })
+
+    return _linecatalog
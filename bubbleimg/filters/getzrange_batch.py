@@ -1,10 +1,12 @@
 # getzrange_batch.py
 # ALS 2016/05/04
 import os
+import itertools
 import numpy as np
 import astropy.table as at
 
 from . import filtertools
+from . import getzrange_line
 
 
 def write_zranges(filenameout='', wline='OIII', nline='HaNIISII', survey='sdss', wthreshold=0.6, nthreshold=0.2):
@@ -27,34 +29,23 @@ def write_zranges(filenameout='', wline='OIII', nline='HaNIISII', survey='sdss',
     tab_bandconfigs.meta['comments']=[]
 
     # make table
-    tabout = at.Table()
+    rows = []
     for tbandconfig in tab_bandconfigs:
         dictbandconfig = {key: tbandconfig[key][0] for key in tbandconfig.columns}
         dictbandconfig.update({'wline':wline,'nline':nline})
         # calculation
         z0, z1 = getzrange_batch(survey=survey, wthreshold=wthreshold, nthreshold=nthreshold, **dictbandconfig)
-        # set up table
-
+        # set up rows
         if type(z0) is not list:
-            tabdata = at.Table([[z0], [z1], [np.mean([z0, z1])]],names=['z0', 'z1', 'z_mean'])
-            tabout = append_tabdata_to_tabout(tabdata, tbandconfig, tabout)            
-        else:
-            for i in range(len(z0)):
-                tabdata = at.Table([[z0[i]], [z1[i]], [np.mean([z0[i], z1[i]])]],names=['z0', 'z1', 'z_mean'])
-                tabout = append_tabdata_to_tabout(tabdata, tbandconfig, tabout)
-
-    # output
-    tabout.write(filepathout,format='ascii.fixed_width',delimiter='', overwrite=True)
-    return tabout
+            z0, z1 = [z0], [z1]
 
+        for i in range(len(z0)):
+            rows += [[tbandconfig[key] for key in tab_bandconfigs.colnames] + [z0[i], z1[i], np.mean([z0[i], z1[i]])]]
 
-def append_tabdata_to_tabout(tabdata, tbandconfig, tabout):
-    tabrow = at.hstack([tbandconfig, tabdata])
+    tabout = at.Table(rows=rows, names=tab_bandconfigs.colnames+['z0', 'z1', 'z_mean'])
 
-    if len(tabout)==0: 
-        tabout=tabrow
-    else: 
-        tabout=at.vstack([tabout,tabrow])
+    # output
+    tabout.write(filepathout,format='ascii.fixed_width',delimiter='', overwrite=True)
     return tabout
 
 
@@ -150,5 +141,86 @@ def isinside(b, a0, a1):
     return ((b >= a0) and (b <= a1))
 
 
+def calc_zranges_batch(bandline='r', bandconti='i', wline='OIII', nline='HaNIISII', wthreshold=0.6, nthreshold=0.2, survey='sdss', zmin=0., zmax=3., dz=1.e-4):
+    """
+    Vectorized counterpart of getzrange_batch() that works for arbitrary thresholds and line sets without the zrange files. Return the redshift ranges where
+        bandline (r) contains all wline (OIII) and 
+        contiband (i) contains non of nline (HaNIISII)
+
+    The conditions are evaluated directly from the filter transmission functions on a redshift grid and the edges of the ranges are refined by bisection, see getzrange_line.calc_zranges(). 
+
+    Params
+    ------
+    bandline='r', bandconti='i' (str)
+    wline='OIII' (str or list of str):
+        key of getzrange_line.wlinesets or list of lines, e.g., ['OIII5008']
+    nline='HaNIISII' (str or list of str):
+        key of getzrange_line.nlinesets or list of lines
+    wthreshold=0.6, nthreshold=0.2 (float)
+    survey='sdss' (str)
+    zmin=0., zmax=3., dz=1.e-4 (float): 
+        the redshift grid
+
+    Return
+    ------
+    zranges (list of tuples (z0, z1))
+    """
+    bands = filtertools.surveybands[survey]
+
+    wlines = tuple(getzrange_line.get_lineset(wline, inside=True))
+    nlines = tuple(getzrange_line.get_lineset(nline, inside=False))
+
+    zs, wtrans_rel = getzrange_line.calc_line_trans_rel_zgrid(wlines, survey=survey, zmin=zmin, zmax=zmax, dz=dz)
+    zs, ntrans_rel = getzrange_line.calc_line_trans_rel_zgrid(nlines, survey=survey, zmin=zmin, zmax=zmax, dz=dz)
+
+    gw = getzrange_line.calc_zranges_condition(wtrans_rel[:, :, bands.index(bandline)], inside=True, threshold=wthreshold)
+    gn = getzrange_line.calc_zranges_condition(ntrans_rel[:, :, bands.index(bandconti)], inside=False, threshold=nthreshold)
+
+    def func_g(z):
+        gw = getzrange_line.calc_zranges_condition(getzrange_line.calc_line_trans_rel(wlines, z, survey=survey)[:, :, bands.index(bandline)], inside=True, threshold=wthreshold)
+        gn = getzrange_line.calc_zranges_condition(getzrange_line.calc_line_trans_rel(nlines, z, survey=survey)[:, :, bands.index(bandconti)], inside=False, threshold=nthreshold)
+        return np.minimum(gw, gn)
 
+    return getzrange_line.solve_zranges(zs, np.minimum(gw, gn), func_g=func_g)
+
+
+def calc_zranges_table(wline='OIII', nline='HaNIISII', wthreshold=0.6, nthreshold=0.2, survey='sdss', bandconfigs=None, zmin=0., zmax=3., dz=1.e-4):
+    """
+    Vectorized counterpart of write_zranges() that returns the table instead of writing it. 
+
+    Params
+    ------
+    wline='OIII', nline='HaNIISII' (str or list of str):
+        see calc_zranges_batch()
+    wthreshold=0.6, nthreshold=0.2 (float)
+    survey='sdss' (str)
+    bandconfigs=None (list of tuples (bandline, bandconti)): 
+        if not provided, use bandconfigs_w{wline}_n{nline}.txt if it exists, otherwise all pairs of different bands of the survey
+    zmin=0., zmax=3., dz=1.e-4 (float): 
+        the redshift grid
 
+    Return
+    ------
+    tabout (astropy table): 
+        with columns bandline, bandconti, z0, z1, z_mean, one row per redshift range
+    """
+    if bandconfigs is None:
+        fn = 'bandconfigs_w{wline}_n{nline}.txt'.format(wline=wline, nline=nline)
+        if isinstance(wline, str) and isinstance(nline, str) and filtertools.isFile(filename=fn, survey=survey):
+            tab_bandconfigs = filtertools.accessFile(filename=fn, survey=survey)
+            bandconfigs = list(zip(tab_bandconfigs['bandline'], tab_bandconfigs['bandconti']))
+        else:
+            bandconfigs = list(itertools.permutations(filtertools.surveybands[survey], 2))
+
+    cols = [[], [], [], []]
+    for bandline, bandconti in bandconfigs:
+        zranges = calc_zranges_batch(bandline=bandline, bandconti=bandconti, wline=wline, nline=nline, wthreshold=wthreshold, nthreshold=nthreshold, survey=survey, zmin=zmin, zmax=zmax, dz=dz)
+
+        for z0, z1 in zranges:
+            for col, x in zip(cols, [bandline, bandconti, z0, z1]):
+                col += [x]
+
+    tabout = at.Table(cols, names=['bandline', 'bandconti', 'z0', 'z1'], dtype=['str', 'str', 'f8', 'f8'])
+    tabout['z_mean'] = (tabout['z0'] + tabout['z1'])/2.
+
+    return tabout
@@ -5,11 +5,29 @@
 find zrange for lines to be in/out the band. 
 """
 
+import functools
+
 import numpy as np
 from astropy.table import Table, Row
 
 from . import filtertools
 from . import getllambda
+from . import filterbank
+
+
+# lines to be inside (wline) or outside (nline) of the band for each of the line configurations, same as in the findzrange_*() functions
+wlinesets = {
+            'OIII': ['OIII5008'], 
+            'HaNII': ['Ha', 'NII6550', 'NII6585'], 
+            }
+
+nlinesets = {
+            'OIII': ['OIII4960', 'OIII5008'], 
+            'HaNII': ['Ha', 'NII6550', 'NII6585'], 
+            'HaNIISII': ['Ha', 'NII6550', 'NII6585', 'SII6718', 'SII6733'], 
+            'OII': ['OII3726'], 
+            'OIINeIII': ['OII3726', 'NeIII3870'], 
+            }
 
 
 def findzrange_wline_OIIIs(threshold=0.6, survey='sdss'):
@@ -170,4 +188,165 @@ def findzrange_line(linelist, l0, l1, inside=True, threshold=0.2, survey='sdss')
     return tabout
 
 
-    
\ No newline at end of file
+def calc_zranges(lines, inside=True, threshold=0.2, survey='sdss', bands=None, zmin=0., zmax=3., dz=1.e-4):
+    """
+    Vectorized counterpart of findzrange_line(). Find the redshift ranges in which all the lines are inside (or none of the lines is inside) of the bands, where inside means that the transmission at the redshifted line wavelength is at least threshold*max of the band. 
+
+    The transmission of every line in every band is evaluated at once on a redshift grid, see calc_line_trans_rel_zgrid(), and the edges of the ranges are refined by bisection between the grid points, see solve_zranges(). Unlike the filterboundary files, the criterion is applied to each of the lines, so the lines could span across a band and yet none of them is inside. 
+
+    Params
+    ------
+    lines (list of str or str):
+        e.g., ['Ha', 'NII6550', 'NII6585'], or a key of wlinesets (inside=True) or nlinesets (inside=False), e.g., 'HaNII'
+    inside=True (bool)
+    threshold=0.2 (float)
+    survey='sdss' (str)
+    bands=None (list of str): 
+        if not provided, use all the bands of the survey
+    zmin=0., zmax=3., dz=1.e-4 (float): 
+        the redshift grid
+
+    Return
+    ------
+    zranges (dict): 
+        band -> list of the ranges (z0, z1) with z0 < z1
+    """
+    fb = filterbank.get_filterbank(survey=survey)
+    if bands is None:
+        bands = fb.bands
+
+    lines = get_lineset(lines, inside=inside)
+    zs, trans_rel = calc_line_trans_rel_zgrid(tuple(lines), survey=survey, zmin=zmin, zmax=zmax, dz=dz)
+
+    zranges = {}
+    for band in bands:
+        iband = fb.bands.index(band)
+        g = calc_zranges_condition(trans_rel[:, :, iband], inside=inside, threshold=threshold)
+        func_g = lambda z, iband=iband: calc_zranges_condition(calc_line_trans_rel(lines, z, survey=survey)[:, :, iband], inside=inside, threshold=threshold)
+        zranges[band] = solve_zranges(zs, g, func_g=func_g)
+
+    return zranges
+
+
+def get_lineset(lines, inside=True):
+    """ return list of line names given either the list or a key of wlinesets (inside=True) or nlinesets (inside=False) """
+    if isinstance(lines, str):
+        if inside:
+            return wlinesets[lines]
+        else:
+            return nlinesets[lines]
+    else:
+        return list(lines)
+
+
+def calc_zranges_condition(trans_rel, inside=True, threshold=0.2):
+    """
+    return g (array of shape (n_z,)), which is non-negative where the condition is satisfied: 
+        inside=True: all of the lines have trans_rel >= threshold
+        inside=False: none of the lines has trans_rel >= threshold
+
+    Params
+    ------
+    trans_rel (array of shape (n_z, n_lines)): 
+        transmission relative to the peak of the band
+    inside=True (bool)
+    threshold=0.2 (float)
+    """
+    if inside:
+        return trans_rel.min(axis=-1) - threshold
+    else:
+        return threshold - trans_rel.max(axis=-1)
+
+
+def solve_zranges(zs, g, func_g=None, n_iter=40):
+    """
+    return the ranges where g >= 0 on the grid zs as list of (z0, z1). A range that reaches the end of the grid ends at the grid. 
+
+    If func_g is provided, the edges are refined by bisection of func_g between the grid points where g changes sign, which are all bisected at once, such that the edges are exact to (zs[1]-zs[0])/2**n_iter. Otherwise, the edges are where the linear interpolation of g between the grid points crosses zero. 
+
+    Params
+    ------
+    zs (array): increasing
+    g (array): func_g(zs)
+    func_g=None (function): 
+        takes array of z and returns array of g
+    n_iter=40 (int): number of bisections
+
+    Return
+    ------
+    zranges (list of tuples (z0, z1))
+    """
+    ok = g >= 0.
+
+    iedges = np.flatnonzero(ok[1:] != ok[:-1]) # transition between i and i+1
+
+    if func_g is None or len(iedges) == 0:
+        g0, g1 = g[iedges], g[iedges+1]
+        zedges = zs[iedges] + (zs[iedges+1] - zs[iedges]) * g0 / (g0 - g1)
+    else:
+        zlo, zhi = zs[iedges].astype('float'), zs[iedges+1].astype('float')
+        oklo = ok[iedges]
+        for __ in range(n_iter):
+            zmid = (zlo + zhi) / 2.
+            tolo = (func_g(zmid) >= 0.) == oklo
+            zlo = np.where(tolo, zmid, zlo)
+            zhi = np.where(tolo, zhi, zmid)
+        zedges = (zlo + zhi) / 2.
+
+    istarts = list(zedges[~ok[iedges]])
+    iends = list(zedges[ok[iedges]])
+
+    if ok[0]:
+        istarts = [zs[0]] + istarts
+    if ok[-1]:
+        iends = iends + [zs[-1]]
+
+    return [(float(z0), float(z1)) for z0, z1 in zip(istarts, iends)]
+
+
+@functools.lru_cache(maxsize=64)
+def calc_line_trans_rel_zgrid(lines, survey='sdss', zmin=0., zmax=3., dz=1.e-4):
+    """
+    return the transmission relative to the peak of each band, T(l*(1+z))/max(T), of each of the lines in each of the bands of the survey on a redshift grid. The results are cached such that exploring band configurations does not recalculate it. 
+
+    Params
+    ------
+    lines (tuple of str): e.g., ('OIII4960', 'OIII5008')
+    survey='sdss' (str)
+    zmin=0., zmax=3., dz=1.e-4 (float): 
+        the redshift grid
+
+    Return
+    ------
+    zs (array of shape (n_z,))
+    trans_rel (array of shape (n_z, n_lines, n_bands))
+    """
+    zs = np.linspace(zmin, zmax, int(round((zmax-zmin)/dz))+1)
+    trans_rel = calc_line_trans_rel(lines, zs, survey=survey)
+
+    zs.flags.writeable = False
+    trans_rel.flags.writeable = False
+
+    return zs, trans_rel
+
+
+def calc_line_trans_rel(lines, zs, survey='sdss'):
+    """
+    return the transmission relative to the peak of each band, T(l*(1+z))/max(T), of each of the lines in each of the bands of the survey at redshifts zs, see calc_line_trans_rel_zgrid()
+
+    Params
+    ------
+    lines (list of str)
+    zs (array of shape (n_z,))
+    survey='sdss' (str)
+
+    Return
+    ------
+    trans_rel (array of shape (n_z, n_lines, n_bands))
+    """
+    fb = filterbank.get_filterbank(survey=survey)
+
+    ls = np.array([getllambda.getllambda(ion=line, vacuum=True)[0] for line in lines])
+
+    trans = fb.get_norm_trans(np.outer(1.+np.asarray(zs, dtype='float'), ls)) # (n_bands, n_z, n_lines)
+    return np.moveaxis(trans / fb.get_norm_trans_max()[:, np.newaxis, np.newaxis], 0, -1)
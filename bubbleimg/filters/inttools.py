@@ -5,14 +5,27 @@
 tool for integration
 """
 
+from collections import OrderedDict
+import hashlib
+
 import numpy as np
 import scipy.integrate as integrate
 from scipy.interpolate import interp1d
-import copy
 
 import astropy.units as u
 import astropy.constants as const
 
+# canonical units of the unit-free kernels, e.g., calc_Fnu_in_band_from_fl_uless()
+u_fl = u.Unit("erg s-1 cm-2 AA-1")
+u_fnu = u.Unit("erg s-1 cm-2 Hz-1")
+u_ws = u.AA
+c_AA = const.c.to_value(u.AA/u.s)
+
+# arrays, e.g. filter transmission, resampled onto recently used grids, see get_resampled_arr()
+_resampled_arrs = OrderedDict()
+_resampled_arrs_size = 64
+
+
 def calc_Fnu_in_band_from_fl(fl, ws, trans, ws_trans, isnormed=False):
     """
     calcualte: 
@@ -25,6 +38,8 @@ def calc_Fnu_in_band_from_fl(fl, ws, trans, ws_trans, isnormed=False):
     
     where fl is spectrum, T is filter transmission, l is wavelength
 
+    The units are validated here and the calculation is done by the unit-free kernel calc_Fnu_in_band_from_fl_uless(). 
+
     Params
     ------
     fl (spec)     in units similar to "erg cm-2 s-1 AA-1"
@@ -38,23 +53,18 @@ def calc_Fnu_in_band_from_fl(fl, ws, trans, ws_trans, isnormed=False):
 
     # sanity check: that units are correct
     checks =[
-            (fl/u.Unit("erg cm-2 s-1 AA-1")).to(u.dimensionless_unscaled).unit == u.dimensionless_unscaled, 
+            (fl/u_fl).to(u.dimensionless_unscaled).unit == u.dimensionless_unscaled, 
             (u.Quantity(trans)).unit == u.dimensionless_unscaled, 
-            (ws/u.Unit("AA")).unit == u.dimensionless_unscaled, 
-            (ws_trans/u.Unit("AA")).unit == u.dimensionless_unscaled, 
+            (ws/u_ws).unit == u.dimensionless_unscaled, 
+            (ws_trans/u_ws).unit == u.dimensionless_unscaled, 
             ]
     if not all(checks):
         print(checks)
         raise Exception("[inttools] units of spectrum or filter response function is wrong")
 
-    # convert to quantity
-    fl = u.Quantity(fl)
-    ws = u.Quantity(ws)
-
-    # calculation
-    fnu = (fl * (ws**2) / const.c).to(u.Unit("erg s-1 cm-2 Hz-1"))
+    Fnu = calc_Fnu_in_band_from_fl_uless(fl=u.Quantity(fl).to_value(u_fl), ws=u.Quantity(ws).to_value(u_ws), trans=u.Quantity(trans).to_value(u.dimensionless_unscaled), ws_trans=u.Quantity(ws_trans).to_value(u_ws), isnormed=isnormed)
 
-    return calc_Fnu_in_band_from_fnu(fnu, ws, trans, ws_trans, isnormed=isnormed)
+    return Fnu * u_fnu
 
 
 
@@ -66,6 +76,8 @@ def calc_Fnu_in_band_from_fnu(fnu, ws, trans, ws_trans, isnormed=False):
     
     where fnu is spectrum, T is filter transmission, l is wavelength
 
+    The units are validated here and the calculation is done by the unit-free kernel calc_Fnu_in_band_from_fnu_uless(). 
+
     Params
     ------
     fnu (spec) in units similar to "erg s-1 cm-2 Hz-1"
@@ -80,21 +92,57 @@ def calc_Fnu_in_band_from_fnu(fnu, ws, trans, ws_trans, isnormed=False):
 
     # sanity check: that units are correct
     checks =[
-            (fnu/u.Unit("erg s-1 cm-2 Hz-1")).unit == u.dimensionless_unscaled, 
+            (fnu/u_fnu).unit == u.dimensionless_unscaled, 
             (u.Quantity(trans)).unit == u.dimensionless_unscaled, 
-            (ws/u.Unit("AA")).unit == u.dimensionless_unscaled, 
-            (ws_trans/u.Unit("AA")).unit == u.dimensionless_unscaled, 
+            (ws/u_ws).unit == u.dimensionless_unscaled, 
+            (ws_trans/u_ws).unit == u.dimensionless_unscaled, 
             ]
     if not all(checks):
         print(checks)
         raise Exception("[inttools] units of spectrum or filter response function is wrong")
 
-    # convert to quantity
-    fnu = u.Quantity(fnu)
-    ws = u.Quantity(ws)
-    trans = u.Quantity(trans)
-    ws_trans = u.Quantity(ws_trans)
+    Fnu = calc_Fnu_in_band_from_fnu_uless(fnu=u.Quantity(fnu).to_value(u_fnu), ws=u.Quantity(ws).to_value(u_ws), trans=u.Quantity(trans).to_value(u.dimensionless_unscaled), ws_trans=u.Quantity(ws_trans).to_value(u_ws), isnormed=isnormed)
+
+    return Fnu * u_fnu
+
+
+def calc_Fnu_in_band_from_fl_uless(fl, ws, trans, ws_trans, isnormed=False):
+    """
+    unit-free kernel of calc_Fnu_in_band_from_fl() that works on plain float arrays in the canonical units, no unit is checked. 
+
+    Params
+    ------
+    fl (array)         in "erg cm-2 s-1 AA-1"
+    ws (array)         in "AA"
+    trans (array)      dimensionless
+    ws_trans (array)   in "AA"
+    isnormed=False (bool)
+
+    Return
+    ------
+    Fnu (float)        in "erg s-1 cm-2 Hz-1"
+    """
+    fnu = np.asarray(fl) * np.asarray(ws)**2 / c_AA
+
+    return calc_Fnu_in_band_from_fnu_uless(fnu, ws, trans, ws_trans, isnormed=isnormed)
+
 
+def calc_Fnu_in_band_from_fnu_uless(fnu, ws, trans, ws_trans, isnormed=False):
+    """
+    unit-free kernel of calc_Fnu_in_band_from_fnu() that works on plain float arrays in the canonical units, no unit is checked. 
+
+    Params
+    ------
+    fnu (array)        in "erg s-1 cm-2 Hz-1"
+    ws (array)         in "AA"
+    trans (array)      dimensionless
+    ws_trans (array)   in "AA"
+    isnormed=False (bool)
+
+    Return
+    ------
+    Fnu (float)        in "erg s-1 cm-2 Hz-1"
+    """
     numerator = int_arr_times_arr_over_dlnx(arr1=fnu, xs1=ws, arr2=trans, xs2=ws_trans)
 
     if not isnormed:
@@ -102,9 +150,7 @@ def calc_Fnu_in_band_from_fnu(fnu, ws, trans, ws_trans, isnormed=False):
     else: 
         denominator = 1.
 
-    Fnu = (numerator/denominator).to(u.Unit("erg s-1 cm-2 Hz-1"))
-
-    return Fnu
+    return numerator/denominator
 
 
 def int_f_over_dlnx(f, x0=1., x1=2.):
@@ -135,7 +181,7 @@ def int_arr_over_dlnx(arr, xs):
     xs (array)
     """
 
-    lnxs = np.log(np.array(xs))
+    lnxs = np.log(np.asarray(xs))
 
     return np.trapz(arr, x=lnxs)
 
@@ -156,14 +202,52 @@ def int_arr_times_arr_over_dlnx(arr1, xs1, arr2, xs2, toexception=False):
     If xs2 is more extended than xs1, raise error
 
     """
-    arr1 = copy.copy(arr1)
-    xs1 = copy.copy(xs1)
-
     if not arr1_contains_arr2(xs1, xs2) and toexception:
         raise Exception("[inttools] arr1 does not cover the domain of arr2")
 
-    f = interp1d(xs2, arr2, kind='linear', bounds_error=False, fill_value=0.)
-    return int_arr_times_f_over_dlnx(arr1, f, xs1)
+    arr2_resampled = get_resampled_arr(xs1, arr2, xs2)
+    return int_arr_over_dlnx(arr1*arr2_resampled, xs1)
+
+
+def get_resampled_arr(xs, arr, xs_arr):
+    """
+    return arr (on grid xs_arr) linearly interpolated onto grid xs, zero outside of xs_arr. 
+
+    The results are kept in a LRU cache keyed by the content signatures of the grids and of arr, see get_grid_signature(), such that repeated integrations over the same grid, e.g., of the components of a spectrum, skip the interpolation. The returned array is read-only. 
+
+    Params
+    ------
+    xs (array)
+    arr (array)
+    xs_arr (array)
+
+    Return
+    ------
+    arr_resampled (array)
+    """
+    key = (get_grid_signature(xs), get_grid_signature(xs_arr), get_grid_signature(arr))
+
+    if key in _resampled_arrs:
+        _resampled_arrs.move_to_end(key)
+    else:
+        f = interp1d(xs_arr, arr, kind='linear', bounds_error=False, fill_value=0.)
+        arr_resampled = f(xs)
+        arr_resampled.flags.writeable = False
+        _resampled_arrs[key] = arr_resampled
+
+        if len(_resampled_arrs) > _resampled_arrs_size:
+            _resampled_arrs.popitem(last=False)
+
+    return _resampled_arrs[key]
+
+
+def get_grid_signature(xs):
+    """
+    return a hashable signature of the content of the array xs, its dtype, its shape and the sha1 digest of its bytes. Arrays have the same signature only if they are identical, such that cached results keyed by it, see get_resampled_arr() and synphot.get_weight_matrix(), are never returned for a different grid. Hashing is linear in the length of xs but much cheaper than the interpolation it saves. 
+    """
+    xs = np.ascontiguousarray(xs)
+
+    return (xs.dtype.str, xs.shape, hashlib.sha1(xs.tobytes()).digest())
 
 
 def arr1_contains_arr2(arr1, arr2):
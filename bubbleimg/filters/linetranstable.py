@@ -0,0 +1,162 @@
+# linetranstable.py
+
+"""
+precomputed normalized filter transmission at the redshifted wavelengths of lines, on a redshift grid
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from . import filterbank
+from .getllambda import getllambda
+
+
+class LineTransTable(object):
+
+    def __init__(self, lines, survey='sdss', zmin=0., zmax=3., dz=1.e-4):
+        """
+        LineTransTable, a lookup table of the normalized transmission T(l*(1+z)) of each of the lines in each of the bands of a survey (redshift x line x band) on a fine redshift grid.
+
+        The table is calculated once with filterbank.FilterBank, after which the transmission of the lines at any redshift within the grid is obtained by linear interpolation in z without accessing any file. Outside of the grid the transmission is evaluated directly.
+
+        Params
+        ------
+        lines (list of str): e.g., ['OIII4960', 'OIII5008']
+        survey='sdss' (str)
+        zmin=0., zmax=3., dz=1.e-4 (float):
+            the redshift grid
+
+        Attributes
+        ----------
+        lines (list of str)
+        survey (str)
+        bands (list of str)
+        zs (array of shape (n_z,))
+        ls (array of shape (n_lines,)): vacuum rest-frame wavelengths of the lines [AA]
+        trans (array of shape (n_z, n_lines, n_bands))
+        trans_max (array of shape (n_bands,)): peaks of the normalized transmission functions
+        """
+        self.lines = list(lines)
+        self.survey = survey
+
+        fb = filterbank.get_filterbank(survey=survey)
+        self.bands = list(fb.bands)
+
+        self.zs = np.linspace(zmin, zmax, int(round((zmax-zmin)/dz))+1)
+        self.ls = np.array([getllambda(ion=line, vacuum=True)[0] for line in self.lines])
+
+        self.trans = np.moveaxis(fb.get_norm_trans(np.outer(1.+self.zs, self.ls)), 0, -1)
+        self.trans_max = fb.get_norm_trans_max()
+
+        for arr in [self.zs, self.ls, self.trans, self.trans_max]:
+            arr.flags.writeable = False
+
+        self._iline = {line: i for i, line in enumerate(self.lines)}
+        self._iband = {band: i for i, band in enumerate(self.bands)}
+
+
+    def get_norm_trans(self, z, lines=None, bands=None):
+        """
+        return the normalized transmission of the lines in the bands at redshift z
+
+        Params
+        ------
+        z (float or array)
+        lines=None (list of str)
+            if not provided, use self.lines
+        bands=None (list of str)
+            if not provided, use self.bands
+
+        Return
+        ------
+        trans (array of shape np.shape(z) + (n_lines, n_bands))
+        """
+        ilines = self._get_indices(self._iline, lines)
+        ibands = self._get_indices(self._iband, bands)
+
+        z = np.asarray(z, dtype='float')
+        zflat = z.ravel()
+        out = np.empty((zflat.size, len(ilines), len(ibands)))
+
+        # interpolation on the grid
+        ongrid = (zflat >= self.zs[0]) & (zflat <= self.zs[-1])
+        if self.zs.size > 1:
+            x = (zflat[ongrid] - self.zs[0]) / (self.zs[1] - self.zs[0])
+            i0 = np.clip(np.floor(x).astype('int'), 0, self.zs.size-2)
+            f = (x - i0)[:, np.newaxis, np.newaxis]
+            trans = self.trans[:, ilines][:, :, ibands]
+            out[ongrid] = trans[i0] * (1.-f) + trans[i0+1] * f
+        else:
+            out[ongrid] = self.trans[:, ilines][:, :, ibands][0]
+
+        # direct evaluation off the grid
+        if not ongrid.all():
+            fb = filterbank.get_filterbank(survey=self.survey)
+            ws = np.outer(1.+zflat[~ongrid], self.ls[ilines])
+            out[~ongrid] = np.moveaxis(fb.get_norm_trans(ws, bands=[self.bands[i] for i in ibands]), 0, -1)
+
+        return out.reshape(z.shape + out.shape[1:])
+
+
+    def get_norm_trans_rel(self, z, lines=None, bands=None):
+        """ return the transmission relative to the peak of the bands, see get_norm_trans() """
+        ibands = self._get_indices(self._iband, bands)
+
+        return self.get_norm_trans(z, lines=lines, bands=bands) / self.trans_max[ibands]
+
+
+    def list_lines_in_band(self, z, band, threshold=0.01, lines=None):
+        """
+        return the list of lines whose transmission in band at redshift z is higher than threshold (in fraction of the peak of the band)
+
+        Params
+        ------
+        z (float)
+        band (str)
+        threshold=0.01 (float)
+        lines=None (list of str)
+            if not provided, use self.lines
+
+        Return
+        ------
+        llist (list of str)
+        """
+        if lines is None:
+            lines = self.lines
+
+        trans_rel = self.get_norm_trans_rel(z, lines=lines, bands=[band])[:, 0]
+
+        return [line for line, t in zip(lines, trans_rel) if t > threshold]
+
+
+    def _get_indices(self, index, keys):
+        """ return the indices of keys (lines or bands) in the table """
+        if keys is None:
+            return np.arange(len(index))
+
+        try:
+            return np.array([index[key] for key in keys], dtype='int')
+        except KeyError as e:
+            raise ValueError("[linetranstable] {} not in table".format(e.args[0]))
+
+
+
+# recently used tables that are shared within the process, see get_linetranstable()
+_linetranstables = OrderedDict()
+_linetranstables_size = 8
+
+
+def get_linetranstable(lines, survey='sdss'):
+    """ return the LineTransTable of the lines in the survey on the default redshift grid, which is constructed once and kept while it is among the _linetranstables_size most recently used tables of the process """
+    key = (survey, tuple(lines))
+
+    if key in _linetranstables:
+        _linetranstables.move_to_end(key)
+    else:
+        _linetranstables[key] = LineTransTable(lines=lines, survey=survey)
+
+        if len(_linetranstables) > _linetranstables_size:
+            _linetranstables.popitem(last=False)
+
+    return _linetranstables[key]
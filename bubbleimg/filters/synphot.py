@@ -0,0 +1,120 @@
+# synphot.py
+
+"""
+synthetic photometry of many spectra in many bands as one matrix product
+
+    Fnu_b = int l^2/c * fl(l) T_b(l) dlnl  =  sum_k W[b, k] * fl_k
+
+where T_b is the normalized transmission function of band b (int T_b dlnl = 1), see filterbank.FilterBank. The weight matrix W (bands x pixels) contains the trapz weights in lnl, the transmission interpolated onto the spectrum grid and the factor l^2/c. It only depends on the wavelength grid and is cached by the content signature of the grid, such that spectra that share a grid reuse it.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import astropy.units as u
+
+from . import filterbank
+from .inttools import u_fl, u_fnu, u_ws, c_AA
+from .inttools import get_grid_signature
+
+# weight matrices of recently used wavelength grids, see get_weight_matrix()
+_weight_matrices = OrderedDict()
+_weight_matrices_size = 32
+
+
+def calc_Fnu_in_bands_from_fl(fl, ws, survey='sdss', bands=None):
+    """
+    calculate Fnu of one or many spectra in the bands of a survey, see calc_Fnu_in_band_from_fl() of inttools.
+
+    Params
+    ------
+    fl (array or quantity): of shape (n_ws,) or (n_spec, n_ws)
+        spectra, in units similar to "erg cm-2 s-1 AA-1", if without unit then assumed to be in "erg cm-2 s-1 AA-1"
+    ws (array or quantity): of shape (n_ws,)
+        wavelength grid shared by the spectra, in units similar to "AA", if without unit then assumed to be in "AA"
+    survey='sdss' (str)
+    bands=None (list of str)
+        if not provided, use all the bands of the survey
+
+    Return
+    ------
+    Fnu (quantity in units "erg s-1 cm-2 Hz-1"): of shape (n_bands,) or (n_spec, n_bands)
+    """
+    fl = u.Quantity(fl, u_fl, dtype='float').to_value(u_fl)
+    ws = u.Quantity(ws, u_ws, dtype='float').to_value(u_ws)
+
+    if fl.shape[-1] != ws.shape[-1]:
+        raise ValueError("[synphot] spectra and wavelength grid have different sizes")
+
+    W = get_weight_matrix(ws, survey=survey, bands=bands)
+
+    return np.dot(fl, W.T) * u_fnu
+
+
+def get_weight_matrix(ws, survey='sdss', bands=None):
+    """
+    return the weight matrix W of shape (n_bands, n_ws) of the wavelength grid ws, see calc_weight_matrix(). The matrix is cached by the signature of the grid and is read-only.
+
+    Params
+    ------
+    ws (array): wavelength grid in AA
+    survey='sdss' (str)
+    bands=None (list of str)
+
+    Return
+    ------
+    W (array)
+    """
+    if bands is None:
+        bands = filterbank.get_filterbank(survey=survey).bands
+
+    ws = np.asarray(ws, dtype='float')
+    key = (survey, tuple(bands), get_grid_signature(ws))
+
+    if key in _weight_matrices:
+        _weight_matrices.move_to_end(key)
+    else:
+        W = calc_weight_matrix(ws, survey=survey, bands=bands)
+        W.flags.writeable = False
+        _weight_matrices[key] = W
+
+        if len(_weight_matrices) > _weight_matrices_size:
+            _weight_matrices.popitem(last=False)
+
+    return _weight_matrices[key]
+
+
+def calc_weight_matrix(ws, survey='sdss', bands=None):
+    """
+    calculate the weight matrix
+
+        W[b, k] = dlnl_k * T_b(l_k) * l_k^2 / c
+
+    where dlnl_k are the trapz weights on the grid ln(ws), such that Fnu [erg s-1 cm-2 Hz-1] in band b of spectrum fl [erg s-1 cm-2 AA-1] is sum_k W[b, k] * fl_k. The transmission is zero outside of the filter.
+
+    Params
+    ------
+    ws (array): wavelength grid in AA
+    survey='sdss' (str)
+    bands=None (list of str)
+
+    Return
+    ------
+    W (array of shape (n_bands, n_ws))
+    """
+    ws = np.asarray(ws, dtype='float')
+
+    trans = filterbank.get_filterbank(survey=survey).get_norm_trans(ws, bands=bands)
+
+    return trans * (calc_trapz_weights(np.log(ws)) * ws**2 / c_AA)
+
+
+def calc_trapz_weights(xs):
+    """ return weights w such that sum(w * ys) is the trapz integral of ys over xs, i.e., np.trapz(ys, x=xs) """
+    dxs = np.diff(xs)
+
+    weights = np.zeros(len(xs))
+    weights[:-1] += 0.5 * dxs
+    weights[1:] += 0.5 * dxs
+
+    return weights
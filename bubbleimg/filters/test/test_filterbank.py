@@ -0,0 +1,58 @@
+# test_filterbank.py
+
+import pytest
+import numpy as np
+
+from .. import filterbank
+from .. import filtertools
+from ..surveysetup import surveybands
+
+
+def test_filterbank_get_norm_trans():
+
+	survey = 'hsc'
+	fb = filterbank.FilterBank(survey=survey)
+
+	assert fb.bands == surveybands[survey]
+
+	ws = np.linspace(3000., 12000., 501)
+	trans = fb.get_norm_trans(ws)
+
+	assert trans.shape == (len(fb.bands), len(ws))
+	assert np.all(trans >= 0.)
+
+	for i, band in enumerate(fb.bands):
+		for w in ws[::50]:
+			assert trans[i][ws == w][0] == filtertools.getNormTrans(w, band=band, survey=survey)
+
+
+def test_filterbank_get_norm_trans_bands():
+
+	fb = filterbank.FilterBank(survey='sdss')
+
+	trans = fb.get_norm_trans(6000., bands=['r', 'i'])
+
+	assert trans.shape == (2, )
+	assert trans[0] == filtertools.getNormTrans(6000., band='r', survey='sdss')
+	assert trans[1] == 0.
+
+
+def test_filterbank_bounds_error():
+
+	fb = filterbank.FilterBank(survey='hsc', bands=['r'])
+
+	assert fb.get_norm_trans([1000., 20000.])[0].tolist() == [0., 0.]
+
+	with pytest.raises(ValueError):
+		fb.get_norm_trans([6000., 20000.], bounds_error=True)
+
+	with pytest.raises(ValueError):
+		filterbank.FilterBank(survey='hsc', bands=['u'])
+
+
+def test_filterbank_get_filterbank():
+
+	fb = filterbank.get_filterbank(survey='hsc')
+
+	assert filterbank.get_filterbank(survey='hsc') is fb
+	assert np.all(fb.get_norm_trans_max() > 0.)
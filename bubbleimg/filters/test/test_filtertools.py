@@ -2,6 +2,8 @@
 
 # WARNING this test set is not complete yet, not all functions in filtertools are covered
 
+import numpy as np
+
 from .. import filtertools
 
 
@@ -14,10 +16,121 @@ def test_filtertools_getFilterBoundaries():
 
 	w1, w2 = filtertools.getFilterBoundaries(threshold=0.6, band=band, survey=survey, withunit=False)
 
-	assert w1 == 5433
-	assert w2 == 6967
+	assert w1 == 5488
+	assert w2 == 6960
 
 	w1, w2 = filtertools.getFilterBoundaries(threshold=0.01, band=band, survey=survey, withunit=False)
 
-	assert w1 == 5324
-	assert w2 == 7070
+	assert w1 == 5372
+	assert w2 == 7080
+
+
+def test_filtertools_getNormTransBank():
+
+	survey = 'hsc'
+
+	bank = filtertools.getNormTransBank(survey=survey)
+
+	assert set(bank.keys()) == set(filtertools.surveybands[survey])
+	assert filtertools.getNormTransBank(survey=survey) is bank
+
+	for band in filtertools.surveybands[survey]:
+		trans, ws = filtertools.getNormTransFunc(band=band, survey=survey)
+		trans_csv, ws_csv = filtertools.readNormTransFunc(band=band, survey=survey)
+
+		assert trans is bank[band][0]
+		assert (trans == trans_csv).all()
+		assert (ws == ws_csv).all()
+		assert not trans.flags.writeable
+
+
+def test_filtertools_getNormTrans_sorted():
+	""" the bank is sorted by wavelength such that np.interp agrees with interp1d, which sorts internally """
+	from scipy.interpolate import interp1d
+
+	trans = np.array([0., 0.5, 1., 0.2, 0.])
+	ws = np.array([5000., 5200., 5100., 5300., 5400.])
+
+	trans_sorted, ws_sorted = filtertools._sort_by_ws(trans, ws)
+	assert np.all(np.diff(ws_sorted) >= 0.)
+
+	wtest = np.linspace(4900., 5500., 61)
+	f = interp1d(ws, trans, kind='linear', bounds_error=False, fill_value=0.)
+	assert np.allclose(np.interp(wtest, ws_sorted, trans_sorted, left=0., right=0.), f(wtest))
+
+	for band in filtertools.surveybands['hsc']:
+		trans, ws = filtertools.getNormTransFunc(band=band, survey='hsc')
+		assert np.all(np.diff(ws) >= 0.)
+
+
+def test_filtertools_writeNormTransBank_drops_filterbank():
+	from .. import filterbank
+
+	fb = filterbank.get_filterbank(survey='hsc')
+	bank = filtertools.getNormTransBank(survey='hsc')
+
+	filtertools.writeNormTransBank(survey='hsc')
+
+	assert filtertools.getNormTransBank(survey='hsc') is not bank
+	assert filterbank.get_filterbank(survey='hsc') is not fb
+
+
+def test_filtertools_accessTabZranges():
+
+	tab = filtertools.accessTabZranges(lineconfig='wOIII0.6_nHaNIISII0.2', survey='sdss')
+
+	assert len(tab) > 0
+	assert set(['bandline', 'bandconti', 'z0', 'z1']).issubset(tab.colnames)
+
+
+def test_filtertools_assignBandConfigs():
+
+	survey = 'hsc'
+	tabz = filtertools.accessTabZranges(lineconfig='all', survey=survey)
+
+	zs = np.linspace(-0.1, 1.2, 5000)
+	zs = np.append(zs, [np.nan, tabz['z0'][0], tabz['z1'][0]])
+
+	tab = filtertools.assignBandConfigs(zs, lineconfig='all', survey=survey)
+
+	assert len(tab) == len(zs)
+	assert tab.colnames == ['z', 'lineconfig', 'bandline', 'bandconti', 'z0', 'z1', 'inzrange', 'frac_wline', 'frac_nline']
+	assert np.all(np.isnan(tab['frac_wline'][~tab['inzrange']]))
+	assert np.all(np.isfinite(tab['frac_wline'][tab['inzrange']]))
+
+	# compare to looping over the ranges
+	for z, row in zip(zs, tab):
+		isin = (tabz['z0'] <= z) & (tabz['z1'] >= z)
+
+		assert row['inzrange'] == isin.any()
+
+		if isin.any():
+			margins = np.minimum(z - tabz['z0'], tabz['z1'] - z)
+			margins[~isin] = -np.inf
+			assert np.max(margins) == min(z - row['z0'], row['z1'] - z)
+		else:
+			assert row['bandline'] == ''
+			assert np.isnan(row['z0'])
+
+	# single line config
+	tab = filtertools.assignBandConfigs(0.3, lineconfig='wOIII0.6_nHaNIISII0.2', survey='sdss')
+
+	assert tab['inzrange'][0]
+	assert tab['bandline'][0] == 'r'
+	assert tab['bandconti'][0] == 'i'
+
+
+def test_filtertools_assignBandConfigs_line_fractions():
+
+	tab = filtertools.assignBandConfigs([0.3, 0.5], lineconfig='wOIII0.6_nHaNIISII0.2', survey='sdss')
+
+	row = tab[0]
+	assert row['inzrange']
+
+	trans_max = filtertools.getNormTransFunc(band=row['bandline'], survey='sdss')[0].max()
+	frac_OIII = filtertools.getNormTrans(5008.240*(1.+0.3), band=row['bandline'], survey='sdss') / trans_max
+	assert np.isclose(row['frac_wline'], frac_OIII, rtol=1.e-3)
+
+	# inside the zrange the lines satisfy the thresholds of the line config
+	assert row['frac_wline'] >= 0.6
+	assert row['frac_nline'] <= 0.2
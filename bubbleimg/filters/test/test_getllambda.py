@@ -1,8 +1,8 @@
 
 import pytest
-from .. import getllambda
-import imp
-imp.reload(getllambda)
+import importlib
+import numpy as np
+getllambda = importlib.import_module('..getllambda', __package__)
 
 def test_getllambda():
 	assert getllambda.getllambda('OIII5008') == 5008.240
@@ -14,4 +14,32 @@ def test_getllambda():
 
 def test_getllambda_err():
 	with pytest.raises(Exception) as e:
-		getllambda.getllambda('OIII5008', lid=4960)
\ No newline at end of file
+		getllambda.getllambda('OIII5008', lid=4960)
+
+def test_getllambda_air():
+	assert np.all(getllambda.getllambda('NII', vacuum=False) < getllambda.getllambda('NII'))
+	assert len(getllambda.getllambda('NII', vacuum=False)) == 3
+
+
+def test_getllambdas():
+	lams = getllambda.getllambdas(['OIII5008', 'Ha', 'NII'])
+	assert np.all(lams == [5008.240, 6564.61, 5756.24, 6549.86, 6585.27])
+
+	assert len(getllambda.getllambdas([])) == 0
+
+
+def test_getllambda_catalog():
+	catalog = getllambda.get_linecatalog()
+	assert getllambda.get_linecatalog() is catalog
+
+	index = catalog['byionlid_index'][('OIII', 5008)]
+	assert catalog['ws_vac'][index] == 5008.240
+
+
+def test_getllambdas_air():
+	ions = ['OIII5008', 'Ha', 'NII']
+	lams = getllambda.getllambdas(ions, vacuum=False)
+	lams_single = np.concatenate([getllambda.getllambda(ion, vacuum=False) for ion in ions])
+
+	assert np.allclose(lams, lams_single, rtol=0., atol=1e-10)
+	assert len(getllambda.getllambdas([], vacuum=False)) == 0
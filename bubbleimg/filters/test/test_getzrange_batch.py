@@ -80,3 +80,68 @@ def test_determine_non_excluded_zrange_wrong_order():
 
 	assert z0 == ex_zmax
 	assert z1 == in_zmax
+
+
+def test_calc_zranges_batch_agrees_with_getzrange_batch():
+	""" the vectorized solver reproduces the redshift ranges of the zrange files """
+
+	for bandline, bandconti in [('r', 'z'), ('g', 'r')]:
+		z0, z1 = getzrange_batch.getzrange_batch(bandline=bandline, bandconti=bandconti, wline='OIII', nline='HaNIISII', wthreshold=0.6, nthreshold=0.2, survey='sdss')
+
+		zranges = getzrange_batch.calc_zranges_batch(bandline=bandline, bandconti=bandconti, wline='OIII', nline='HaNIISII', wthreshold=0.6, nthreshold=0.2, survey='sdss')
+
+		assert len(zranges) >= 1
+		zr0, zr1 = max(zranges, key=lambda zr: zr[1] - zr[0])
+
+		# the filterboundary files behind the zrange files are truncated to integer AA
+		tol = 1./5008.24
+		assert np.absolute(zr0 - z0) < tol
+		assert np.absolute(zr1 - z1) < tol
+
+
+def test_calc_zranges_batch_grid_independent():
+	""" the edges are refined between the grid points such that they do not depend on the grid step """
+
+	for bandline, bandconti in [('r', 'z'), ('g', 'r')]:
+		zranges_fine = getzrange_batch.calc_zranges_batch(bandline=bandline, bandconti=bandconti, dz=1.e-4)
+		zranges_coarse = getzrange_batch.calc_zranges_batch(bandline=bandline, bandconti=bandconti, dz=1.e-2)
+
+		assert len(zranges_fine) == len(zranges_coarse)
+		assert np.allclose(zranges_fine, zranges_coarse, rtol=0., atol=1.e-10)
+
+
+def test_solve_zranges_bisection():
+	""" the edges are the exact roots of func_g rather than of its linear interpolation on the grid """
+	from .. import getzrange_line
+
+	func_g = lambda z: 0.01 - (z - 0.5)**2 # >= 0 for 0.4 <= z <= 0.6
+	zs = np.linspace(0., 1., 8)
+
+	zranges = getzrange_line.solve_zranges(zs, func_g(zs), func_g=func_g)
+	assert np.allclose(zranges, [(0.4, 0.6)], rtol=0., atol=1.e-10)
+
+	zranges_linear = getzrange_line.solve_zranges(zs, func_g(zs))
+	assert not np.allclose(zranges_linear, [(0.4, 0.6)], rtol=0., atol=1.e-3)
+
+	# a range that reaches the end of the grid
+	zranges = getzrange_line.solve_zranges(zs, -func_g(zs), func_g=lambda z: -func_g(z))
+	assert np.allclose(zranges, [(0., 0.4), (0.6, 1.)], rtol=0., atol=1.e-10)
+
+
+def test_calc_zranges_table():
+
+	tab = getzrange_batch.calc_zranges_table(wline='OIII', nline='HaNIISII', wthreshold=0.6, nthreshold=0.2, survey='sdss')
+
+	assert tab.colnames == ['bandline', 'bandconti', 'z0', 'z1', 'z_mean']
+	assert len(tab) > 0
+	assert np.all(tab['z1'] > tab['z0'])
+	assert np.allclose(tab['z_mean'], (tab['z0'] + tab['z1'])/2.)
+
+	# arbitrary thresholds and line lists
+	tab = getzrange_batch.calc_zranges_table(wline=['OIII5008'], nline=['Ha'], wthreshold=0.9, nthreshold=0.01, survey='sdss', bandconfigs=[('r', 'i')])
+	assert np.all(tab['bandline'] == 'r')
+
+	# no bandconfigs
+	tab = getzrange_batch.calc_zranges_table(wline='OIII', nline='HaNIISII', survey='sdss', bandconfigs=[])
+	assert len(tab) == 0
+	assert tab.colnames == ['bandline', 'bandconti', 'z0', 'z1', 'z_mean']
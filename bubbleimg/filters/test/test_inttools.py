@@ -1,5 +1,6 @@
 
 import pytest
+import time
 import numpy as np
 import astropy.units as u
 
@@ -124,6 +125,100 @@ def test_inttools_arr_and_arr():
 	assert round(r0, 5) == round(r1, 5)
 
 
+def test_inttools_get_resampled_arr():
+
+	xs = 10.**(3.5 + 1.e-4 * np.arange(4000))
+	xs_trans = np.linspace(5000., 7000., 201)
+	trans = np.sin((xs_trans - 5000.) / 2000. * np.pi)
+
+	inttools._resampled_arrs.clear()
+	r0 = inttools.get_resampled_arr(xs, trans, xs_trans)
+
+	assert len(inttools._resampled_arrs) == 1
+	assert not r0.flags.writeable
+	assert np.all(r0 == np.interp(xs, xs_trans, trans, left=0., right=0.))
+
+	# same grid reuses the resampled array
+	r1 = inttools.get_resampled_arr(xs.copy(), trans.copy(), xs_trans.copy())
+	assert r1 is r0
+
+	# different grid or filter
+	r2 = inttools.get_resampled_arr(xs[1:], trans, xs_trans)
+	r3 = inttools.get_resampled_arr(xs, trans*2., xs_trans)
+	assert len(inttools._resampled_arrs) == 3
+	assert np.all(r2 == r0[1:])
+	assert np.all(r3 == r0*2.)
+
+
+def test_inttools_get_grid_signature():
+
+	xs = 10.**(3.5 + 1.e-4 * np.arange(4000))
+
+	sig = inttools.get_grid_signature(xs)
+	assert sig[1] == (4000, )
+	assert inttools.get_grid_signature(10.**(3.5 + 1.e-4 * np.arange(4000))) == sig
+	assert inttools.get_grid_signature(xs[1:]) != sig
+	assert inttools.get_grid_signature(xs*1.0001) != sig
+	assert inttools.get_grid_signature(xs.astype('float32')) != sig
+	assert inttools.get_grid_signature([]) == inttools.get_grid_signature(np.array([]))
+
+
+def test_inttools_get_grid_signature_no_collision():
+	""" arrays that agree at the start, the ends and the quarters are still told apart """
+
+	xs = 10.**(3.5 + 1.e-4 * np.arange(4000))
+	xs_trans = np.linspace(5000., 7000., 201)
+	trans = np.sin((xs_trans - 5000.) / 2000. * np.pi)
+
+	trans_other = trans.copy()
+	trans_other[[10, 70, 130, 190]] *= 0.5
+
+	assert inttools.get_grid_signature(trans_other) != inttools.get_grid_signature(trans)
+
+	inttools._resampled_arrs.clear()
+	r = inttools.get_resampled_arr(xs, trans, xs_trans)
+	r_other = inttools.get_resampled_arr(xs, trans_other, xs_trans)
+
+	assert np.all(r_other == np.interp(xs, xs_trans, trans_other, left=0., right=0.))
+	assert not np.all(r_other == r)
+
+
+def test_inttools_get_resampled_arr_hit_skips_interpolation(monkeypatch):
+
+	xs = 10.**(3.5 + 1.e-4 * np.arange(4000))
+	xs_trans = np.linspace(5000., 7000., 201)
+	trans = np.sin((xs_trans - 5000.) / 2000. * np.pi)
+
+	ncalls = [0]
+	interp1d = inttools.interp1d
+
+	def interp1d_counted(*args, **kwargs):
+		ncalls[0] += 1
+		return interp1d(*args, **kwargs)
+
+	monkeypatch.setattr(inttools, 'interp1d', interp1d_counted)
+	inttools._resampled_arrs.clear()
+
+	for i in range(10):
+		inttools.int_arr_times_arr_over_dlnx(np.ones(len(xs))*i, xs, trans, xs_trans)
+
+	assert ncalls[0] == 1
+
+	# a hit is cheaper than the interpolation
+	n = 200
+	t0 = time.perf_counter()
+	for i in range(n):
+		inttools.get_resampled_arr(xs, trans, xs_trans)
+	t_hit = time.perf_counter() - t0
+
+	t0 = time.perf_counter()
+	for i in range(n):
+		interp1d(xs_trans, trans, kind='linear', bounds_error=False, fill_value=0.)(xs)
+	t_interp = time.perf_counter() - t0
+
+	assert t_hit < t_interp
+
+
 def test_inttools_arr1_contains_arr2():
 
 	arr1 = np.linspace(0., 10.)
@@ -142,3 +237,29 @@ def test_inttools_arr1_contains_arr2():
 	arr2 = np.linspace(1., 9.)
 	assert not inttools.arr1_contains_arr2(arr1, arr2)
 
+
+
+def test_inttools_calc_Fnu_in_band_uless():
+
+	ws = np.linspace(3000., 10000., 2001)
+	fl = 1.e-17 * (1. + ws/5000.)
+	ws_trans = np.linspace(5000., 7000., 81)
+	trans = np.exp(-0.5*((ws_trans-6000.)/300.)**2)
+
+	Fnu = inttools.calc_Fnu_in_band_from_fl(fl=fl*u.Unit("erg s-1 cm-2 AA-1"), ws=ws*u.AA, trans=trans, ws_trans=ws_trans*u.AA)
+	Fnu_uless = inttools.calc_Fnu_in_band_from_fl_uless(fl=fl, ws=ws, trans=trans, ws_trans=ws_trans)
+
+	assert Fnu.unit == u.Unit("erg s-1 cm-2 Hz-1")
+	assert Fnu.value == Fnu_uless
+
+	# units are converted at the boundary
+	Fnu_nm = inttools.calc_Fnu_in_band_from_fl(fl=fl*1.e17*u.Unit("1e-17 erg s-1 cm-2 AA-1"), ws=ws*u.AA, trans=trans, ws_trans=ws_trans*u.AA)
+	assert np.absolute((Fnu_nm - Fnu)/Fnu) < 1.e-10
+
+	# float32 arrays
+	Fnu_32 = inttools.calc_Fnu_in_band_from_fl_uless(fl=fl.astype('float32'), ws=ws.astype('float32'), trans=trans.astype('float32'), ws_trans=ws_trans.astype('float32'))
+	assert np.absolute((Fnu_32 - Fnu_uless)/Fnu_uless) < 1.e-5
+
+	# wrong units
+	with pytest.raises(Exception):
+		inttools.calc_Fnu_in_band_from_fl(fl=fl*u.Unit("erg s-1 cm-2 AA-1"), ws=ws, trans=trans, ws_trans=ws_trans*u.AA)
@@ -0,0 +1,77 @@
+# test_linetranstable.py
+
+import pytest
+import numpy as np
+
+from .. import linetranstable
+from .. import filterbank
+from .. import filtertools
+from ..getllambda import getllambda
+
+lines = ['Hb', 'OIII4960', 'OIII5008', 'Ha', 'NII6585', 'SII6718']
+
+
+def test_linetranstable_get_norm_trans():
+
+	survey = 'hsc'
+	ltt = linetranstable.LineTransTable(lines=lines, survey=survey)
+	fb = filterbank.get_filterbank(survey=survey)
+
+	assert ltt.trans.shape == (len(ltt.zs), len(lines), len(fb.bands))
+
+	# on the grid the table is exact
+	z = ltt.zs[4114]
+	trans = ltt.get_norm_trans(z)
+	assert trans.shape == (len(lines), len(fb.bands))
+
+	for i, line in enumerate(lines):
+		w = getllambda(ion=line)[0] * (1.+z)
+		assert np.all(trans[i] == fb.get_norm_trans(w))
+
+	# between the grid points it is close
+	zs = np.linspace(0.05, 0.9, 313)
+	trans = ltt.get_norm_trans(zs, lines=['OIII5008'], bands=['i'])
+	assert trans.shape == (len(zs), 1, 1)
+
+	trans_direct = fb.get_norm_trans(getllambda(ion='OIII5008')[0] * (1.+zs), bands=['i'])[0]
+	assert np.allclose(trans[:, 0, 0], trans_direct, atol=0.01*trans_direct.max())
+
+	# off the grid it is evaluated directly
+	trans = ltt.get_norm_trans(3.5, lines=['Hb'], bands=['y'])
+	assert trans[0, 0] == fb.get_norm_trans(getllambda(ion='Hb')[0] * 4.5, bands=['y'])[0]
+
+
+def test_linetranstable_list_lines_in_band():
+	""" agrees with the boundaries of the filterboundary files """
+
+	survey = 'hsc'
+	ltt = linetranstable.get_linetranstable(lines=lines, survey=survey)
+	assert linetranstable.get_linetranstable(lines=lines, survey=survey) is ltt
+
+	z = 0.4114
+	for band, threshold in [('i', 0.01), ('z', 0.01), ('r', 0.2), ('y', 0.2)]:
+		tab = filtertools.accessFile(filename=filtertools.get_fn_FilterBoundaries(threshold), survey=survey)
+		w1, w2 = tab[tab['band'] == band]['w1', 'w2'][0]
+		llist = [line for line in lines if w1 < getllambda(ion=line)[0] * (1.+z) < w2]
+
+		assert ltt.list_lines_in_band(z=z, band=band, threshold=threshold) == llist
+
+
+def test_linetranstable_unknown_line():
+
+	ltt = linetranstable.get_linetranstable(lines=lines, survey='hsc')
+
+	with pytest.raises(ValueError):
+		ltt.get_norm_trans(0.3, lines=['MgII2800'])
+
+
+def test_linetranstable_get_linetranstable_bounded():
+
+	ltt = linetranstable.get_linetranstable(lines=lines, survey='sdss')
+
+	for i in range(linetranstable._linetranstables_size):
+		linetranstable.get_linetranstable(lines=[lines[i % len(lines)]]*(i+1), survey='hsc')
+
+	assert len(linetranstable._linetranstables) <= linetranstable._linetranstables_size
+	assert ('sdss', tuple(lines)) not in linetranstable._linetranstables
+	assert linetranstable.get_linetranstable(lines=lines, survey='sdss') is not ltt
@@ -0,0 +1,89 @@
+# test_synphot.py
+
+import pytest
+import numpy as np
+import astropy.units as u
+import astropy.table as at
+
+from .. import synphot
+from .. import inttools
+from .. import filtertools
+
+
+def get_spectra():
+	""" return three spectra with unit 1e-17 erg/s/cm2/AA on an sdss-like log-lambda grid """
+	ws = 10.**(3.55 + 1.e-4*np.arange(4000)) * u.AA
+	x = np.array(ws/u.AA)
+	fls = np.array([np.ones(len(x)), x/5000., 1.+np.exp(-0.5*((x-6200.)/20.)**2)]) * 1.e-17*u.Unit('erg / (Angstrom cm2 s)')
+	return fls, ws
+
+
+def test_synphot_calc_Fnu_in_bands_from_fl():
+
+	survey = 'hsc'
+	fls, ws = get_spectra()
+	bands = filtertools.surveybands[survey]
+
+	Fnus = synphot.calc_Fnu_in_bands_from_fl(fls, ws, survey=survey)
+
+	assert Fnus.shape == (len(fls), len(bands))
+	assert Fnus.unit == u.Unit("erg s-1 cm-2 Hz-1")
+
+	for i, fl in enumerate(fls):
+		for j, band in enumerate(bands):
+			trans, ws_trans = filtertools.getNormTransFunc(band=band, survey=survey)
+			Fnu = inttools.calc_Fnu_in_band_from_fl(fl=fl, ws=ws, trans=trans, ws_trans=ws_trans*u.AA, isnormed=True)
+
+			assert np.isclose(Fnus[i, j].value, Fnu.value, rtol=1.e-10, atol=0.)
+
+
+def test_synphot_single_spectrum_column():
+
+	fls, ws = get_spectra()
+	tab = at.Table([ws, fls[1]], names=['ws', 'spec'])
+
+	Fnu = synphot.calc_Fnu_in_bands_from_fl(tab['spec'], tab['ws'], survey='sdss', bands=['r', 'i'])
+	Fnus = synphot.calc_Fnu_in_bands_from_fl(fls, ws, survey='sdss', bands=['r', 'i'])
+
+	assert Fnu.shape == (2, )
+	assert np.allclose(Fnu.value, Fnus[1].value, rtol=1.e-12, atol=0.)
+
+	with pytest.raises(ValueError):
+		synphot.calc_Fnu_in_bands_from_fl(fls[:, :-1], ws, survey='sdss')
+
+
+def test_synphot_get_weight_matrix_cached():
+
+	__, ws = get_spectra()
+	ws = np.array(ws/u.AA)
+
+	W = synphot.get_weight_matrix(ws, survey='sdss')
+
+	assert W.shape == (5, len(ws))
+	assert synphot.get_weight_matrix(ws.copy(), survey='sdss') is W
+	assert synphot.get_weight_matrix(ws*1.001, survey='sdss') is not W
+	assert synphot.get_weight_matrix(ws, survey='sdss', bands=['g']).shape == (1, len(ws))
+
+
+def test_synphot_get_weight_matrix_no_collision():
+	""" grids that only differ away from the start, the ends and the quarters do not share a weight matrix """
+
+	__, ws = get_spectra()
+	ws = np.array(ws/u.AA)
+
+	ws_other = ws.copy()
+	ws_other[3:len(ws)//4-1] = ws[3:len(ws)//4-1] * (1. + 1.e-6)
+
+	W = synphot.get_weight_matrix(ws, survey='sdss')
+	W_other = synphot.get_weight_matrix(ws_other, survey='sdss')
+
+	assert W_other is not W
+	assert np.allclose(W_other, synphot.calc_weight_matrix(ws_other, survey='sdss'), rtol=0., atol=0.)
+
+
+def test_synphot_calc_trapz_weights():
+
+	xs = np.log(np.linspace(1., 2., 11))
+	ys = xs**2
+
+	assert np.absolute(np.sum(synphot.calc_trapz_weights(xs)*ys) - np.trapz(ys, x=xs)) < 1.e-12
@@ -161,5 +161,5 @@ class Decomposer(Imager):
 
 
 	def _get_spector(self):
-		s = spector.Spector(obj=self.obj, survey=self.survey, z=self.z)
+		s = self._get_operator(spector.Spector, survey=self.survey, z=self.z)
 		return s
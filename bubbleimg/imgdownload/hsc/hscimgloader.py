@@ -3,7 +3,11 @@
 
 import numpy as np
 import os
+import io
+import tarfile
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import astropy.units as u
 from astropy.io import fits
 import re
@@ -17,6 +21,160 @@ nanomaggy = u.def_unit('nanomaggy', 3.631e-6*u.Jy)
 u.add_enabled_units([nanomaggy])
 u.nanomaggy=nanomaggy
 
+# the http session of this process, see get_session()
+_session = {'pid': None, 'session': None, 'pool_maxsize': None}
+_session_lock = threading.Lock()
+
+
+def get_session(pool_maxsize=10):
+	"""
+	return the requests.Session shared by all the hscimgLoaders of this process, which keeps the connections to the hsc servers alive across requests such that each download does not pay for new TCP and TLS handshakes. The session is created on the first call, and again in a child process (e.g., of multiprocessing.Pool) or if a larger pool_maxsize is asked for. 
+
+	Params
+	------
+	pool_maxsize=10 (int): 
+		maximum number of connections kept alive per host, should be no less than the number of concurrent downloads
+
+	Return
+	------
+	session (requests.Session)
+	"""
+	with _session_lock:
+		if (_session['session'] is None) or (_session['pid'] != os.getpid()) or (_session['pool_maxsize'] < pool_maxsize):
+			session = requests.Session()
+			adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+			session.mount('https://', adapter)
+			session.mount('http://', adapter)
+
+			_session.update(pid=os.getpid(), session=session, pool_maxsize=pool_maxsize)
+
+		return _session['session']
+
+
+def make_stamps_bulk(loaders, overwrite=False, n_per_request=1000, imgtype='coadd', tract='', n_trials=5, host=hscurl.host):
+	"""
+	make the stamps of all bands of many objects with bulk requests to HSC DAS Quarry, each of which submits the cutouts of up to n_per_request (object, band) pairs as one list and returns them as one tar archive, which is unpacked into the stamps of the objects. Stamps that exist are skipped unless overwrite. The loaders are requested separately for each of their release_version, as the data release is part of the url, and the credentials of the first loader of each are used. 
+
+	Params
+	------
+	loaders (list of hscimgLoader)
+	overwrite=False (bool)
+	n_per_request=1000 (int): maximum number of cutouts per bulk request
+	imgtype='coadd'
+	tract=''
+	n_trials=5
+	host=hscurl.host (str): the DAS server
+
+	Return
+	------
+	statuss (list of bool): for each loader, True if the stamps of all bands exist
+	"""
+	def make_row(L, band):
+		sw, sh = L._get_stamp_semi_sizes()
+		return dict(ra=L.ra, dec=L.dec, band=band, rerun=L.rerun, tract=tract, imgtype=imgtype, sw=sw, sh=sh)
+
+	def write_file(L, fn, content):
+		L._write_fits_unit_specified_in_nanomaggy(filein=io.BytesIO(content), fileout=L.dir_obj+fn)
+
+	statuss = [None] * len(loaders)
+	release_versions = [L.release_version for L in loaders]
+
+	for release_version in sorted(set(release_versions), key=release_versions.index):
+		iloaders = [i for i, rv in enumerate(release_versions) if rv == release_version]
+		url = hscurl.get_hsc_cutout_bulk_url(release_version=release_version, host=host)
+
+		statuss_rv = _make_files_bulk([loaders[i] for i in iloaders], func_naming_file=lambda m, band: m.get_fn_stamp(band), func_make_row=make_row, func_make_list=hscurl.make_hsc_cutout_bulk_list, func_write_file=write_file, url=url, overwrite=overwrite, n_per_request=n_per_request, n_trials=n_trials)
+
+		for i, status in zip(iloaders, statuss_rv):
+			statuss[i] = status
+
+	return statuss
+
+
+def make_psfs_bulk(loaders, overwrite=False, n_per_request=1000, imgtype='coadd', tract='', patch_s='', n_trials=5, host=hscurl.host):
+	"""
+	make the psfs of all bands of many objects with bulk requests to the HSC PSF picker, see make_stamps_bulk(). 
+
+	Params
+	------
+	loaders (list of hscimgLoader)
+	overwrite=False (bool)
+	n_per_request=1000 (int): maximum number of psfs per bulk request
+	imgtype='coadd'
+	tract=''
+	patch_s=''
+	n_trials=5
+	host=hscurl.host (str): the PSF picker server
+
+	Return
+	------
+	statuss (list of bool): for each loader, True if the psfs of all bands exist
+	"""
+	def make_row(L, band):
+		return dict(ra=L.ra, dec=L.dec, band=band, rerun=L.rerun, tract=tract, patch=patch_s, imgtype=imgtype)
+
+	def write_file(L, fn, content):
+		with open(L.dir_obj+fn, 'wb') as out:
+			out.write(content)
+
+	return _make_files_bulk(loaders, func_naming_file=lambda m, band: m.get_fn_psf(band), func_make_row=make_row, func_make_list=hscurl.make_hsc_psf_bulk_list, func_write_file=write_file, url=hscurl.get_hsc_psf_bulk_url(host=host), overwrite=overwrite, n_per_request=n_per_request, n_trials=n_trials)
+
+
+def _make_files_bulk(loaders, func_naming_file, func_make_row, func_make_list, func_write_file, url, overwrite=False, n_per_request=1000, n_trials=5):
+	"""
+	the core of make_stamps_bulk() and make_psfs_bulk(). The (loader, band) pairs whose files are to be made are submitted in lists of up to n_per_request lines. Each file of the returned tar archive is matched to its request by the line number that prefixes its filename, see hscurl.bulk_first_lineno, and written by func_write_file(L, fn, content). 
+
+	Params
+	------
+	loaders (list of hscimgLoader)
+	func_naming_file (function): takes (imager of L, band) and returns the filename
+	func_make_row (function): takes (L, band) and returns the request as dict
+	func_make_list (function): takes a list of requests and returns the text of the list
+	func_write_file (function): takes (L, fn, content)
+	url (str)
+	overwrite=False (bool)
+	n_per_request=1000 (int)
+	n_trials=5 (int)
+
+	Return
+	------
+	statuss (list of bool): for each loader, True if the files of all bands exist
+	"""
+	fns = {}
+	tasks = []
+	for L in loaders:
+		if L.status:
+			if not os.path.isdir(L.dir_obj):
+				os.makedirs(L.dir_obj)
+
+			m = L.get_imager()
+			for band in L.bands:
+				fns[(id(L), band)] = func_naming_file(m, band)
+				if overwrite or (not os.path.isfile(L.dir_obj+fns[(id(L), band)])):
+					tasks += [(L, band)]
+
+	for i0 in range(0, len(tasks), n_per_request):
+		chunk = tasks[i0:i0+n_per_request]
+		print(("[hscimgloader] requesting {} files in bulk".format(len(chunk))))
+
+		text = func_make_list([func_make_row(L, band) for L, band in chunk])
+		rqst = chunk[0][0]._retry_request(url, n_trials=n_trials, files={'list': ('list.txt', text)})
+
+		if (rqst is None) or (rqst.status_code != 200):
+			print("[hscimgloader] bulk request failed")
+			continue
+
+		with tarfile.open(fileobj=io.BytesIO(rqst.content), mode='r:*') as tar:
+			for member in tar.getmembers():
+				lineno = re.match(r'^(\d+)-', os.path.basename(member.name))
+				if member.isfile() and (lineno is not None):
+					i = int(lineno.group(1)) - hscurl.bulk_first_lineno
+					if 0 <= i < len(chunk):
+						L, band = chunk[i]
+						func_write_file(L, fns[(id(L), band)], tar.extractfile(member).read())
+
+	return [L.status and all(os.path.isfile(L.dir_obj+fns[(id(L), band)]) for band in L.bands) for L in loaders]
+
 
 class hscimgLoader(imgLoader):
 
@@ -40,6 +198,8 @@ class hscimgLoader(imgLoader):
 		release_version = 'dr1' (str)
 		username (optional) (str): STARs account
 		password (optional) (str): STARs account
+		n_threads = 5 (int): number of bands downloaded concurrently by make_stamps() and make_psfs()
+		pool_maxsize = 10 (int): size of the connection pool of the http session, see get_session()
 
 
 		Public Methods
@@ -55,6 +215,15 @@ class hscimgLoader(imgLoader):
 		make_psfs(self, overwrite=False, to_keep_calexp=False)
 
 
+		Bulk mode
+		---------
+		make_stamps_bulk(loaders, overwrite=False, n_per_request=1000)
+
+		make_psfs_bulk(loaders, overwrite=False, n_per_request=1000)
+
+			module functions that download the stamps or psfs of many loaders in bulk requests
+
+
 		Instruction for stars username and password
 		-------------------------------------------
 		1) as arguments 
@@ -80,6 +249,8 @@ class hscimgLoader(imgLoader):
 		bands = ['g', 'r', 'i', 'z', 'y']
 		username
 		password
+		n_threads
+		pool_maxsize
 		status (bool)
 			whether an hsc object is successfully identified
 
@@ -90,6 +261,8 @@ class hscimgLoader(imgLoader):
 		self.rerun = kwargs.pop('rerun', 's16a_wide')
 		self.semester = self.rerun.split('_')[0]
 		self.release_version = kwargs.pop('release_version', 'dr1')
+		self.n_threads = kwargs.pop('n_threads', 5)
+		self.pool_maxsize = kwargs.pop('pool_maxsize', 10)
 
 		# set hsc object parameters
 		self.status = super(self.__class__, self).add_obj_hsc(update=False, release_version=self.release_version, rerun=self.rerun)
@@ -135,9 +308,9 @@ class hscimgLoader(imgLoader):
 
 	def make_stamps(self, overwrite=False, **kwargs):
 		"""
-		make stamps of all bands, see make_stamp()
+		make stamps of all bands, see make_stamp(). The bands are downloaded concurrently with self.n_threads threads. 
 		"""
-		return self._imgLoader__make_files_core(func_download_file=self._download_stamp, func_naming_file=self.get_fn_stamp, overwrite=overwrite, **kwargs)
+		return self._imgLoader__make_files_core(func_download_file=self._download_stamp, func_naming_file=self.get_fn_stamp, overwrite=overwrite, n_threads=self.n_threads, **kwargs)
 
 
 	def _download_stamp(self, band, imgtype='coadd', tract='', tokeepraw=False, n_trials=5):
@@ -157,7 +330,7 @@ class hscimgLoader(imgLoader):
 		imgtype='coadd'
 		tract=''
 		tokeepraw = False (bool): 
-			whether to keep the downloaded raw HSC image, which has four extensions. 
+			whether to also write the downloaded raw HSC image, which has four extensions, to a file. The raw image is otherwise only kept in memory. 
 		n_trials=5
 			how many times to retry requesting if there is requests errors such as connection error. 
 
@@ -171,31 +344,40 @@ class hscimgLoader(imgLoader):
 		# setting 
 		fp_out = self.get_fp_stamp(band)
 
-		semi_width_inarcsec = (self.img_width_arcsec.to(u.arcsec).value/2.)-0.1 # to get pix number right
-		semi_height_inarcsec = (self.img_height_arcsec.to(u.arcsec).value/2.)-0.1
-		sw = '%.5f'%semi_width_inarcsec+'asec'
-		sh = '%.5f'%semi_height_inarcsec+'asec'
+		sw, sh = self._get_stamp_semi_sizes()
 
 		# get url
-		url = hscurl.get_hsc_cutout_url(self.ra, self.dec, band=band, rerun=rerun, tract=tract, imgtype=imgtype, sw=sw, sh=sh)
+		url = hscurl.get_hsc_cutout_url(self.ra, self.dec, band=band, rerun=rerun, tract=tract, imgtype=imgtype, sw=sw, sh=sh, release_version=self.release_version)
 
-		# query, download, and convert to new unit
-		# writing two files (if successful): raw img file and stamp img file. 
-		rqst = self._retry_request(url, n_trials=n_trials)
+		# query, download into memory, and convert to new unit
+		# writing one file (if successful): stamp img file, and the raw img file if tokeepraw
+		rqst = self._retry_request(url, n_trials=n_trials, stream=True)
 
 		if rqst.status_code == 200:
-			fp_raw = self._write_request_to_file(rqst)
-			self._write_fits_unit_specified_in_nanomaggy(filein=fp_raw, fileout=fp_out)
+			buf = self._read_request_to_buffer(rqst)
+
+			if tokeepraw:
+				with open(self.dir_obj+self._get_request_filename(rqst), 'wb') as out:
+					out.write(buf.getvalue())
 
-			if not tokeepraw:
-				os.remove(fp_raw)
+			self._write_fits_unit_specified_in_nanomaggy(filein=buf, fileout=fp_out)
 
 			return True
 		else:  
+			rqst.close()
 			print("[hscimgloader] image cannot be retrieved")
 			return False
 
 
+	def _get_stamp_semi_sizes(self):
+		""" return the semi width and semi height of the stamp as strings for the das quarry, e.g., '6.27000asec' """
+		semi_width_inarcsec = (self.img_width_arcsec.to(u.arcsec).value/2.)-0.1 # to get pix number right
+		semi_height_inarcsec = (self.img_height_arcsec.to(u.arcsec).value/2.)-0.1
+		sw = '%.5f'%semi_width_inarcsec+'asec'
+		sh = '%.5f'%semi_height_inarcsec+'asec'
+		return sw, sh
+
+
 	def make_psf(self, band, overwrite=False, **kwargs):
 		"""
 		make psf image of the specified band of the object.  See _download_psf() for details. 
@@ -216,9 +398,9 @@ class hscimgLoader(imgLoader):
 
 	def make_psfs(self, overwrite=False, **kwargs):
 		"""
-		make psfs of all bands, see make_psf()
+		make psfs of all bands, see make_psf(). The bands are downloaded concurrently with self.n_threads threads. 
 		"""
-		return self._imgLoader__make_files_core(func_download_file=self._download_psf, func_naming_file=self.get_fn_psf, overwrite=overwrite, **kwargs)
+		return self._imgLoader__make_files_core(func_download_file=self._download_psf, func_naming_file=self.get_fn_psf, overwrite=overwrite, n_threads=self.n_threads, **kwargs)
 
 
 	def _download_psf(self, band, imgtype='coadd', rerun='', tract='', patch_s='', n_trials=5):
@@ -252,31 +434,37 @@ class hscimgLoader(imgLoader):
 		url = hscurl.get_hsc_psf_url(ra=self.ra, dec=self.dec, band=band, rerun=rerun, tract=tract, patch=patch_s, imgtype=imgtype)
 
 		# download
-		rqst = self._retry_request(url, n_trials=n_trials)
+		rqst = self._retry_request(url, n_trials=n_trials, stream=True)
 
 		if rqst.status_code == 200:
 			self._write_request_to_file(rqst, fn=os.path.basename(fp_out))
 
 			return True
 		else:  
+			rqst.close()
 			print("[hscimgloader] psf cannot be retrieved")
 			return False
 
 
-	def _retry_request(self, url, n_trials=5):
+	def _retry_request(self, url, n_trials=5, files=None, stream=False):
 		"""
-		request url and retries for up to n_trials times if requests exceptions are raised, such as ConnectionErrors. Uses self.__username self.__password as authentication. 
+		request url and retries for up to n_trials times if requests exceptions are raised, such as ConnectionErrors. Uses self.__username self.__password as authentication. The request goes through the pooled session of the process, see get_session(). If files is given, e.g., the list of a bulk request, then they are posted to url instead. If stream then the content is not downloaded until it is read, e.g., by _read_request_to_buffer(). 
 		"""
+		session = get_session(pool_maxsize=self.pool_maxsize)
+
 		for _ in range(n_trials):
 			try:
-				rqst = requests.get(url, auth=(self.__username, self.__password))
+				if files is None:
+					rqst = session.get(url, auth=(self.__username, self.__password), stream=stream)
+				else:
+					rqst = session.post(url, files=files, auth=(self.__username, self.__password))
 				return rqst
 				break
 			except requests.exceptions.RequestException as e:
 				print(("[hscimgloader] retrying as error detected: "+str(e)))
 
 
-	def _write_request_to_file(self, rqst, fn=''):
+	def _write_request_to_file(self, rqst, fn='', chunk_size=2**20):
 		""" 
 		write requested file under self.dir_obj with original filename unless filename specified
 
@@ -285,24 +473,50 @@ class hscimgLoader(imgLoader):
 		rqst: request result
 		fn ='' (str):
 			the filename to be saved to. default: use original filename. 
+		chunk_size=2**20 (int): number of bytes read at a time
 
 		Return
 		--------
 		fp_out (string): the entire filepath to the file written
 		"""
-		d = rqst.headers['content-disposition']
-
 		if fn == '':
-			fn = re.findall("filename=(.+)", d)[0][1:-1]
+			fn = self._get_request_filename(rqst)
 
 		fp_out = self.dir_obj + fn
 
 		with open(fp_out, 'wb') as out:
-			for bits in rqst.iter_content():
+			for bits in rqst.iter_content(chunk_size=chunk_size):
 				out.write(bits)
 		return fp_out
 
 
+	def _read_request_to_buffer(self, rqst, chunk_size=2**20):
+		""" 
+		read requested file into an in-memory buffer, which can be opened by fits.open() without writing a file
+
+		Args
+		--------
+		rqst: request result
+		chunk_size=2**20 (int): number of bytes read at a time
+
+		Return
+		--------
+		buf (io.BytesIO): rewound to the start
+		"""
+		buf = io.BytesIO()
+		for bits in rqst.iter_content(chunk_size=chunk_size):
+			buf.write(bits)
+
+		buf.seek(0)
+		return buf
+
+
+	def _get_request_filename(self, rqst):
+		""" return the original filename of the requested file from its content-disposition """
+		d = rqst.headers['content-disposition']
+		return re.findall("filename=(.+)", d)[0][1:-1]
+
+
 
 
 	def _write_fits_unit_converted_to_nanomaggy(self, filein, fileout):
@@ -356,7 +570,7 @@ class hscimgLoader(imgLoader):
 		Convert a raw hsc image to an image with unit nanomaggy, the data values unchanged. 
 		Take only the second hdu hdu[1] as data in output. 
 
-		read in fits file filein with no bunit but FLUXMAG0 and convert to one fits file with unit nanomaggy, and write to fileout. 
+		read in fits file filein with no bunit but FLUXMAG0 and convert to one fits file with unit nanomaggy, and write to fileout. filein can be a path or a file-like object, e.g., the io.BytesIO from _read_request_to_buffer(). 
 
 		Notes on Unit conversion
 		-----------
@@ -378,21 +592,21 @@ class hscimgLoader(imgLoader):
 			nanomaggy_per_raw_unit = fluxmag0 * 10**-9
 
 		"""
-		hdu = fits.open(filein)
-		header_combine = hdu[1].header+hdu[0].header
-
-		# sanity check
-		if header_combine['FLUXMAG0'] != 63095734448.0194: 
-			raise ValueError("HSC FLUXMAG0 different from assumed")
-		
-		if 'BUNIT' in header_combine: 
-			raise ValueError("Input fits file should not have BUNIT")
-		
-		bunit = '1.58479740e-02 nanomaggy'
-		header_combine.set(keyword='BUNIT', value=bunit, comment="1 nanomaggy = 3.631e-6 Jy")
-		header_combine['COMMENT'] = "Unit specified in nanomaggy by ALS"
-
-		data = hdu[1].data
-		hdu_abbrv = fits.PrimaryHDU(data, header=header_combine)
-		hdu_abbrv.writeto(fileout, overwrite=True)
+		with fits.open(filein) as hdu:
+			header_combine = hdu[1].header+hdu[0].header
+
+			# sanity check
+			if header_combine['FLUXMAG0'] != 63095734448.0194: 
+				raise ValueError("HSC FLUXMAG0 different from assumed")
+			
+			if 'BUNIT' in header_combine: 
+				raise ValueError("Input fits file should not have BUNIT")
+			
+			bunit = '1.58479740e-02 nanomaggy'
+			header_combine.set(keyword='BUNIT', value=bunit, comment="1 nanomaggy = 3.631e-6 Jy")
+			header_combine['COMMENT'] = "Unit specified in nanomaggy by ALS"
+
+			data = hdu[1].data
+			hdu_abbrv = fits.PrimaryHDU(data, header=header_combine)
+			hdu_abbrv.writeto(fileout, overwrite=True)
 
@@ -2,7 +2,7 @@
 # ALS 2017/06/28
 
 
-def get_hsc_cutout_url(ra, dec, band='i', rerun='', tract='', imgtype='coadd', sw='5asec', sh='5asec', mask='on', variance='on'):
+def get_hsc_cutout_url(ra, dec, band='i', rerun='', tract='', imgtype='coadd', sw='5asec', sh='5asec', mask='on', variance='on', release_version='dr1'):
 	"""
 	see hsc query manual
 	https://hscdata.mtk.nao.ac.jp/das_quarry/manual.html 
@@ -14,7 +14,7 @@ def get_hsc_cutout_url(ra, dec, band='i', rerun='', tract='', imgtype='coadd', s
 	# old
 	# url = 'https://hscdata.mtk.nao.ac.jp:4443/das_quarry/cgi-bin/quarryImage?ra={0}&dec={1}&sw={2}&sh={3}&type={4}&image=on&mask={5}&variance={6}&filter=HSC-{7}&tract={8}&rerun={9}'.format(ra, dec, sw, sh, imgtype, mask, variance, band.capitalize(), tract, rerun)
 
-	url = 'https://hscdata.mtk.nao.ac.jp/das_quarry/dr1/cgi-bin/quarryImage?ra={0}&dec={1}&sw={2}&sh={3}&type={4}&image=on&mask={5}&variance={6}&filter=HSC-{7}&tract={8}&rerun={9}'.format(ra, dec, sw, sh, imgtype, mask, variance, band.capitalize(), tract, rerun)
+	url = 'https://hscdata.mtk.nao.ac.jp/das_quarry/{10}/cgi-bin/quarryImage?ra={0}&dec={1}&sw={2}&sh={3}&type={4}&image=on&mask={5}&variance={6}&filter=HSC-{7}&tract={8}&rerun={9}'.format(ra, dec, sw, sh, imgtype, mask, variance, band.capitalize(), tract, rerun, release_version)
 
 	return url
 
@@ -28,3 +28,72 @@ def get_hsc_psf_url(ra, dec, band='i', rerun='', tract='', patch='', imgtype='co
 	url = 'https://hscdata.mtk.nao.ac.jp/psf/4/cgi/getpsf?ra={ra}&dec={dec}&filter={band}&rerun={rerun}&tract={tract}&patch={patch}&type={imgtype}'.format(ra=ra, dec=dec, band=band, rerun=rerun, tract=tract, patch=patch, imgtype=imgtype)
 	return url
 
+
+
+# bulk mode
+# the files in the returned archive are prefixed by the line number of their request in the list, where the heading of the list is line 1
+host = 'https://hscdata.mtk.nao.ac.jp'
+bulk_first_lineno = 2
+
+
+def get_hsc_cutout_bulk_url(release_version='dr1', host=host):
+	"""
+	url to submit a list of cutout requests of the data release release_version in bulk mode, see make_hsc_cutout_bulk_list()
+	https://hscdata.mtk.nao.ac.jp/das_quarry/manual.html 
+	"""
+	return '{host}/das_quarry/{release_version}/cgi-bin/quarryImage'.format(host=host, release_version=release_version)
+
+
+def get_hsc_psf_bulk_url(host=host):
+	"""
+	url to submit a list of psf requests in bulk mode, see make_hsc_psf_bulk_list()
+	https://hscdata.mtk.nao.ac.jp/psf/4/manual.html#Bulk_mode
+	"""
+	return '{host}/psf/4/cgi/getpsf?bulk=on'.format(host=host)
+
+
+def make_hsc_cutout_bulk_list(rows):
+	"""
+	return the text of the list of cutout requests for bulk mode, one line per request
+
+	Params
+	------
+	rows (list of dict):
+		each with keys 'ra', 'dec', 'band', 'rerun', 'tract', 'imgtype', 'sw', 'sh', and optionally 'mask', 'variance', see get_hsc_cutout_url()
+
+	Return
+	------
+	text (str)
+	"""
+	lines = ['#? rerun filter ra dec sw sh type image mask variance tract']
+
+	for row in rows:
+		lines += ['{rerun} HSC-{band} {ra} {dec} {sw} {sh} {imgtype} true {mask} {variance} {tract}'.format(rerun=row['rerun'], band=row['band'].capitalize(), ra=row['ra'], dec=row['dec'], sw=row['sw'], sh=row['sh'], imgtype=row['imgtype'], mask=_bulk_bool(row.get('mask', 'on')), variance=_bulk_bool(row.get('variance', 'on')), tract=row['tract'] or '-')]
+
+	return '\n'.join(lines)+'\n'
+
+
+def make_hsc_psf_bulk_list(rows):
+	"""
+	return the text of the list of psf requests for bulk mode, one line per request
+
+	Params
+	------
+	rows (list of dict):
+		each with keys 'ra', 'dec', 'band', 'rerun', 'tract', 'patch', 'imgtype', see get_hsc_psf_url()
+
+	Return
+	------
+	text (str)
+	"""
+	lines = ['#? ra dec filter rerun type tract patch']
+
+	for row in rows:
+		lines += ['{ra} {dec} {band} {rerun} {imgtype} {tract} {patch}'.format(ra=row['ra'], dec=row['dec'], band=row['band'], rerun=row['rerun'], imgtype=row['imgtype'], tract=row['tract'] or '-', patch=row['patch'] or '-')]
+
+	return '\n'.join(lines)+'\n'
+
+
+def _bulk_bool(value):
+	""" translate 'on'/'off' of the url parameters to the true/false of the bulk list """
+	return 'true' if value == 'on' else 'false'
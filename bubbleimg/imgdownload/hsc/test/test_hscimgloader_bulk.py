@@ -0,0 +1,270 @@
+# test_hscimgloader_bulk.py
+
+"""
+to be used with pytest
+
+test sets for the bulk mode and the in-memory stamp conversion of hscimgloader against a local mock of the DAS Quarry and the PSF picker, which serves in a thread and does not need a connection to the hsc servers
+
+"""
+import numpy as np
+import astropy.units as u
+import io
+import email
+import tarfile
+import threading
+import http.server
+import urllib.parse
+import shutil
+import os
+import pytest
+from astropy.io import fits
+
+from .. import hscimgloader
+from .. import hscurl
+from ..hscimgloader import hscimgLoader
+from .... import obsobj
+
+dir_parent = './testing/'
+radecs = [(140.099341430207, 0.580162492432517), (150.1, 2.2), (35.5, -4.3)]
+username = 'user'
+password = 'pass'
+
+
+class MockDASHandler(http.server.BaseHTTPRequestHandler):
+	""" mock of DAS Quarry and PSF picker, which returns a tar of one file per line of the posted list in bulk mode """
+
+	requests_received = []
+
+	def do_GET(self):
+		query = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+		data = _make_cutout(dict(ra=query['ra'], filter=query['filter']))
+
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/fits')
+		self.send_header('Content-Disposition', 'attachment; filename="cutout-{}-0-s16a_wide.fits"'.format(query['filter']))
+		self.send_header('Content-Length', str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def do_POST(self):
+		length = int(self.headers['Content-Length'])
+		body = self.rfile.read(length)
+		msg = email.message_from_bytes(b'Content-Type: '+self.headers['Content-Type'].encode()+b'\r\n\r\n'+body)
+		text = [part.get_payload(decode=True) for part in msg.get_payload() if part.get_param('name', header='content-disposition') == 'list'][0].decode()
+
+		self.requests_received.append((self.path, self.headers['Authorization'], text))
+
+		lines = text.strip().split('\n')
+		columns = lines[0].split()[1:]
+
+		content = io.BytesIO()
+		with tarfile.open(fileobj=content, mode='w') as tar:
+			for lineno, line in enumerate(lines[1:], start=2):
+				row = dict(list(zip(columns, line.split())))
+
+				if float(row['ra']) == radecs[2][0]: # no coverage
+					continue
+
+				if 'psf' in self.path:
+					fn = 'arch/{}-psf-calexp-{}-{}.fits'.format(lineno, row['rerun'], row['filter'])
+					data = _make_psf(row)
+				else:
+					fn = 'arch/{}-cutout-{}-0-{}.fits'.format(lineno, row['filter'], row['rerun'])
+					data = _make_cutout(row)
+
+				info = tarfile.TarInfo(fn)
+				info.size = len(data)
+				tar.addfile(info, io.BytesIO(data))
+
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/x-tar')
+		self.end_headers()
+		self.wfile.write(content.getvalue())
+
+	def log_message(self, format, *args):
+		pass
+
+
+def _make_cutout(row):
+	""" a raw hsc cutout, with the ra and band encoded in the data """
+	hdu0 = fits.PrimaryHDU()
+	hdu0.header['FLUXMAG0'] = 63095734448.0194
+	hdu0.header['FILTER'] = row['filter']
+	hdu1 = fits.ImageHDU(np.full((4, 4), float(row['ra']), dtype='float32'))
+	out = io.BytesIO()
+	fits.HDUList([hdu0, hdu1]).writeto(out)
+	return out.getvalue()
+
+
+def _make_psf(row):
+	hdu0 = fits.PrimaryHDU(np.full((3, 3), float(row['ra']), dtype='float32'))
+	hdu0.header['FILTER'] = row['filter']
+	out = io.BytesIO()
+	hdu0.writeto(out)
+	return out.getvalue()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setUp_tearDown():
+	""" rm ./testing/ before and after test"""
+
+	# setup
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+	yield
+	# tear down
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+
+@pytest.fixture(scope="module")
+def host():
+	""" serve the mock DAS in a thread and return its url """
+	server = http.server.HTTPServer(('127.0.0.1', 0), MockDASHandler)
+	thread = threading.Thread(target=server.serve_forever)
+	thread.daemon = True
+	thread.start()
+
+	yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+	server.shutdown()
+	server.server_close()
+
+
+@pytest.fixture
+def loaders():
+	""" returns hscimgLoaders with the attributes needed to make files, without querying hsc """
+	loaders = []
+	for ra, dec in radecs:
+		obj = obsobj.obsObj(ra=ra, dec=dec, dir_parent=dir_parent)
+		obj.add_hsc = lambda **kwargs: True # skip hsc query
+
+		L = hscimgLoader.__new__(hscimgLoader)
+		L.obj = obj
+		L.ra = ra
+		L.dec = dec
+		L.dir_obj = obj.dir_obj
+		L.survey = 'hsc'
+		L.status = True
+		L.bands = ['g', 'r', 'i', 'z', 'y']
+		L.rerun = 's16a_wide'
+		L.release_version = 'dr1'
+		L.img_width_arcsec = 128*0.168*u.arcsec
+		L.img_height_arcsec = 128*0.168*u.arcsec
+		L.pool_maxsize = 10
+		L._hscimgLoader__username = username
+		L._hscimgLoader__password = password
+		loaders += [L]
+
+	return loaders
+
+
+def test_make_hsc_cutout_bulk_list():
+	rows = [dict(ra=1., dec=2., band='r', rerun='s16a_wide', tract='', imgtype='coadd', sw='5asec', sh='5asec')]
+	text = hscurl.make_hsc_cutout_bulk_list(rows)
+
+	assert text == '#? rerun filter ra dec sw sh type image mask variance tract\ns16a_wide HSC-R 1.0 2.0 5asec 5asec coadd true true true -\n'
+
+
+def test_make_stamps_bulk(host, loaders):
+	""" test that the stamps of all objects and bands are made from one request """
+	MockDASHandler.requests_received[:] = []
+
+	statuss = hscimgloader.make_stamps_bulk(loaders, host=host)
+
+	assert statuss == [True, True, False]
+	assert len(MockDASHandler.requests_received) == 1
+
+	path, auth, text = MockDASHandler.requests_received[0]
+	assert path == '/das_quarry/dr1/cgi-bin/quarryImage'
+	assert auth is not None
+	assert len(text.strip().split('\n')) == 1 + 3*5
+
+	for L in loaders[:2]:
+		for band in L.bands:
+			hdus = fits.open(L.dir_obj+'stamp-{}.fits'.format(band))
+			assert len(hdus) == 1
+			assert hdus[0].header['FILTER'] == 'HSC-{}'.format(band.upper())
+			assert hdus[0].header['BUNIT'] == '1.58479740e-02 nanomaggy'
+			assert np.all(hdus[0].data == np.float32(L.ra))
+
+	assert not os.path.isfile(loaders[2].dir_obj+'stamp-r.fits')
+
+
+def test_make_stamps_bulk_release_version(host, loaders):
+	""" test that the stamps are requested from the data release of each loader """
+	MockDASHandler.requests_received[:] = []
+
+	loaders[1].release_version = 'pdr1'
+	statuss = hscimgloader.make_stamps_bulk(loaders, overwrite=True, host=host)
+
+	assert statuss == [True, True, False]
+	assert len(MockDASHandler.requests_received) == 2
+
+	(path_dr1, __, text_dr1), (path_pdr1, __, text_pdr1) = MockDASHandler.requests_received
+	assert path_dr1 == '/das_quarry/dr1/cgi-bin/quarryImage'
+	assert path_pdr1 == '/das_quarry/pdr1/cgi-bin/quarryImage'
+	assert len(text_dr1.strip().split('\n')) == 1 + 2*5
+	assert len(text_pdr1.strip().split('\n')) == 1 + 5
+
+
+def test_get_hsc_cutout_url_release_version():
+	assert hscurl.get_hsc_cutout_bulk_url(host='https://hsc') == 'https://hsc/das_quarry/dr1/cgi-bin/quarryImage'
+	assert hscurl.get_hsc_cutout_bulk_url(release_version='pdr2', host='https://hsc') == 'https://hsc/das_quarry/pdr2/cgi-bin/quarryImage'
+	assert '/das_quarry/pdr2/' in hscurl.get_hsc_cutout_url(1., 2., release_version='pdr2')
+
+
+def test_make_stamps_bulk_skip_and_chunk(host, loaders):
+	""" test that existing stamps are skipped and that requests are split into chunks """
+	MockDASHandler.requests_received[:] = []
+
+	statuss = hscimgloader.make_stamps_bulk(loaders, host=host)
+	assert statuss == [True, True, False]
+	assert len(MockDASHandler.requests_received) == 1
+	assert len(MockDASHandler.requests_received[0][2].strip().split('\n')) == 1 + 5
+
+	MockDASHandler.requests_received[:] = []
+	statuss = hscimgloader.make_stamps_bulk(loaders, overwrite=True, n_per_request=4, host=host)
+	assert statuss == [True, True, False]
+	assert len(MockDASHandler.requests_received) == 4
+
+
+def test_make_psfs_bulk(host, loaders):
+	""" test that the psfs of all objects and bands are made """
+	MockDASHandler.requests_received[:] = []
+
+	statuss = hscimgloader.make_psfs_bulk(loaders, host=host)
+
+	assert statuss == [True, True, False]
+	assert MockDASHandler.requests_received[0][0] == '/psf/4/cgi/getpsf?bulk=on'
+
+	for L in loaders[:2]:
+		for band in L.bands:
+			hdus = fits.open(L.dir_obj+'psf-{}.fits'.format(band))
+			assert hdus[0].header['FILTER'] == band
+			assert np.all(hdus[0].data == np.float32(L.ra))
+
+
+def test_download_stamp_in_memory(host, loaders, monkeypatch):
+	""" test that the stamp is converted from the downloaded bytes in memory without writing the raw file """
+	L = loaders[0]
+	monkeypatch.setattr(hscurl, 'get_hsc_cutout_url', lambda ra, dec, band, **kwargs: '{}/das_quarry/dr1/cgi-bin/quarryImage?ra={}&dec={}&filter=HSC-{}'.format(host, ra, dec, band.upper()))
+
+	fns_before = set(os.listdir(L.dir_obj))
+	status = L._download_stamp(band='g')
+
+	assert status
+	assert set(os.listdir(L.dir_obj)) == fns_before | {'stamp-g.fits'}
+
+	hdus = fits.open(L.dir_obj+'stamp-g.fits')
+	assert len(hdus) == 1
+	assert hdus[0].header['BUNIT'] == '1.58479740e-02 nanomaggy'
+	assert hdus[0].header['FILTER'] == 'HSC-G'
+	assert np.all(hdus[0].data == np.float32(L.ra))
+
+	status = L._download_stamp(band='r', tokeepraw=True)
+
+	assert status
+	assert os.path.isfile(L.dir_obj+'cutout-HSC-R-0-s16a_wide.fits')
+	assert len(fits.open(L.dir_obj+'cutout-HSC-R-0-s16a_wide.fits')) == 2
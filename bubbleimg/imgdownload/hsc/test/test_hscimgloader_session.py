@@ -0,0 +1,93 @@
+# test_hscimgloader_session.py
+
+"""
+to be used with pytest
+
+test sets for the pooled http session and the concurrent band downloads of hscimgloader, which do not need a connection to the hsc servers
+
+"""
+import threading
+import shutil
+import os
+import pytest
+from requests.adapters import HTTPAdapter
+
+from .. import hscimgloader
+from ..hscimgloader import hscimgLoader
+
+dir_parent = './testing/'
+dir_obj = './testing/SDSSJ0920+0034/'
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setUp_tearDown():
+	""" rm ./testing/ before and after test"""
+
+	# setup
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+	yield
+	# tear down
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+
+@pytest.fixture
+def L_offline():
+	""" returns a hscimgLoader with only the attributes needed to make files, without querying hsc """
+	L = hscimgLoader.__new__(hscimgLoader)
+	L.survey = 'hsc'
+	L.status = True
+	L.dir_obj = dir_obj
+	L.n_threads = 5
+	L.pool_maxsize = 10
+	return L
+
+
+def test_get_session_shared():
+	""" test that the session is created once per process and is pooled """
+	s1 = hscimgloader.get_session(pool_maxsize=10)
+	s2 = hscimgloader.get_session(pool_maxsize=5)
+
+	assert s1 is s2
+
+	adapter = s1.get_adapter('https://hscdata.mtk.nao.ac.jp/')
+	assert isinstance(adapter, HTTPAdapter)
+	assert adapter._pool_maxsize == 10
+
+
+def test_get_session_larger_pool():
+	""" test that the session is recreated if a larger pool is asked for """
+	s1 = hscimgloader.get_session(pool_maxsize=10)
+	s2 = hscimgloader.get_session(pool_maxsize=20)
+
+	assert s1 is not s2
+	assert s2.get_adapter('https://hscdata.mtk.nao.ac.jp/')._pool_maxsize == 20
+
+
+def test_make_files_core_concurrent(L_offline):
+	""" test that the five bands are downloaded at the same time """
+	L = L_offline
+	barrier = threading.Barrier(5, timeout=10)
+	bands_done = []
+
+	def download(band):
+		barrier.wait() # raises BrokenBarrierError if the bands are not concurrent
+		open(L.dir_obj+'stamp-{}.fits'.format(band), 'w').close()
+		bands_done.append(band)
+		return True
+
+	status = L._imgLoader__make_files_core(func_download_file=download, func_naming_file=lambda band: 'stamp-{}.fits'.format(band), overwrite=False, n_threads=5)
+
+	assert status
+	assert sorted(bands_done) == sorted(['g', 'r', 'i', 'z', 'y'])
+
+
+def test_make_files_core_failure(L_offline):
+	""" test that the status is False if any of the concurrent downloads fails """
+	L = L_offline
+
+	status = L._imgLoader__make_files_core(func_download_file=lambda band: band != 'z', func_naming_file=lambda band: 'psf-{}.fits'.format(band), overwrite=True, n_threads=5)
+
+	assert not status
@@ -5,6 +5,7 @@ import numpy as np
 import astropy.table as at
 import astropy.units as u
 import os 
+from concurrent.futures import ThreadPoolExecutor
 # import abc
 
 from ..filters import surveysetup
@@ -141,7 +142,7 @@ class imgLoader(obsobj.Operator):
 			return False
 
 
-	def _imgLoader__make_files_core(self, func_download_file, func_naming_file, overwrite=False, **kwargs):
+	def _imgLoader__make_files_core(self, func_download_file, func_naming_file, overwrite=False, n_threads=1, **kwargs):
 		"""
 		make all file images of all survey bands for obj self. 
 
@@ -150,6 +151,8 @@ class imgLoader(obsobj.Operator):
 		func_download_file (function), which takes (self, band) as argument
 		func_naming_file (function), which takes (self, band) as argument
 		overwrite (boolean) = False
+		n_threads (int) = 1: 
+			number of bands made concurrently in a thread pool. If 1 then the bands are made one after another. 
 		**kwargs to be entered into func_download_file()
 
 		Return
@@ -158,9 +161,20 @@ class imgLoader(obsobj.Operator):
 		"""
 		bands = surveysetup.surveybands[self.survey]
 
-		statuss = np.ndarray(len(bands), dtype=bool)
-		for i, band in enumerate(bands): 
-			statuss[i] = self._imgLoader__make_file_core(func_download_file=func_download_file, func_naming_file=func_naming_file, band=band, overwrite=overwrite, **kwargs)
+		def make_band(band):
+			return self._imgLoader__make_file_core(func_download_file=func_download_file, func_naming_file=func_naming_file, band=band, overwrite=overwrite, **kwargs)
+
+		if n_threads > 1 and len(bands) > 1:
+			# create dir_obj here such that the threads do not race for it
+			if self.status and not os.path.isdir(self.dir_obj):
+				os.makedirs(self.dir_obj)
+
+			with ThreadPoolExecutor(max_workers=min(n_threads, len(bands))) as executor:
+				statuss = np.array(list(executor.map(make_band, bands)), dtype=bool)
+		else:
+			statuss = np.ndarray(len(bands), dtype=bool)
+			for i, band in enumerate(bands): 
+				statuss[i] = make_band(band)
 
 		return all(statuss)
 
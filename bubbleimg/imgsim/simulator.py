@@ -405,14 +405,14 @@ class Simulator(Imager):
 
 	def _get_measurer(self, msrtype='iso'):
 		if msrtype == 'iso':
-			return imgmeasure.isoMeasurer(obj=self.obj, survey=self.survey, z=self.z, center_mode=self.center_mode)
+			return self._get_operator(imgmeasure.isoMeasurer, survey=self.survey, z=self.z, center_mode=self.center_mode)
 		else: 
 			raise InputError("[simulator] msrtype not understood")
 
 
 	def _get_decomposer(self, decomtype='plain'):
 		if decomtype == 'plain':
-			return imgdecompose.plainDecomposer(obj=self.obj, survey=self.survey, z=self.z, center_mode=self.center_mode)
+			return self._get_operator(imgdecompose.plainDecomposer, survey=self.survey, z=self.z, center_mode=self.center_mode)
 		else: 
 			raise InputError("[simulator] decomtype not understood")
 
@@ -1,7 +1,7 @@
 # __init__.py
 # ALS 2017/05/11
 
-__all__ = ['obsobj', 'plainobj', 'sdss', 'hsc', 'objnaming', 'operator', 'imager']
+__all__ = ['obsobj', 'plainobj', 'sdss', 'hsc', 'objnaming', 'operator', 'imager', 'session']
 
 
 from . import obsobj
@@ -11,10 +11,12 @@ from . import hsc
 from . import objnaming
 from . import operator
 from . import imager
+from . import session
 
 from .obsobj import obsObj
 from .operator import Operator
 from .imager import Imager
+from .session import objSession
 
 from .sdss import sdssObj
 from .hsc import hscObj
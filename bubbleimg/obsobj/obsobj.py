@@ -30,15 +30,34 @@ class obsObj(plainObj):
 
 		super(self.__class__, self).__init__(**kwargs)
 
+		self._added_kwargs = {} # params of added surveys, see _is_added()
+
 
 	def add_sdss(self, overwrite=False, **kwargs):
 
+		if self._is_added('sdss', overwrite=overwrite, **kwargs):
+			return self.sdss.status
+
 		self.sdss = sdssObj(ra=self.ra, dec=self.dec, dir_obj=self.dir_obj, obj_naming_sys=self.obj_naming_sys, overwrite=overwrite, **kwargs)
+		self._added_kwargs['sdss'] = kwargs
 
 		return self.sdss.status
 
 
 	def add_hsc(self, overwrite=False, **kwargs):
+
+		if self._is_added('hsc', overwrite=overwrite, **kwargs):
+			return self.hsc.status
+
 		self.hsc = hscObj(ra=self.ra, dec=self.dec, dir_obj=self.dir_obj, obj_naming_sys=self.obj_naming_sys, overwrite=overwrite, **kwargs)
+		self._added_kwargs['hsc'] = kwargs
 
 		return self.hsc.status
+
+
+	def _is_added(self, survey, overwrite=False, **kwargs):
+		""" whether survey (e.g., 'hsc') is already successfully added with the same params within an objSession, in which case it is not added again """
+		if overwrite or getattr(self, 'session', None) is None:
+			return False
+
+		return (self._added_kwargs.get(survey, None) == kwargs) and getattr(self, survey).status
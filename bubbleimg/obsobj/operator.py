@@ -51,4 +51,15 @@ class Operator(object, metaclass=abc.ABCMeta):
 		# sanity check
 		if self.dir_obj is None:
 			raise TypeError('dir_obj not specified')
-		
\ No newline at end of file
+		
+
+	def _get_operator(self, cls, **kwargs):
+		""" 
+		return an operator of class cls on the same obj with parameters kwargs. If the obj is in an objSession then the operator is memoized by the session, see objSession.get_operator(), otherwise a new one is constructed. 
+		"""
+		session = getattr(self.obj, 'session', None)
+
+		if session is not None:
+			return session.get_operator(cls, **kwargs)
+		else: 
+			return cls(obj=self.obj, **kwargs)
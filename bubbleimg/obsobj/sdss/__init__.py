@@ -1,11 +1,15 @@
 # __init__.py
 # ALS 2017/05/11
 
-__all__ = ['sdssobj']
+__all__ = ['sdssobj', 'sdssspec', 'speclocal']
 
+from . import sdssspec
+from . import speclocal
 from . import sdssobj
 import imp
 
 imp.reload(sdssobj)
 
 from .sdssobj import sdssObj
+from .sdssspec import sdssSpec
+from .speclocal import localSpecArchive
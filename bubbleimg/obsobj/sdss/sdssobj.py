@@ -16,6 +16,7 @@ import astropy.io.ascii
 import requests
 
 from ..plainobj import plainObj
+from .sdssspec import sdssSpec
 
 class sdssObj(plainObj):
 	def __init__(self, **kwargs):
@@ -69,6 +70,7 @@ class sdssObj(plainObj):
 
 		self.fp_photoobj = self.dir_obj+'sdss_photoobj.csv'
 		self.fn_spec = self.dir_obj+'spec.fits'
+		self._spec = None # sdssSpec in memory, see get_spec()
 
 		overwrite = kwargs.pop('overwrite', False)
 		self.load_xid(overwrite=overwrite)
@@ -289,6 +291,8 @@ class sdssObj(plainObj):
 		If self.dir_obj/spec.fits exist, load spec locally. Otherwise
 		download from SDSS and save it locally. 
 
+		The file is read into memory once and closed, see sdssspec.sdssSpec.hdus, and the same HDUList is returned by later calls. 
+
 		Examples
 		------
 		spectable = obj.sdss.get_spec(obj)[1].data
@@ -300,29 +304,34 @@ class sdssObj(plainObj):
 
 		Returns
 		------
-		sp (hdulist) or None if it fails
+		sp (hdulist in memory) or None if it fails
 
 		"""
 		fn = self.fn_spec
 
-		if not os.path.isfile(fn):
-			self.make_spec(overwrite=False)
+		if self._spec is None:
+			if not os.path.isfile(fn):
+				self.make_spec(overwrite=False)
+
+			if os.path.isfile(fn):
+				self._spec = sdssSpec(fn)
 
-		if os.path.isfile(fn):
-			sp = fits.open(fn)
-			return sp
+		if self._spec is not None:
+			return self._spec.hdus
 		else: 
 			return None
 
 
-	def make_spec(self, overwrite=False):
+	def make_spec(self, overwrite=False, archive=None):
 		"""
-		make spectrum by downloading. If overwrite=False then skip if it exists. 
+		make spectrum by downloading, or from a local archive if provided. If overwrite=False then skip if it exists. 
 
 		Params
 		------
 		self
 		overwrite=True (bool)
+		archive=None (instance of speclocal.localSpecArchive):
+			if provided, the spectrum of (plate, mjd, fiberID) is taken from the archive without network access
 
 		Return
 		------
@@ -346,7 +355,17 @@ class sdssObj(plainObj):
 		fn = self.fn_spec
 
 		if self.status: 
-			if not os.path.isfile(fn) or overwrite: 
+			if (not os.path.isfile(fn) or overwrite) and (archive is not None): 
+				sp = archive.get_spec(self.plate, self.mjd, self.fiberID)
+				if sp is not None:
+					sp.writeto(fn, overwrite=True)
+					self._spec = None
+					status = True
+				else: 
+					print("[sdssObj] spec not found in local archive")
+					status = False
+
+			elif not os.path.isfile(fn) or overwrite: 
 				print("[sdssObj] download spec")
 				# sp = astroquery.sdss.SDSS.get_spectra(matches=self.xid, data_release=self.data_release)
 				func_query = astroquery.sdss.SDSS.get_spectra
@@ -358,6 +377,7 @@ class sdssObj(plainObj):
 						sp=sp[0]
 						self.make_dir_obj()
 						sp.writeto(fn, overwrite=overwrite)
+						self._spec = None
 						status = True
 					else: 
 						raise ValueError("SDSS spec obj not uniquely identified. ")
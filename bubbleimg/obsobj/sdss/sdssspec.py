@@ -0,0 +1,103 @@
+# sdssspec.py
+
+"""
+define class sdssSpec, the content of a sdss/boss spec.fits file held in memory
+"""
+
+import os
+import numpy as np
+from astropy.io import fits
+
+
+class sdssSpec(object):
+	def __init__(self, fn):
+		"""
+		sdssSpec, the content of a sdss/boss spec.fits file held in memory.
+
+		Only the headers of HDU 0 and 1 and the columns flux, loglam and ivar of the coadded spectrum (HDU 1) are read, into float64 arrays, and the file is closed before returning, such that no file descriptor is left open however many times the spectrum is used. The other HDUs are read from the file on first access of spall, spzline or hdus.
+
+		Params
+		------
+		fn (string): path to spec.fits
+
+		Attributes
+		----------
+		fn (string)
+		header (Header): header of HDU 0, header info from spPlate
+		header_coadd (Header): header of HDU 1, the coadded spectrum
+		flux (array): flux of the coadded spectrum, in 1.e-17 erg / (Angstrom cm2 s)
+		loglam (array): log10 of wavelength in Angstrom
+		ivar (array): inverse variance of flux
+		spall (BinTableHDU): HDU 2, summary metadata copied from spAll, or None
+		spzline (BinTableHDU): HDU 3, line fitting metadata from spZline, or None
+		hdus (HDUList in memory)
+			HDU 0  : Header info from spPlate
+			HDU 1  : Coadded spectrum from spPlate, columns: ['flux', 'loglam', 'ivar', 'and_mask', 'or_mask', 'wdisp', 'sky', 'model']
+			HDU 2  : Summary metadata copied from spAll
+			HDU 3  : Line fitting metadata from spZline
+			(spectra made from spPlate files by speclocal have only HDU 0 and 1, without the column model)
+		"""
+		if not os.path.isfile(fn):
+			raise IOError("[sdssspec] spec fits file does not exist")
+
+		self.fn = fn
+
+		with fits.open(fn, memmap=True) as hdus:
+			self.header = hdus[0].header.copy()
+			self.header_coadd = hdus[1].header.copy()
+
+			spectable = hdus[1].data
+			self.flux = np.array(spectable['flux'], dtype='float')
+			self.loglam = np.array(spectable['loglam'], dtype='float')
+			self.ivar = np.array(spectable['ivar'], dtype='float')
+			del spectable
+
+		self._hdus_ext = {}
+		self._hdus = None
+
+
+	@property
+	def ws(self):
+		""" wavelength in Angstrom """
+		return 10.**self.loglam
+
+
+	@property
+	def spall(self):
+		""" HDU 2, summary metadata copied from spAll, read on first access, or None if the file does not have it """
+		return self._get_hdu(2)
+
+
+	@property
+	def spzline(self):
+		""" HDU 3, line fitting metadata from spZline, read on first access, or None if the file does not have it (e.g., spectra made from spPlate files by speclocal) """
+		return self._get_hdu(3)
+
+
+	@property
+	def hdus(self):
+		""" all the HDUs of the file in memory, read on first access """
+		if self._hdus is None:
+			with fits.open(self.fn, memmap=False) as hdus:
+				for hdu in hdus:
+					hdu.data
+				self._hdus = fits.HDUList(list(hdus))
+
+		return self._hdus
+
+
+	def _get_hdu(self, ext):
+		""" return HDU ext in memory, which is read once from the file (or taken from hdus if already read), or None if the file does not have it """
+		if self._hdus is not None:
+			return self._hdus[ext] if len(self._hdus) > ext else None
+
+		if ext not in self._hdus_ext:
+			with fits.open(self.fn, memmap=False) as hdus:
+				if len(hdus) > ext:
+					hdu = hdus[ext]
+					hdu.data
+				else:
+					hdu = None
+			self._hdus_ext[ext] = hdu
+
+		return self._hdus_ext[ext]
@@ -0,0 +1,207 @@
+# speclocal.py
+
+"""
+define class localSpecArchive, a provider of sdss/boss spectra from a local mirror of spPlate or spec-lite files, which replaces the download of sdssObj.make_spec()
+"""
+
+import os
+import re
+import numpy as np
+import astropy.table as at
+from astropy.io import fits
+
+
+class localSpecArchive(object):
+
+	def __init__(self, dir_archive):
+		"""
+		localSpecArchive, the spectra of a directory (searched recursively) of spPlate-PPPP-MMMMM.fits and/or spec-lite files spec-PPPP-MMMMM-FFFF.fits, indexed by (plate, mjd, fiberID).
+
+		The spectra are returned in the format of spec.fits of sdssObj.make_spec(). Requests of many spectra are grouped by plate such that each spPlate file is opened once, memory-mapped, and only the rows of the requested fibers are read.
+
+		The spectra from spPlate files only have HDU 0 and 1, and no model column, as spPlate has neither the model spectrum nor the spAll and spZline metadata. These spectra are marked by header keyword SPSOURCE = 'spPlate' in HDU 0. The sdss line fluxes of Spector._get_line_flux_sdss(), which are read from spZline (HDU 3), are not available for them.
+
+		Params
+		------
+		dir_archive (str)
+
+		Attributes
+		----------
+		dir_archive (str)
+		fns_plate (dict): (plate, mjd) -> path of spPlate file
+		fns_spec (dict): (plate, mjd, fiberID) -> path of spec-lite file
+		"""
+		if not os.path.isdir(dir_archive):
+			raise IOError("[speclocal] archive directory does not exist")
+
+		self.dir_archive = dir_archive
+		self.fns_plate = {}
+		self.fns_spec = {}
+
+		re_plate = re.compile(r'^spPlate-(\d+)-(\d+)\.fits$')
+		re_spec = re.compile(r'^spec(?:-lite)?-(\d+)-(\d+)-(\d+)\.fits$')
+
+		for dirpath, dirnames, filenames in os.walk(dir_archive):
+			for filename in sorted(filenames):
+				m = re_plate.match(filename)
+				if m is not None:
+					self.fns_plate[tuple(int(x) for x in m.groups())] = os.path.join(dirpath, filename)
+					continue
+
+				m = re_spec.match(filename)
+				if m is not None:
+					self.fns_spec[tuple(int(x) for x in m.groups())] = os.path.join(dirpath, filename)
+
+
+	def has_spec(self, plate, mjd, fiberID):
+		""" whether the spectrum is in the archive """
+		return ((plate, mjd, fiberID) in self.fns_spec) or ((plate, mjd) in self.fns_plate)
+
+
+	def get_specs(self, ids):
+		"""
+		return the spectra of ids in the format of spec.fits, reading the spectra of the same plate in one pass
+
+		Params
+		------
+		ids (list of tuple): [(plate, mjd, fiberID), ...]
+
+		Return
+		------
+		specs (list of HDUList or None):
+			in the same order as ids, None if not in the archive
+			HDU 0  : Header info from spPlate
+			HDU 1  : Coadded spectrum, columns: ['flux', 'loglam', 'ivar', 'and_mask', 'or_mask', 'wdisp', 'sky', 'model'], without 'model' for spPlate files
+			HDU 2+ : for spec-lite files, the other HDUs of the file, none for spPlate files
+		"""
+		ids = [tuple(int(x) for x in id_spec) for id_spec in ids]
+		specs = [None]*len(ids)
+
+		# group by plate for I/O locality
+		groups = {}
+		for i, id_spec in enumerate(ids):
+			groups.setdefault(id_spec[:2], []).append(i)
+
+		for platemjd in sorted(groups):
+			for i in groups[platemjd]:
+				if ids[i] in self.fns_spec:
+					specs[i] = _read_spec_lite(self.fns_spec[ids[i]])
+
+			irows = [i for i in groups[platemjd] if specs[i] is None]
+			if len(irows) > 0 and platemjd in self.fns_plate:
+				fiberIDs = [ids[i][2] for i in irows]
+				for i, spec in zip(irows, _read_spplate_fibers(self.fns_plate[platemjd], fiberIDs)):
+					specs[i] = spec
+
+		return specs
+
+
+	def get_spec(self, plate, mjd, fiberID):
+		""" return the spectrum in the format of spec.fits, or None if not in the archive, see get_specs() """
+		return self.get_specs([(plate, mjd, fiberID)])[0]
+
+
+	def make_specs(self, dirs_obj, overwrite=False):
+		"""
+		write spec.fits to each of the object directories from the archive, according to the plate, mjd and fiberID in their sdss_xid.csv, see sdssObj.load_xid(). The objects are grouped by plate.
+
+		Params
+		------
+		dirs_obj (list of str)
+		overwrite=False
+
+		Return
+		------
+		statuses (list of bool): whether spec.fits exists in each of the directories
+		"""
+		dirs_tomake = []
+		ids = []
+		for dir_obj in dirs_obj:
+			fn_xid = dir_obj+'sdss_xid.csv'
+			if (overwrite or not os.path.isfile(dir_obj+'spec.fits')) and os.path.isfile(fn_xid):
+				xid = at.Table.read(fn_xid, format='ascii.csv', comment='#')
+				dirs_tomake += [dir_obj]
+				ids += [(xid['plate'][0], xid['mjd'][0], xid['fiberID'][0])]
+
+		for dir_obj, spec in zip(dirs_tomake, self.get_specs(ids)):
+			if spec is not None:
+				spec.writeto(dir_obj+'spec.fits', overwrite=True)
+			else:
+				print(("[speclocal] spectrum of {} not in archive".format(dir_obj)))
+
+		return [os.path.isfile(dir_obj+'spec.fits') for dir_obj in dirs_obj]
+
+
+
+def _read_spec_lite(fn):
+	""" return the content of a spec-lite file as an HDUList in memory """
+	with fits.open(fn, memmap=True) as hdus:
+		return fits.HDUList([hdu.copy() for hdu in hdus])
+
+
+def _read_spplate_fibers(fn, fiberIDs):
+	"""
+	return the spectra of fibers fiberIDs of the spPlate file fn in the format of spec.fits. The file is memory-mapped and only the rows of the fibers are read. The pixels at both ends with ivar = 0, where the fiber has no data, are trimmed. As spPlate has no model spectrum, spAll or spZline metadata, there is no column model and no HDU 2 and 3, which is marked by SPSOURCE = 'spPlate' in the header.
+
+	spPlate HDUs: 0 flux, 1 ivar, 2 and_mask, 3 or_mask, 4 wdisp, 5 plugmap, 6 sky, with loglam = COEFF0 + COEFF1 * i
+
+	Params
+	------
+	fn (str)
+	fiberIDs (list of int)
+
+	Return
+	------
+	specs (list of HDUList or None)
+	"""
+	specs = []
+
+	with fits.open(fn, memmap=True) as hdus:
+		header = hdus[0].header
+		nfiber, npix = hdus[0].data.shape
+		loglam_all = (header['COEFF0'] + header['COEFF1']*np.arange(npix)).astype('float32')
+
+		if len(hdus) > 5 and 'FIBERID' in hdus[5].columns.names:
+			irows = {fiberID: i for i, fiberID in enumerate(hdus[5].data['FIBERID'])}
+		else:
+			irows = {i+1: i for i in range(nfiber)}
+
+		header_out = fits.Header([card for card in header.cards if not _is_structural_keyword(card.keyword)])
+
+		for fiberID in fiberIDs:
+			if fiberID not in irows:
+				specs += [None]
+				continue
+
+			irow = irows[fiberID]
+			ivar = np.array(hdus[1].data[irow])
+
+			ihasdata = np.where(ivar > 0)[0]
+			if len(ihasdata) > 0:
+				sl = slice(ihasdata[0], ihasdata[-1]+1)
+			else:
+				sl = slice(0, npix)
+
+			cols = [
+					fits.Column(name='flux', format='E', array=np.array(hdus[0].data[irow, sl])),
+					fits.Column(name='loglam', format='E', array=loglam_all[sl]),
+					fits.Column(name='ivar', format='E', array=ivar[sl]),
+					fits.Column(name='and_mask', format='J', array=np.array(hdus[2].data[irow, sl])),
+					fits.Column(name='or_mask', format='J', array=np.array(hdus[3].data[irow, sl])),
+					fits.Column(name='wdisp', format='E', array=np.array(hdus[4].data[irow, sl])),
+					fits.Column(name='sky', format='E', array=np.array(hdus[6].data[irow, sl])),
+					]
+
+			hdu0 = fits.PrimaryHDU(header=header_out.copy())
+			hdu0.header['FIBERID'] = fiberID
+			hdu0.header['SPSOURCE'] = ('spPlate', 'no model column, no spAll and spZline HDUs')
+			hdu1 = fits.BinTableHDU.from_columns(cols, name='COADD')
+
+			specs += [fits.HDUList([hdu0, hdu1])]
+
+	return specs
+
+
+def _is_structural_keyword(keyword):
+	""" whether the header keyword describes the data structure of the image, e.g., NAXIS1 """
+	return (keyword in ['SIMPLE', 'BITPIX', 'EXTEND', 'BSCALE', 'BZERO', 'COMMENT', 'HISTORY', '']) or (re.match(r'^NAXIS\d*$', keyword) is not None)
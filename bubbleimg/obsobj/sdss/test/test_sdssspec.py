@@ -0,0 +1,76 @@
+import pytest
+import os
+import numpy as np
+from astropy.io import fits
+
+from ..sdssspec import sdssSpec
+
+fn_spec = os.path.join(os.path.dirname(__file__), '../../../spector/test/test_verification_data/SDSSJ0920+0034/spec.fits')
+
+
+def test_sdssSpec_read():
+
+	s = sdssSpec(fn_spec)
+
+	with fits.open(fn_spec) as hdus:
+		spectable = hdus[1].data
+
+		assert np.all(s.flux == spectable['flux'])
+		assert np.all(s.loglam == spectable['loglam'])
+		assert np.all(s.ivar == spectable['ivar'])
+		assert np.all(s.ws == 10.**spectable['loglam'].astype('float'))
+		assert s.flux.dtype == np.float64
+		assert s.ws.dtype == np.float64
+		assert s.header['PLATEID'] == hdus[0].header['PLATEID']
+
+		assert s._hdus is None
+		assert np.all(s.spzline.data['LINENAME'] == hdus[3].data['LINENAME'])
+		assert np.all(s.spall.data['PLATESN2'] == hdus[2].data['PLATESN2'])
+		assert s._hdus is None
+
+		assert len(s.hdus) == len(hdus)
+		assert s.hdus is s.hdus
+		assert np.all(s.hdus[1].data['flux'] == spectable['flux'])
+
+
+def test_sdssSpec_no_spzline():
+	""" spec.fits made from spPlate by speclocal has only HDU 0 and 1 """
+	dir_test = './testing/'
+	if not os.path.isdir(dir_test):
+		os.makedirs(dir_test)
+	fn = dir_test+'spec_spplate.fits'
+
+	with fits.open(fn_spec) as hdus:
+		fits.HDUList([hdus[0].copy(), hdus[1].copy()]).writeto(fn, overwrite=True)
+
+	s = sdssSpec(fn)
+
+	assert s.spall is None
+	assert s.spzline is None
+	assert len(s.hdus) == 2
+
+	os.remove(fn)
+	os.rmdir(dir_test)
+
+
+def test_sdssSpec_closes_file():
+
+	dir_fd = '/proc/self/fd'
+	if not os.path.isdir(dir_fd):
+		pytest.skip("no /proc/self/fd")
+
+	n_fd = len(os.listdir(dir_fd))
+	specs = [sdssSpec(fn_spec) for i in range(20)]
+	for s in specs[:10]:
+		s.spzline
+	for s in specs[10:]:
+		s.hdus
+
+	assert len(os.listdir(dir_fd)) == n_fd
+	assert len(specs[-1].flux) > 0
+
+
+def test_sdssSpec_no_file():
+
+	with pytest.raises(IOError):
+		sdssSpec('./not_a_file.fits')
@@ -0,0 +1,119 @@
+import pytest
+import os
+import shutil
+import numpy as np
+import astropy.table as at
+from astropy.io import fits
+
+from ..speclocal import localSpecArchive
+from ..sdssspec import sdssSpec
+
+dir_parent = './testing/'
+dir_archive = './testing/archive/'
+fn_spec = os.path.join(os.path.dirname(__file__), '../../../spector/test/test_verification_data/SDSSJ0920+0034/spec.fits')
+
+nfiber = 4
+npix = 50
+coeff0 = 3.5
+coeff1 = 1.e-4
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setUp_tearDown():
+	""" rm ./testing/ before and after testing, and make an archive with one spPlate and one spec-lite file """
+
+	# setup
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+	os.makedirs(dir_archive+'1000/')
+	os.makedirs(dir_archive+'lite/3821/')
+
+	flux = np.arange(nfiber*npix, dtype='float32').reshape(nfiber, npix)
+	ivar = np.ones((nfiber, npix), dtype='float32')
+	ivar[:, :3] = 0.
+	ivar[:, -5:] = 0.
+	mask = np.zeros((nfiber, npix), dtype='int32')
+
+	hdu0 = fits.PrimaryHDU(flux)
+	hdu0.header['COEFF0'] = coeff0
+	hdu0.header['COEFF1'] = coeff1
+	hdu0.header['PLATEID'] = 1000
+	plugmap = fits.BinTableHDU.from_columns([fits.Column(name='FIBERID', format='J', array=np.arange(1, nfiber+1))])
+
+	hdus = fits.HDUList([hdu0, fits.ImageHDU(ivar), fits.ImageHDU(mask), fits.ImageHDU(mask), fits.ImageHDU(flux*0.1), plugmap, fits.ImageHDU(flux*0.01)])
+	hdus.writeto(dir_archive+'1000/spPlate-1000-52000.fits')
+
+	shutil.copyfile(fn_spec, dir_archive+'lite/3821/spec-3821-55535-0123.fits')
+
+	yield
+	# tear down
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+
+def test_localSpecArchive_index():
+	archive = localSpecArchive(dir_archive)
+
+	assert list(archive.fns_plate.keys()) == [(1000, 52000)]
+	assert list(archive.fns_spec.keys()) == [(3821, 55535, 123)]
+
+	assert archive.has_spec(1000, 52000, 2)
+	assert archive.has_spec(3821, 55535, 123)
+	assert not archive.has_spec(3821, 55535, 124)
+
+
+def test_localSpecArchive_no_dir():
+	with pytest.raises(IOError):
+		localSpecArchive('./testing/nonexistent/')
+
+
+def test_localSpecArchive_get_specs():
+	archive = localSpecArchive(dir_archive)
+
+	ids = [(1000, 52000, 3), (3821, 55535, 123), (1000, 52000, 1), (1000, 52000, 9), (2000, 52000, 1)]
+	specs = archive.get_specs(ids)
+
+	assert len(specs) == len(ids)
+	assert specs[3] is None
+	assert specs[4] is None
+
+	with fits.open(fn_spec) as hdus:
+		assert np.all(specs[1][1].data['flux'] == hdus[1].data['flux'])
+
+	for spec, fiberID in [(specs[0], 3), (specs[2], 1)]:
+		spectable = spec[1].data
+		irow = fiberID - 1
+
+		assert spec[0].header['FIBERID'] == fiberID
+		assert spec[0].header['PLATEID'] == 1000
+		assert spec[0].header['SPSOURCE'] == 'spPlate'
+		assert len(spec) == 2
+		assert spectable.columns.names == ['flux', 'loglam', 'ivar', 'and_mask', 'or_mask', 'wdisp', 'sky']
+
+		# pixels with ivar = 0 at both ends are trimmed
+		assert len(spectable) == npix - 8
+		assert np.all(spectable['flux'] == np.arange(irow*npix+3, irow*npix+npix-5))
+		assert np.allclose(spectable['loglam'], coeff0 + coeff1*np.arange(3, npix-5))
+		assert np.all(spectable['ivar'] == 1.)
+
+
+def test_localSpecArchive_make_specs():
+	archive = localSpecArchive(dir_archive)
+
+	dirs_obj = [dir_parent+'obj{}/'.format(i) for i in range(3)]
+	for dir_obj, id_spec in zip(dirs_obj, [(1000, 52000, 2), (3821, 55535, 123), (1000, 52000, 99)]):
+		os.makedirs(dir_obj)
+		xid = at.Table([[id_spec[0]], [id_spec[1]], [id_spec[2]]], names=['plate', 'mjd', 'fiberID'])
+		xid.write(dir_obj+'sdss_xid.csv', format='ascii.csv')
+
+	statuses = archive.make_specs(dirs_obj)
+
+	assert statuses == [True, True, False]
+
+	s = sdssSpec(dirs_obj[0]+'spec.fits')
+	assert np.all(s.flux == np.arange(npix+3, 2*npix-5))
+
+	s = sdssSpec(dirs_obj[1]+'spec.fits')
+	with fits.open(fn_spec) as hdus:
+		assert np.all(s.flux == hdus[1].data['flux'])
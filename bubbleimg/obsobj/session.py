@@ -0,0 +1,82 @@
+# session.py
+
+"""
+define class objSession, which owns one obsObj and memoizes the operators on it
+"""
+
+from .obsobj import obsObj
+
+
+class objSession(object):
+	def __init__(self, **kwargs):
+		"""
+		objSession
+
+		A per-object session that owns one obsObj and memoizes the operators (e.g., Spector, Decomposer, Measurer, Simulator) constructed on it, such that the operators, together with the data they hold in memory (e.g., spectrum tables of Spector, sdss/hsc xid of the obsObj), are shared by all the calls within the session instead of being rebuilt and reread.
+
+		Operators find the session through obj.session, see Operator._get_operator(), such that the operators an operator uses internally, e.g., the Spector of a Decomposer, are also taken from the session.
+
+		It can be used as a context manager, which closes the session on exit.
+
+			with objSession(ra=ra, dec=dec, dir_obj=dir_obj) as ses:
+				d = ses.get_operator(plainDecomposer, survey='hsc', z=z)
+				d.make_stamp_linemap_I(bandline='i', bandconti='z')
+				m = ses.get_operator(isoMeasurer, survey='hsc', z=z)
+				m.make_measurements(...)
+
+		Params
+		------
+		/either
+			obj (object of class obsobj)
+		/or
+			obsObj params, e.g., ra, dec, dir_obj
+
+		Attributes
+		----------
+		obj (instance of obsObj)
+		operators (dict): memoized operators keyed by class and parameters
+		"""
+		if 'obj' in kwargs:
+			self.obj = kwargs.pop('obj')
+		else:
+			self.obj = obsObj(**kwargs)
+
+		self.operators = {}
+		self.obj.session = self
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+
+	def get_operator(self, cls, **kwargs):
+		"""
+		return the operator of class cls on self.obj with parameters kwargs, which is constructed on the first call and reused afterwards
+
+		Params
+		------
+		cls (class): subclass of Operator, e.g., Spector
+		**kwargs: parameters of the operator other than obj, e.g., survey, z
+
+		Return
+		------
+		operator (instance of cls)
+		"""
+		key = (cls, tuple(sorted(kwargs.items())))
+
+		if key not in self.operators:
+			self.operators[key] = cls(obj=self.obj, **kwargs)
+
+		return self.operators[key]
+
+
+	def close(self):
+		""" release the operators and detach the session from obj """
+		self.operators = {}
+
+		if getattr(self.obj, 'session', None) is self:
+			self.obj.session = None
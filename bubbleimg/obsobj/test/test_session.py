@@ -0,0 +1,92 @@
+import pytest
+
+from ..obsobj import obsObj
+from ..operator import Operator
+from ..session import objSession
+
+ra = 150.0547735
+dec = 12.7073027
+dir_obj = './testing/SDSSJ1000+1242/'
+
+
+class dummyOperator(Operator):
+	def __init__(self, **kwargs):
+		self.survey = kwargs.pop('survey', 'hsc')
+		super(dummyOperator, self).__init__(**kwargs)
+
+
+	def get_other(self, **kwargs):
+		return self._get_operator(dummyOperator, **kwargs)
+
+
+@pytest.fixture
+def obj_dirobj():
+	return obsObj(ra=ra, dec=dec, dir_obj=dir_obj)
+
+
+def test_session_init(obj_dirobj):
+	obj = obj_dirobj
+
+	ses = objSession(obj=obj)
+	assert ses.obj is obj
+	assert obj.session is ses
+
+	ses = objSession(ra=ra, dec=dec, dir_obj=dir_obj)
+	assert ses.obj.dir_obj == dir_obj
+	assert ses.obj.session is ses
+
+
+def test_session_get_operator(obj_dirobj):
+	ses = objSession(obj=obj_dirobj)
+
+	op1 = ses.get_operator(dummyOperator, survey='hsc')
+	op2 = ses.get_operator(dummyOperator, survey='hsc')
+	op3 = ses.get_operator(dummyOperator, survey='sdss')
+
+	assert op1 is op2
+	assert op1 is not op3
+	assert op1.obj is ses.obj
+	assert op3.survey == 'sdss'
+
+	# operators used by operators are taken from the session
+	assert op1.get_other(survey='sdss') is op3
+
+
+def test_session_operator_without_session(obj_dirobj):
+	op = dummyOperator(obj=obj_dirobj)
+
+	assert op.get_other(survey='hsc') is not op.get_other(survey='hsc')
+
+
+def test_session_context_close(obj_dirobj):
+	obj = obj_dirobj
+
+	with objSession(obj=obj) as ses:
+		op1 = ses.get_operator(dummyOperator, survey='hsc')
+		assert ses.get_operator(dummyOperator, survey='hsc') is op1
+
+	assert obj.session is None
+	assert ses.operators == {}
+
+	op = dummyOperator(obj=obj)
+	assert op.get_other(survey='hsc') is not op1
+
+
+def test_session_obj_is_added(obj_dirobj):
+	obj = obj_dirobj
+
+	class dummySurveyObj(object):
+		status = True
+
+	obj.hsc = dummySurveyObj()
+	obj._added_kwargs['hsc'] = {}
+
+	assert not obj._is_added('hsc')
+
+	with objSession(obj=obj):
+		assert obj._is_added('hsc')
+		assert not obj._is_added('hsc', overwrite=True)
+		assert not obj._is_added('hsc', rerun='s16a_wide')
+
+		obj.hsc.status = False
+		assert not obj._is_added('hsc')
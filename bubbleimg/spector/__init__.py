@@ -1,8 +1,10 @@
 # __init__.py
 
-__all__ = ['spector']
+__all__ = ['spector', 'specstack']
 
 from . import spector
+from . import specstack
 import imp
 
 from .spector import Spector
+from .specstack import SpecStack
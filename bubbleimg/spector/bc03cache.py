@@ -0,0 +1,236 @@
+# bc03cache.py
+
+"""
+persisted cache of modelBC03 continuum fits, such that the fit of each object is done once and reused across Spector instances and processes, and the batch fitting of many objects over a process pool, see get_bestfits()
+
+Each process fits with one modelBC03 instance per extinction law, see _get_worker_model(), such that the template library is loaded once per process. 
+"""
+
+import os
+import hashlib
+import multiprocessing as mtp
+import numpy as np
+import astropy.table as at
+from astropy.io import fits
+
+import modelBC03
+
+# modelBC03 instances of this process, one per extinction law, see _get_worker_model()
+_worker_models = {}
+
+
+class BC03Fit(object):
+	def __init__(self, ws_bestfit, bestfit, z, extinction_law='none', ws_predict=None, predict=None):
+		"""
+		BC03Fit, the results of a modelBC03 fit, copied from the model that did the fit, such that they are not changed by the later fits of the model, see get_bestfit().
+
+		Params
+		------
+		ws_bestfit (array): wavelength of the best fit in AA
+		bestfit (array)
+		z (float)
+		extinction_law='none' (str)
+		ws_predict=None (array): wavelength in AA where the best fit is predicted
+		predict=None (array): the best fit at ws_predict
+
+		Attributes
+		----------
+		ws_bestfit, bestfit, z, extinction_law, ws_predict, predict
+		"""
+		self.ws_bestfit = np.array(ws_bestfit)
+		self.bestfit = np.array(bestfit)
+		self.z = float(z)
+		self.extinction_law = extinction_law
+		self.ws_predict = None if ws_predict is None else np.array(ws_predict)
+		self.predict = None if predict is None else np.array(predict)
+
+
+def calc_fit_key(ws, spec, z, extinction_law='none', ws_predict=None):
+	"""
+	return the key of a modelBC03 fit, the sha1 hex digest of the fitted spectrum, the redshift, the model settings and the wavelengths of the prediction
+
+	Params
+	------
+	ws (array): wavelength in AA
+	spec (array): the spectrum to be fitted, e.g., the line masked spectrum
+	z (float)
+	extinction_law='none' (str)
+	ws_predict=None (array): wavelength in AA where the best fit is predicted
+
+	Return
+	------
+	key (str)
+	"""
+	h = hashlib.sha1()
+	h.update(np.ascontiguousarray(ws, dtype='<f8').tobytes())
+	h.update(np.ascontiguousarray(spec, dtype='<f8').tobytes())
+	h.update(repr(float(z)).encode())
+	h.update(repr(extinction_law).encode())
+	h.update(repr(getattr(modelBC03, '__version__', '')).encode())
+
+	if ws_predict is not None:
+		h.update(b'predict')
+		h.update(np.ascontiguousarray(ws_predict, dtype='<f8').tobytes())
+
+	return h.hexdigest()
+
+
+def read_bestfit(fn, key):
+	"""
+	return the best fit of the cache file fn if it is of key, otherwise None
+
+	Params
+	------
+	fn (str): path to the cache file, e.g., 'spec_bc03fit.fits'
+	key (str): see calc_fit_key()
+
+	Return
+	------
+	ws_bestfit (array) or None
+	bestfit (array) or None
+	predict (array) or None: 
+		the best fit predicted at ws_predict, None if not cached
+	"""
+	if not os.path.isfile(fn):
+		return None, None, None
+
+	with fits.open(fn) as hdus:
+		tab = at.Table.read(hdus[1])
+
+		if tab.meta.get('FITKEY', None) != key:
+			return None, None, None
+
+		if 'PREDICT' in hdus:
+			predict = np.array(at.Table.read(hdus['PREDICT'])['predict'])
+		else:
+			predict = None
+
+	return np.array(tab['ws']), np.array(tab['bestfit']), predict
+
+
+def write_bestfit(fn, key, ws_bestfit, bestfit, z, extinction_law='none', ws_predict=None, predict=None):
+	""" write the best fit of key, and its prediction at ws_predict if provided, to the cache file fn as fits binary tables (HDU 1 and 'PREDICT'), replacing the earlier fit if any """
+	tab = at.Table([np.asarray(ws_bestfit), np.asarray(bestfit)], names=['ws', 'bestfit'])
+	tab.meta['FITKEY'] = key
+	tab.meta['Z'] = float(z)
+	tab.meta['EXTLAW'] = extinction_law
+
+	hdus = fits.HDUList([fits.PrimaryHDU(), fits.table_to_hdu(tab)])
+
+	if predict is not None:
+		hdu_predict = fits.table_to_hdu(at.Table([np.asarray(ws_predict), np.asarray(predict)], names=['ws', 'predict']))
+		hdu_predict.name = 'PREDICT'
+		hdus.append(hdu_predict)
+
+	hdus.writeto(fn, overwrite=True)
+
+
+def get_bestfit(ws, spec, z, fn, extinction_law='none', ws_predict=None, force=False):
+	"""
+	return the modelBC03 best fit to the spectrum, which is read from the cache file fn if the fit of the same spectrum, redshift and settings was done before, otherwise it is fitted with the model of this process and written to fn.
+
+	Params
+	------
+	ws (array): wavelength in AA
+	spec (array)
+	z (float)
+	fn (str): path to the cache file, e.g., dir_obj+'spec_bc03fit.fits'
+	extinction_law='none' (str)
+	ws_predict=None (array): 
+		if provided, the best fit is also predicted at these wavelengths, e.g., those of the whole spectrum
+	force=False (bool):
+		if true, refit and replace the cached fit
+
+	Return
+	------
+	ws_bestfit (array)
+	bestfit (array)
+	predict (array or None): 
+		the best fit at ws_predict, None if ws_predict is not provided
+	fit (BC03Fit or None):
+		the results of the fit, detached from the model of this process, which is reused by the later fits, see _get_worker_model(). None if the fit is read from the cache. 
+	"""
+	key = calc_fit_key(ws, spec, z, extinction_law=extinction_law, ws_predict=ws_predict)
+
+	if not force:
+		ws_bestfit, bestfit, predict = read_bestfit(fn, key)
+		if bestfit is not None:
+			return ws_bestfit, bestfit, predict, None
+
+	fit = _fit(ws=ws, spec=spec, z=z, fn=fn, key=key, extinction_law=extinction_law, ws_predict=ws_predict)
+
+	return fit.ws_bestfit, fit.bestfit, fit.predict, fit
+
+
+def get_bestfits(tasks, processes=None):
+	"""
+	fit many spectra with modelBC03 over a process pool and write each of the fits to its cache file, see get_bestfit(). Spectra whose fits are already cached are skipped. Each of the workers loads the template library once and reuses its model instance for all of its fits.
+
+	Params
+	------
+	tasks (list of dict):
+		each with keys 'ws', 'spec', 'z', 'fn' and optionally 'extinction_law' and 'ws_predict', e.g., from Spector.get_bc03fit_task()
+	processes=None (int):
+		How many processes to use for multiprocessing. Default is None, the default of multiprocessing.Pool. If processes == -1, then it will be ran sequentially and no multiprocessing is used.
+
+	Return
+	------
+	statuses (list of bool): whether the fit of each of the tasks is cached
+	"""
+	tasks = [dict(task, extinction_law=task.get('extinction_law', 'none'), ws_predict=task.get('ws_predict', None)) for task in tasks]
+	for task in tasks:
+		task['key'] = calc_fit_key(task['ws'], task['spec'], task['z'], extinction_law=task['extinction_law'], ws_predict=task['ws_predict'])
+
+	statuses = [read_bestfit(task['fn'], task['key'])[1] is not None for task in tasks]
+	tasks_tofit = [task for task, status in zip(tasks, statuses) if not status]
+
+	if len(tasks_tofit) > 0:
+		if processes != -1: # to run multiprocessing
+			p = mtp.Pool(processes=processes)
+			results = p.map(_fit_kernel, tasks_tofit)
+			p.close()
+			p.join()
+		else: # to run sequentially
+			results = [_fit_kernel(task) for task in tasks_tofit]
+
+		results = iter(results)
+		statuses = [status or next(results) for status in statuses]
+
+	return statuses
+
+
+def _fit_kernel(task):
+	""" the kernel of get_bestfits(), fit one spectrum with the model of the worker and write it to the cache, return status """
+	try:
+		_fit(**task)
+	except KeyboardInterrupt:
+		raise
+	except Exception as e:
+		print(("[bc03cache] fitting {} failed: {}".format(task['fn'], e)))
+		return False
+	else:
+		return True
+
+
+def _fit(ws, spec, z, fn, key, extinction_law='none', ws_predict=None):
+	""" fit the spectrum with the model of this process and write the fit to the cache file fn, return the results of the fit as BC03Fit """
+	m = _get_worker_model(extinction_law)
+	m.fit(ws=ws, spec=spec, z=z)
+
+	if ws_predict is not None:
+		predict = np.array(m.predict(ws_predict))
+	else:
+		predict = None
+
+	fit = BC03Fit(ws_bestfit=m.ws_bestfit, bestfit=m.bestfit, z=z, extinction_law=extinction_law, ws_predict=ws_predict, predict=predict)
+	write_bestfit(fn, key, fit.ws_bestfit, fit.bestfit, z=z, extinction_law=extinction_law, ws_predict=fit.ws_predict, predict=fit.predict)
+
+	return fit
+
+
+def _get_worker_model(extinction_law='none'):
+	""" return the modelBC03 instance of this process, which is created on the first call """
+	if extinction_law not in _worker_models:
+		_worker_models[extinction_law] = modelBC03.modelBC03(extinction_law=extinction_law)
+
+	return _worker_models[extinction_law]
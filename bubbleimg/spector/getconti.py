@@ -6,19 +6,20 @@ tools to isolate continuum
 """
 
 import numpy as np
-import copy
-import scipy.ndimage.filters as scif
+from numpy.lib.stride_tricks import sliding_window_view
 import modelBC03
 
 from ..filters import getllambda
+from ..filters import getllambdas
 from . import linelist
+from . import bc03cache
 
-def decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03'):
+def decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03', fn_bc03fit=None):
     """
     decompose the spectrum of type 2 AGN into two components: continumm and emission line. There are two methods: 
 
     method 'modelBC03':
-        fit BC03 stellar population synthesis model to line masked continuum and use the best fit as the continuum model. 
+        fit BC03 stellar population synthesis model to line masked continuum and use the best fit as the continuum model. If fn_bc03fit is provided, the fit is read from or persisted to this cache file, see get_bc03fit_task(). 
 
     method 'running_median':
         mask the lines and do running medium filter. 
@@ -32,6 +33,8 @@ def decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03'):
     z (float)
     toplot=False (bool)
     method = 'modelBC03'
+    fn_bc03fit=None (str)
+        path to the cache file of the modelBC03 fit, e.g., dir_obj+'spec_bc03fit.fits'
 
     Return
     ------
@@ -40,14 +43,18 @@ def decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03'):
     specline
     ws
     model
+        the modelBC03 instance that did the fit, or if fn_bc03fit is provided the results of the fit (bc03cache.BC03Fit), None if method is 'running_median' or if the fit is read from the cache
     """
     # main
     selcon = selectcont(spec, ws, z, AGN_TYPE=2, NLcutwidth=80., BLcutwidth=180., vacuum=True)
 
     if method == 'modelBC03':
-        m = modelBC03.modelBC03(extinction_law='none')
-        m.fit(ws=ws[selcon], spec=spec[selcon], z=z)
-        speccon = m.predict(ws)
+        if fn_bc03fit is None:
+            m = modelBC03.modelBC03(extinction_law='none')
+            m.fit(ws=ws[selcon], spec=spec[selcon], z=z)
+            speccon = m.predict(ws)
+        else:
+            __, __, speccon, m = bc03cache.get_bestfit(**get_bc03fit_task(spec, ws, z, fn_bc03fit, selcon=selcon))
         model = m
 
     elif method == 'running_median':
@@ -66,12 +73,129 @@ def decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03'):
     return selcon, speccon, specline, ws, model
 
 
-def getcont_medianfilter(spec, selcon):
-    speccon_nan = copy.copy(spec)
-    speccon_nan[~selcon] = np.nan
-    speccon = scif.generic_filter(speccon_nan, np.nanmedian, size=300)
+def get_bc03fit_task(spec, ws, z, fn_bc03fit, selcon=None):
+    """
+    return the modelBC03 fit of decompose_cont_line_t2AGN() as a task of bc03cache.get_bestfit() or bc03cache.get_bestfits(): the line masked spectrum is fitted and the best fit is predicted at all of ws. 
+
+    Params
+    ------
+    spec (array)
+    ws (array)
+    z (float)
+    fn_bc03fit (str): path to the cache file
+    selcon=None (array of bool): 
+        the continuum pixels, if not provided then from selectcont() as in decompose_cont_line_t2AGN()
+
+    Return
+    ------
+    task (dict): with keys 'ws', 'spec', 'z', 'fn', 'extinction_law', 'ws_predict'
+    """
+    if selcon is None:
+        selcon = selectcont(spec, ws, z, AGN_TYPE=2, NLcutwidth=80., BLcutwidth=180., vacuum=True)
+
+    return {'ws': ws[selcon], 'spec': spec[selcon], 'z': z, 'fn': fn_bc03fit, 'extinction_law': 'none', 'ws_predict': ws}
+
+
+def getcont_medianfilter(spec, selcon, size=300, indices=None, edges=None):
+    """
+    running median filter of the spectrum ignoring the pixels that are not continuum. The result is identical to 
+        scipy.ndimage.generic_filter(spec_nan, np.nanmedian, size=size)
+    where spec_nan is spec with the non-continuum pixels set to nan, see running_nanmedian(). 
+
+    Params
+    ------
+    spec (array): 
+        spectrum of shape (n_ws,), or a stack of spectra of shape (n_spec, n_ws)
+    selcon (array of bool): 
+        continuum pixels, of the same shape as spec or of shape (n_ws,)
+    size=300 (int): 
+        size of the window in pixels
+    indices=None (array of int):
+        if provided, the continuum is only calculated at these pixels
+    edges=None (array of int):
+        if provided, the first and the last+1 pixels of each spectrum in a stack of spectra on a common grid, see running_nanmedian()
+
+    Return
+    ------
+    speccon (array): of the same shape and dtype as spec, or of shape spec.shape[:-1]+(len(indices),)
+    """
+    spec = np.asarray(spec)
+
+    speccon_nan = spec.astype('float')
+    speccon_nan[~np.broadcast_to(selcon, spec.shape)] = np.nan
+    speccon = running_nanmedian(speccon_nan, size=size, indices=indices, edges=edges)
+
+    return speccon.astype(spec.dtype.name)
+
+
+def running_nanmedian(arr, size=300, chunksize=2**20, indices=None, edges=None):
+    """
+    running median along the last axis of arr that ignores nans. Windows are the same as in scipy.ndimage.generic_filter(arr, np.nanmedian, size=size), i.e., pixels i-size//2 to i+(size-1)//2 around pixel i, with the array reflected at the edges (mode 'reflect'). Windows with only nans give nan. 
+
+    For spectra of different coverages stacked on a common grid, edges gives the pixels istart and istop of the data of each row. Each row is then reflected at its own edges, such that the result within istart:istop is the same as that of arr[istart:istop] alone, and the pixels outside give nan. 
+
+    The windows are strided views of the padded array, which are sorted in chunks of about chunksize elements (nans are sorted to the end). The median of each window is then picked from the middle of its k non-nan values, where k is from the cumulative count of non-nan pixels. 
+
+    Params
+    ------
+    arr (array): of shape (n,) or (n_spec, n)
+    size=300 (int)
+    chunksize=2**20 (int)
+    indices=None (array of int):
+        if provided, the running median is only calculated at these pixels
+    edges=None (array of int): 
+        of shape arr.shape[:-1]+(2,), the pixels istart and istop of each row, default to the ends of the rows
+
+    Return
+    ------
+    arr_med (array of float): of the same shape as arr, or of shape arr.shape[:-1]+(len(indices),)
+    """
+    arr = np.asarray(arr, dtype='float')
+    arr2d = arr.reshape(-1, arr.shape[-1])
+    n = arr.shape[-1]
+
+    if edges is None:
+        edges2d = np.broadcast_to([0, n], (arr2d.shape[0], 2))
+    else:
+        edges2d = np.asarray(edges, dtype='int').reshape(-1, 2)
+
+    if indices is None:
+        indices = slice(None)
+        nout = arr.shape[-1]
+    else:
+        indices = np.asarray(indices, dtype='int')
+        nout = len(indices)
+
+    out = np.empty((arr2d.shape[0], nout))
+
+    left = size // 2
+    right = size - 1 - left
+    nchunk = max(1, chunksize // size)
+
+    for row, row_out, (istart, istop) in zip(arr2d, out, edges2d):
+        padded = np.full(n + size - 1, np.nan)
+        padded[istart:istop+size-1] = np.pad(row[istart:istop], (left, right), mode='symmetric')
+        windows = sliding_window_view(padded, size)[indices]
+
+        cumvalid = np.concatenate([[0], np.cumsum(~np.isnan(padded))])
+        nvalid = (cumvalid[size:] - cumvalid[:-size])[indices]
+        ilo = np.maximum((nvalid - 1) // 2, 0)
+        ihi = np.minimum(nvalid // 2, size - 1)
 
-    return speccon
+        for i0 in range(0, nout, nchunk):
+            i1 = i0 + nchunk
+            w = np.sort(windows[i0:i1], axis=-1)
+            lo = np.take_along_axis(w, ilo[i0:i1, np.newaxis], axis=-1)[:, 0]
+            hi = np.take_along_axis(w, ihi[i0:i1, np.newaxis], axis=-1)[:, 0]
+            row_out[i0:i1] = (lo + hi) / 2.
+
+        row_out[nvalid == 0] = np.nan
+
+        if (istart, istop) != (0, n):
+            ioutside = np.arange(n)[indices]
+            row_out[(ioutside < istart) | (ioutside >= istop)] = np.nan
+
+    return out.reshape(arr.shape[:-1]+(nout, ))
 
 
 def inherit_unit(y, x):
@@ -92,42 +216,77 @@ def hasunit(x):
         return True
 
 
-def selectcont(spec, xcoord, z, AGN_TYPE=2, NLcutwidth=70., BLcutwidth=180., vacuum=True):
+def selectcont(spec, xcoord, z, AGN_TYPE=2, NLcutwidth=70., BLcutwidth=180., vacuum=True, istarts=None):
     """
     PURPOSE: select continuum w pixels using 1d spec
     PARAMETERS: 
-        spec
-        xcoord     [AA] wavelengths
-        z
+        spec       of shape (n_ws,), or a batch of spectra of shape (n_spec, n_ws)
+        xcoord     [AA] wavelengths, of shape (n_ws,) or the same shape as spec
+        z          float, or array of shape (n_spec,) for a batch of spectra
         AGN_TYPE=2
         NLcutwidth=70.
         BLcutwidth=180.
         vacuum=True
+        istarts=None  int, or array of shape (n_spec,), the first pixel of each spectrum on a common grid, from which the pixels 1871:1905 of the spectrum are counted
+    RETURN:
+        selkeep    bool array of the same shape as spec
     """
-    NL = linelist.narrowline
-    BL = linelist.broadline
+    spec = np.asarray(spec)
+    xcoord = np.broadcast_to(np.asarray(xcoord), spec.shape)
+    zs = np.broadcast_to(np.asarray(z, dtype='float'), spec.shape[:-1])
+
+    llambdas_NL = getllambdas(linelist.narrowline, vacuum=vacuum)
+    if AGN_TYPE == 1:
+        llambdas_BL = getllambdas(linelist.broadline, vacuum=vacuum)
+        llambda_Ha = getllambda('Ha', vacuum=vacuum)
 
-    llambdas = np.array([])
-    for i in range(len(NL)):
-        llambdas = np.append(llambdas, getllambda(NL[i], vacuum=vacuum))
-    llambdas = llambdas*(1.+z)
     selcut = (spec == 0)
-    for i in range(llambdas.size):
-        selline = np.absolute(xcoord-llambdas[i])<NLcutwidth/2.
-        selcut = np.any([selcut, selline], axis=0)
-    selkeep = np.logical_not(selcut)
+    selkeep = np.empty(spec.shape, dtype='bool')
 
-    if AGN_TYPE == 1:
-        llambdas = np.array([])
-        for i in range(len(BL)):
-            llambdas = np.append(llambdas, getllambda(BL[i], vacuum=vacuum))
-        llambdas = llambdas*(1.+z)
-        selcut = (spec==0)
-        for i in range(llambdas.size):
-            selline = np.absolute(xcoord-llambdas[i]) < BLcutwidth/2.
-            selcut = np.any([selcut, selline], axis=0)
-        selline = np.absolute(xcoord-getllambda('Ha', vacuum=vacuum)*(1.+z)) < 200.
-        selcut = np.any([selcut, selline], axis=0)
-        selkeep = np.all([selkeep, np.logical_not(selcut)], axis=0)
-    selkeep[np.all([np.arange(selkeep.size) > 1870, np.arange(selkeep.size) < 1905], axis=0)] = 0
-    return selkeep.astype('bool')
+    for i in np.ndindex(spec.shape[:-1]):
+        x = xcoord[i]
+        selline = select_near_lines(x, llambdas_NL*(1.+zs[i]), NLcutwidth/2.)
+
+        if AGN_TYPE == 1:
+            selline |= select_near_lines(x, llambdas_BL*(1.+zs[i]), BLcutwidth/2.)
+            selline |= select_near_lines(x, llambda_Ha*(1.+zs[i]), 200.)
+
+        selkeep[i] = ~(selcut[i] | selline)
+
+    if istarts is None:
+        selkeep[..., 1871:1905] = False
+    else:
+        ipix = np.arange(spec.shape[-1]) - np.asarray(istarts, dtype='int')[..., np.newaxis]
+        selkeep &= ~((ipix >= 1871) & (ipix < 1905))
+
+    return selkeep
+
+
+def select_near_lines(xcoord, llambdas, halfwidth):
+    """
+    return bool array of the pixels within halfwidth of any of the lines, i.e., where np.absolute(xcoord - llambda) < halfwidth for any of the llambdas. 
+
+    The line wavelengths are sorted once and each pixel is compared only to its nearest lines on either side, which are located by np.searchsorted. As all the lines have the same halfwidth, this gives exactly the same pixels as comparing to every line. 
+
+    Params
+    ------
+    xcoord (array) [AA]
+    llambdas (array) [AA]
+    halfwidth (float) [AA]
+
+    Return
+    ------
+    selline (array of bool)
+    """
+    xcoord = np.asarray(xcoord)
+    llambdas = np.unique(llambdas)
+
+    if llambdas.size == 0:
+        return np.zeros(xcoord.shape, dtype='bool')
+
+    iright = np.searchsorted(llambdas, xcoord, side='left')
+    ileft = np.maximum(iright - 1, 0)
+    iright = np.minimum(iright, llambdas.size - 1)
+
+    selline = (np.absolute(xcoord - llambdas[ileft]) < halfwidth) | (np.absolute(xcoord - llambdas[iright]) < halfwidth)
+    return selline
@@ -35,26 +35,119 @@ def calc_line_flux(spec, ws, ivar, w0, w1, u_flux):
 	return f, ferr
 
 
-def trapz(x, y):
-	""" calculate the trapz integral of function y = f(x) """
-	dx = np.diff(x)
+def calc_line_fluxes(spec, ws, ivar, w0s, w1s, u_flux):
+	""" 
+	calculate the fluxes and flux errors of many lines, each within the range w0 and w1, using trapz rule in one pass, see calc_line_fluxes_uless(). 
+
+	Params
+	------
+	spec (column or quantity): of shape (n_ws,) or (n_spec, n_ws)
+	ws (column or quantity): of shape (n_ws,) or the same shape as spec, increasing
+	ivar (column or quantity): the same shape as spec
+	w0s, w1s (array): of shape (n_lines,) or (n_spec, n_lines), in units of ws
+	u_flux (unit)
+
+	Return
+	------
+	f (quantity): of shape (n_lines,) or (n_spec, n_lines)
+	ferr (quantity): same shape as f
+	"""
+	u_spec = spec.unit
+	u_ws = ws.unit
+	ivar = ivar.to(1./(u_spec**2))
+
+	if ivar.unit != (1./(spec.unit**2)):
+		raise Exception("[spector] spec and ivar units inconsistent")
+
+	with np.errstate(divide='ignore'):
+		var_uless = 1./np.array(ivar, dtype='float')
+
+	f, fvar = calc_line_fluxes_uless(np.array(spec), np.array(ws), var_uless, w0s, w1s)
+
+	f = (f*u_spec*u_ws).to(u_flux)
+	ferr = (np.sqrt(fvar)*u_spec*u_ws).to(u_flux)
+
+	return f, ferr
+
+
+def calc_line_fluxes_uless(spec, ws, var, w0s, w1s):
+	""" 
+	unit-free kernel of calc_line_fluxes(). For each line, integrate spec and its variance var by trapz rule over the pixels with w0 < ws < w1, as trapz_var() does. 
 
-	s = 0.
+	The cumulative sums of the trapz terms of the flux and the variance are calculated once per spectrum (in float64), and each line window is then answered by two np.searchsorted lookups of its pixel range. Windows that contain non-finite terms, e.g., pixels with ivar = 0, are summed directly. 
 
-	for i in range(len(dx)):
-		s += (y[i] + y[i+1])*0.5*dx[i]
+	Params
+	------
+	spec (array): of shape (n_ws,) or (n_spec, n_ws)
+	ws (array): of shape (n_ws,) or the same shape as spec, increasing
+	var (array): the same shape as spec
+	w0s, w1s (array): of shape (n_lines,) or (n_spec, n_lines)
 
-	return s
+	Return
+	------
+	f (array): of shape (n_lines,) or (n_spec, n_lines)
+	fvar (array): same shape as f
+	"""
+	spec = np.asarray(spec, dtype='float')
+	ws = np.broadcast_to(np.asarray(ws, dtype='float'), spec.shape)
+	var = np.asarray(var, dtype='float')
+	w0s = np.asarray(w0s, dtype='float')
+	w1s = np.asarray(w1s, dtype='float')
+
+	if np.any(np.diff(ws, axis=-1) <= 0.):
+		raise ValueError("[lineflux] wavelengths are not increasing")
+
+	spec2d, ws2d, var2d = [arr.reshape(-1, arr.shape[-1]) for arr in [spec, ws, var]]
+	nlines = w0s.shape[-1]
+	w0s2d = np.broadcast_to(w0s, spec.shape[:-1]+(nlines, )).reshape(-1, nlines)
+	w1s2d = np.broadcast_to(w1s, spec.shape[:-1]+(nlines, )).reshape(-1, nlines)
+
+	f = np.zeros(w0s2d.shape)
+	fvar = np.zeros(w0s2d.shape)
+
+	for k in range(spec2d.shape[0]):
+		x, y, yvar = ws2d[k], spec2d[k], var2d[k]
+
+		dx = np.diff(x)
+		terms = (y[:-1] + y[1:]) * 0.5*dx
+		terms_var = (yvar[:-1] + yvar[1:]) * (0.5*dx)**2
+
+		# pixels i0 to i1-1 are in the window, which has terms i0 to i1-2
+		i0 = np.searchsorted(x, w0s2d[k], side='right')
+		i1 = np.searchsorted(x, w1s2d[k], side='left')
+		i1 = np.maximum(i1 - 1, i0)
+
+		for arr_terms, arr_out in [(terms, f), (terms_var, fvar)]:
+			isfinite = np.isfinite(arr_terms)
+			cumsum = np.concatenate([[0.], np.cumsum(np.where(isfinite, arr_terms, 0.))])
+			cumnonfinite = np.concatenate([[0], np.cumsum(~isfinite)])
+
+			arr_out[k] = cumsum[i1] - cumsum[i0]
+
+			for j in np.flatnonzero(cumnonfinite[i1] > cumnonfinite[i0]):
+				arr_out[k, j] = np.sum(arr_terms[i0[j]:i1[j]])
+
+	shape_out = spec.shape[:-1] + (nlines, )
+	return f.reshape(shape_out), fvar.reshape(shape_out)
+
+
+def trapz(x, y):
+	""" calculate the trapz integral of function y = f(x) """
+	x = np.asarray(x)
+	y = np.asarray(y)
+
+	return np.sum((y[:-1] + y[1:])*0.5*np.diff(x))
 
 
 def trapz_var(x, y, yvar):
 	""" calculate the trapz integral of function y = f(x) and the variance of the integral"""
-	dx = np.diff(x)
+	x = np.asarray(x)
+	y = np.asarray(y)
+	yvar = np.asarray(yvar)
 
-	s = 0.
-	svar = 0.
+	dx = np.diff(x)
 
-	s = np.sum([(y[i] + y[i+1]) * 0.5*dx[i] for i in range(len(dx))])
-	svar = np.sum([(yvar[i] + yvar[i+1]) * (0.5*dx[i])**2 for i in range(len(dx))])
+	s = np.sum((y[:-1] + y[1:]) * 0.5*dx)
+	svar = np.sum((yvar[:-1] + yvar[1:]) * (0.5*dx)**2)
 
 	return s, svar
@@ -0,0 +1,123 @@
+# linefluxmc.py
+
+"""
+Monte Carlo line flux errors: realizations of the spectrum are drawn from its ivar and pushed through the decomposition and the line integration as one batch
+"""
+import numpy as np
+import scipy.ndimage as scind
+
+from . import getconti
+from . import lineflux
+
+
+def draw_realizations(spec, ivar, nreal=1000, kernel=None, rng=None):
+	"""
+	draw realizations of the spectrum with gaussian noise of variance 1/ivar, zero noise where ivar = 0
+
+	Params
+	------
+	spec (array): of shape (n_ws,)
+	ivar (array): of shape (n_ws,)
+	nreal=1000 (int): number of realizations
+	kernel=None (array):
+		if provided, the noise is correlated between pixels by convolving white noise with the kernel, which is normalized such that sum(kernel**2) = 1 to preserve the variance of each pixel (the noise wraps around at the ends)
+	rng=None (numpy.random.Generator)
+
+	Return
+	------
+	specs (array of shape (nreal, n_ws))
+	"""
+	if rng is None:
+		rng = np.random.default_rng()
+
+	spec = np.asarray(spec, dtype='float')
+	ivar = np.asarray(ivar, dtype='float')
+
+	sigma = np.zeros(ivar.shape)
+	sigma[ivar > 0.] = 1./np.sqrt(ivar[ivar > 0.])
+
+	noise = rng.standard_normal((nreal, spec.shape[-1]))
+
+	if kernel is not None:
+		kernel = np.asarray(kernel, dtype='float')
+		kernel = kernel / np.sqrt(np.sum(kernel**2))
+		noise = scind.convolve1d(noise, kernel, axis=-1, mode='wrap')
+
+	return spec + noise*sigma
+
+
+def calc_line_fluxes_mc(spec, ws, ivar, z, w0s, w1s, nreal=1000, kernel=None, speccont=None, size=300, seed=None, chunksize=100):
+	"""
+	return nreal realizations of the line fluxes of the spectrum, see draw_realizations(). Each of the realizations is decomposed into continuum and lines as in getconti.decompose_cont_line_t2AGN() with method 'running_median', with the continuum mask of the spectrum, and the line component is integrated over w0 < ws < w1 as in lineflux.calc_line_fluxes_uless().
+
+	As only the pixels within the line windows enter the fluxes, the running median is only evaluated at those pixels, which makes the cost proportional to the width of the windows rather than of the spectrum.
+
+	Params
+	------
+	spec (array): of shape (n_ws,), unitless
+	ws (array): of shape (n_ws,), increasing [AA]
+	ivar (array): of shape (n_ws,)
+	z (float)
+	w0s, w1s (array): of shape (n_lines,) [AA]
+	nreal=1000 (int)
+	kernel=None (array): noise correlation kernel, see draw_realizations()
+	speccont=None (array):
+		if provided, the continuum is fixed to it instead of the running median of each realization, e.g., for a modelBC03 continuum
+	size=300 (int): size of the running median window
+	seed=None (int)
+	chunksize=100 (int): number of realizations processed at a time
+
+	Return
+	------
+	fs (array of shape (nreal, n_lines))
+	"""
+	rng = np.random.default_rng(seed)
+
+	spec = np.asarray(spec, dtype='float')
+	ws = np.asarray(ws, dtype='float')
+	w0s = np.asarray(w0s, dtype='float')
+	w1s = np.asarray(w1s, dtype='float')
+
+	selcon = getconti.selectcont(spec, ws, z, AGN_TYPE=2, NLcutwidth=80., BLcutwidth=180., vacuum=True)
+
+	# pixels in the line windows
+	i0s = np.searchsorted(ws, w0s, side='right')
+	i1s = np.searchsorted(ws, w1s, side='left')
+	indices = np.unique(np.concatenate([np.arange(i0, i1) for i0, i1 in zip(i0s, i1s)] + [np.array([], dtype='int')]))
+
+	if len(indices) < 2:
+		return np.zeros((nreal, len(w0s)))
+
+	fs = np.zeros((nreal, len(w0s)))
+	for i0 in range(0, nreal, chunksize):
+		i1 = min(i0 + chunksize, nreal)
+		specs = draw_realizations(spec, ivar, nreal=i1-i0, kernel=kernel, rng=rng)
+
+		if speccont is None:
+			conts = getconti.getcont_medianfilter(specs, selcon, size=size, indices=indices)
+		else:
+			conts = np.asarray(speccont, dtype='float')[indices]
+
+		lines = specs[:, indices] - conts
+		lines[:, selcon[indices]] = 0.
+
+		fs[i0:i1], __ = lineflux.calc_line_fluxes_uless(lines, ws[indices], np.zeros(lines.shape), w0s, w1s)
+
+	return fs
+
+
+def summarize_realizations(fs, percentiles=[15.87, 50., 84.13]):
+	"""
+	return the standard deviation and the percentiles of the realizations of the fluxes
+
+	Params
+	------
+	fs (array of shape (nreal, n_lines))
+	percentiles=[15.87, 50., 84.13]
+
+	Return
+	------
+	fstd (array of shape (n_lines,))
+	fpercentiles (array of shape (len(percentiles), n_lines))
+	"""
+	return np.std(fs, axis=0, ddof=1), np.percentile(fs, percentiles, axis=0)
@@ -0,0 +1,404 @@
+# specstack.py
+
+"""
+batch spectral engine that operates on the spectra of many objects stacked on a common loglam grid
+"""
+
+import os
+import numpy as np
+import astropy.table as at
+import astropy.units as u
+import astropy.constants as const
+from astropy.io import fits
+
+from .. import filters
+from ..obsobj.sdss import sdssSpec
+from . import getconti
+from . import lineflux
+
+
+class SpecStack(object):
+
+	def __init__(self, dirs_obj, zs, survey='hsc', dloglam=1.e-4, chunksize=1000):
+		"""
+		SpecStack, the sdss/boss spectra (spec.fits) of many objects stacked into 2-D masked arrays on a common loglam grid.
+
+		The line masking, the 'running_median' decomposition into continuum and lines, the synthetic photometry and the line fluxes are run as array operations over the stack, and the results of all the objects are collected in one table, see make_spec_table(). The decomposed spectrum of each object can be written to its directory with write_spec_decomposed(), such that the per-object Spector reads it instead of recomputing.
+
+		Each spectrum is treated within its own coverage, istart:istop on the grid: the running median is reflected at its edges, and the integrals stop at them. The results are then the same as those of Spector with decompose_method='running_median'. The spectra are read one at a time into the stack, which is kept in float64, and the operations are done on chunks of chunksize spectra, which bounds the memory of the temporary arrays.
+
+		Params
+		------
+		dirs_obj (list of str):
+			directories of the objects, each containing spec.fits
+		zs (array):
+			redshifts of the objects
+		survey='hsc' (str):
+			survey of the photometric system
+		dloglam=1.e-4 (float):
+			step of the loglam grid of the spectra
+		chunksize=1000 (int):
+			number of spectra processed at once
+
+		Attributes
+		----------
+		dirs_obj (list of str)
+		zs (array of shape (n_spec,))
+		survey (str)
+		bands (list of str)
+		chunksize (int)
+		loglam (array of shape (n_grid,)): the common grid
+		ws (array of shape (n_grid,)) [AA]
+		istarts, istops (arrays of int of shape (n_spec,)): the coverage of each spectrum on the grid
+		flux (masked array of shape (n_spec, n_grid)) [1e-17 erg / (Angstrom cm2 s)]
+			masked outside of the coverage of each spectrum
+		ivar (masked array of shape (n_spec, n_grid))
+		selcon, speccont, specline (masked arrays of shape (n_spec, n_grid)):
+			available after decompose()
+		"""
+		self.dirs_obj = list(dirs_obj)
+		self.zs = np.asarray(zs, dtype='float')
+		self.survey = survey
+		self.bands = filters.filtertools.surveybands[survey]
+		self.chunksize = chunksize
+
+		self.u_spec = 1.e-17*u.Unit('erg / (Angstrom cm2 s)')
+		self.u_ws = u.AA
+
+		if len(self.zs) != len(self.dirs_obj):
+			raise ValueError("[specstack] numbers of objects and redshifts are different")
+
+		self._stack_specs(dloglam=dloglam)
+
+		self.selcon = None
+		self.speccont = None
+		self.specline = None
+
+
+	def _stack_specs(self, dloglam):
+		""" 
+		set the common grid and the stacked flux and ivar. 
+
+		The coverage of each spectrum is set from its loglam column in a first pass. The stack is then allocated and filled in a second pass that reads one spectrum at a time, see obsobj.sdss.sdssSpec, such that only one spectrum is held in memory besides the stack. 
+		"""
+		fns = [dir_obj+'spec.fits' for dir_obj in self.dirs_obj]
+
+		coverages = [_read_loglam_coverage(fn) for fn in fns]
+		loglam0 = min(loglam_start for loglam_start, __ in coverages)
+		istarts = np.array([int(np.round((loglam_start - loglam0) / dloglam)) for loglam_start, __ in coverages], dtype='int')
+		istops = istarts + np.array([n for __, n in coverages], dtype='int')
+		ngrid = np.max(istops)
+
+		loglam = np.full(ngrid, np.nan)
+		flux = np.zeros((len(fns), ngrid))
+		ivar = np.zeros((len(fns), ngrid))
+		mask = np.ones((len(fns), ngrid), dtype='bool')
+
+		for i, (fn, istart, istop) in enumerate(zip(fns, istarts, istops)):
+			spec = sdssSpec(fn)
+
+			if len(spec.loglam) != istop - istart:
+				raise ValueError("[specstack] spectrum {} changed while being read".format(self.dirs_obj[i]))
+
+			isfilled = np.isfinite(loglam[istart:istop])
+			if not np.allclose(loglam[istart:istop][isfilled], spec.loglam[isfilled], rtol=0., atol=dloglam*0.01):
+				raise ValueError("[specstack] spectrum {} is not on the common loglam grid".format(self.dirs_obj[i]))
+
+			loglam[istart:istop][~isfilled] = spec.loglam[~isfilled]
+			flux[i, istart:istop] = spec.flux
+			ivar[i, istart:istop] = spec.ivar
+			mask[i, istart:istop] = False
+			del spec
+
+		if np.any(np.isnan(loglam)):
+			raise ValueError("[specstack] the spectra do not cover a continuous loglam grid")
+
+		self.loglam = loglam
+		self.ws = 10.**loglam
+		self.istarts = istarts
+		self.istops = istops
+		self.flux = np.ma.MaskedArray(flux, mask=mask)
+		self.ivar = np.ma.MaskedArray(ivar, mask=mask)
+
+
+	def decompose(self, size=300):
+		"""
+		decompose the spectra into continuum and lines by masking the lines and running median filter, see getconti.decompose_cont_line_t2AGN() with method 'running_median'. 
+
+		The components of all the spectra are kept in float64, which takes 16 bytes per pixel. make_spec_table() does not need them, as it decomposes chunk by chunk if decompose() has not been run. 
+
+		Params
+		------
+		size=300 (int): size of the running median window in pixels
+
+		Set Attributes
+		--------------
+		selcon, speccont, specline (masked arrays)
+		"""
+		selcon = np.zeros(self.flux.shape, dtype='bool')
+		speccont = np.zeros(self.flux.shape)
+		specline = np.zeros(self.flux.shape)
+
+		for rows in self._iter_chunks():
+			selcon[rows], speccont[rows], specline[rows] = self._decompose_rows(rows, size=size)
+
+		self.selcon = np.ma.MaskedArray(selcon, mask=self.flux.mask)
+		self.speccont = np.ma.MaskedArray(speccont, mask=self.flux.mask)
+		self.specline = np.ma.MaskedArray(specline, mask=self.flux.mask)
+
+
+	def calc_Fnu_in_bands(self, component='all'):
+		"""
+		synthetic photometry of the spectra in the bands of the survey, see _calc_Fnu_in_bands_rows()
+
+		Params
+		------
+		component='all': from ['all', 'cont', 'line']
+
+		Return
+		------
+		Fnu (quantity of shape (n_spec, n_bands)) in "erg s-1 cm-2 Hz-1"
+		"""
+		Fnu = np.zeros((len(self.zs), len(self.bands)))
+
+		for rows in self._iter_chunks():
+			Fnu[rows] = self._calc_Fnu_in_bands_rows(rows, self._get_components_rows(rows)[component])
+
+		return Fnu * filters.inttools.u_fnu
+
+
+	def calc_line_fluxes(self, lines=['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366'], dv=1400*u.km/u.s, u_flux=u.Unit("1E-17 erg cm-2 s-1")):
+		"""
+		calculate the line fluxes of the spectra by integrating the line component over +/- dv around the lines, as Spector._calc_line_fluxes() does, including the boost of the error by 20% to account for pixel covariance, see _calc_line_fluxes_rows()
+
+		Params
+		------
+		lines (list of str)
+		dv=1400*u.km/u.s (quantity)
+		u_flux=u.Unit("1E-17 erg cm-2 s-1")
+
+		Return
+		------
+		fs (quantity of shape (n_spec, n_lines))
+		ferrs (quantity of shape (n_spec, n_lines))
+		"""
+		fs = np.zeros((len(self.zs), len(lines)))
+		fvars = np.zeros((len(self.zs), len(lines)))
+
+		for rows in self._iter_chunks():
+			fs[rows], fvars[rows] = self._calc_line_fluxes_rows(rows, self._get_components_rows(rows)['line'], lines=lines, dv=dv)
+
+		return self._to_line_fluxes(fs, fvars, u_flux=u_flux)
+
+
+	def make_spec_table(self, lines=['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366'], u_flux=u.Unit("1E-17 erg cm-2 s-1")):
+		"""
+		return one table of all the objects with the synthetic magnitudes and fnu of the components 'all', 'cont' and 'line' in each of the bands, as in Spector.make_spec_mag(), and the line fluxes, as in Spector.make_lineflux(). If decompose() has not been run, the spectra are decomposed chunk by chunk and the components are not kept.
+
+		Params
+		------
+		lines (list of str)
+		u_flux=u.Unit("1E-17 erg cm-2 s-1")
+
+		Return
+		------
+		tab (astropy table)
+			columns: dir_obj, z, spec{component}Mag_{band} [ABmag], spec{component}Fnu_{band} [nanomaggy], f_{line}, ferr_{line} [u_flux]
+		"""
+		components = ['all', 'cont', 'line']
+		Fnus = np.zeros((len(components), len(self.zs), len(self.bands)))
+		fs = np.zeros((len(self.zs), len(lines)))
+		fvars = np.zeros((len(self.zs), len(lines)))
+
+		for rows in self._iter_chunks():
+			specs = self._get_components_rows(rows)
+
+			for Fnu, component in zip(Fnus, components):
+				Fnu[rows] = self._calc_Fnu_in_bands_rows(rows, specs[component])
+
+			fs[rows], fvars[rows] = self._calc_line_fluxes_rows(rows, specs['line'], lines=lines)
+
+		tabmag = at.Table()
+		tabfnu = at.Table()
+		for Fnu, component in zip(Fnus*filters.inttools.u_fnu, components):
+			with np.errstate(invalid='ignore', divide='ignore'):
+				mag = Fnu.to(u.ABmag)
+			fnu_nm = Fnu.to(u.nanomaggy)
+
+			for i, band in enumerate(self.bands):
+				tabmag[get_specmag_colname(band, component=component, fluxquantity='mag')] = mag[:, i].value
+				tabfnu[get_specmag_colname(band, component=component, fluxquantity='fnu')] = fnu_nm[:, i].value
+
+		fs, ferrs = self._to_line_fluxes(fs, fvars, u_flux=u_flux)
+		tabflux = at.Table()
+		for i, line in enumerate(lines):
+			tabflux['f_{}'.format(line)] = fs[:, i].value
+			tabflux['ferr_{}'.format(line)] = ferrs[:, i].value
+
+		tab = at.hstack([at.Table([self.dirs_obj, self.zs], names=['dir_obj', 'z']), tabmag, tabfnu, tabflux])
+		tab.meta['comments'] = [
+								"survey_photo: {}".format(self.survey),
+								"unit_mag: ABmag",
+								"unit_fnu: nanomaggy",
+								"unit_flux: {}".format(u_flux.to_string()),
+								]
+		return tab
+
+
+	def write_spec_table(self, fn, overwrite=False, **kwargs):
+		""" write the table of make_spec_table() to fn, e.g., 'spec_table.csv', and return status """
+		if not os.path.isfile(fn) or overwrite:
+			tab = self.make_spec_table(**kwargs)
+			tab.write(fn, comment='#', format='ascii.csv', overwrite=overwrite)
+
+		status = os.path.isfile(fn)
+		return status
+
+
+	def write_spec_decomposed(self, i, overwrite=False):
+		"""
+		write the decomposed spectrum of the i-th object to its directory as spec_decomposed.fits, in the format of Spector.make_spec_decomposed(), such that the Spector of the object (with decompose_method='running_median') uses it.
+
+		Params
+		------
+		i (int)
+		overwrite=False
+
+		Return
+		------
+		status (bool)
+		"""
+		fn = self.dirs_obj[i]+'spec_decomposed.fits'
+
+		if not os.path.isfile(fn) or overwrite:
+			if self.specline is None:
+				self.decompose()
+
+			isin = ~self.flux.mask[i]
+			tab = at.Table([self.ws[isin], self.flux.data[i, isin], self.speccont.data[i, isin], self.specline.data[i, isin], self.selcon.data[i, isin]], names=['ws', 'spec', 'speccont', 'specline', 'iscon'])
+			tab['ws'].unit = self.u_ws
+			tab['spec'].unit = self.u_spec
+			tab['speccont'].unit = self.u_spec
+			tab['specline'].unit = self.u_spec
+
+			tab.write(fn, format='fits', overwrite=True)
+
+		status = os.path.isfile(fn)
+		return status
+
+
+	def _iter_chunks(self):
+		""" yield slices of chunksize rows of the stack """
+		for i0 in range(0, len(self.zs), self.chunksize):
+			yield slice(i0, i0+self.chunksize)
+
+
+	def _decompose_rows(self, rows, size=300):
+		""" 
+		decompose the spectra of rows, each within its coverage, see decompose()
+
+		Return
+		------
+		selcon (array of bool), speccont (array of float), specline (array of float): of shape (n_rows, n_grid), zero outside of the coverage
+		"""
+		spec = self.flux.data[rows]
+		isin = ~self.flux.mask[rows]
+		edges = np.stack([self.istarts[rows], self.istops[rows]], axis=-1)
+
+		selcon = getconti.selectcont(spec, self.ws, self.zs[rows], AGN_TYPE=2, NLcutwidth=80., BLcutwidth=180., vacuum=True, istarts=self.istarts[rows]) & isin
+		speccont = getconti.getcont_medianfilter(spec, selcon, size=size, edges=edges)
+		specline = spec - speccont
+		specline[selcon] = 0.
+
+		return selcon, np.where(isin, speccont, 0.), np.where(isin, specline, 0.)
+
+
+	def _get_components_rows(self, rows):
+		""" return dict of the spectra of the components 'all', 'cont', 'line' of rows in float64, those of decompose() if run, otherwise decomposed on the fly """
+		if self.specline is None:
+			__, speccont, specline = self._decompose_rows(rows)
+		else:
+			speccont, specline = self.speccont.data[rows], self.specline.data[rows]
+
+		return {'all': self.flux.data[rows], 'cont': speccont, 'line': specline}
+
+
+	def _calc_Fnu_in_bands_rows(self, rows, spec):
+		""" 
+		return Fnu [erg s-1 cm-2 Hz-1] of shape (n_rows, n_bands) of the spectra spec of rows, see filters.synphot.calc_Fnu_in_bands_from_fl(). 
+
+		The spectra are integrated over the whole grid with zeros outside of their coverage, and then the half trapz intervals beyond the edges of the coverage are taken out of the pixels at the edges, such that each spectrum is integrated over its coverage only. 
+		"""
+		ws = self.ws
+		W = filters.synphot.get_weight_matrix(ws, survey=self.survey, bands=self.bands)
+
+		# weights of the half trapz intervals below and above each pixel
+		halfdlnl = 0.5 * np.diff(np.log(ws), prepend=np.nan, append=np.nan)
+		G = W / filters.synphot.calc_trapz_weights(np.log(ws))
+		dW_lo = G * halfdlnl[:-1]
+		dW_hi = G * halfdlnl[1:]
+
+		fl = (spec * self.u_spec).to_value(filters.inttools.u_fl)
+		istarts, istops = self.istarts[rows], self.istops[rows]
+		irows = np.arange(len(fl))
+
+		Fnu = filters.synphot.calc_Fnu_in_bands_from_fl(fl, ws, survey=self.survey, bands=self.bands).value
+		Fnu -= np.where(istarts[:, np.newaxis] > 0, fl[irows, istarts][:, np.newaxis] * dW_lo[:, istarts].T, 0.)
+		Fnu -= np.where(istops[:, np.newaxis] < len(ws), fl[irows, istops-1][:, np.newaxis] * dW_hi[:, istops-1].T, 0.)
+
+		return Fnu
+
+
+	def _calc_line_fluxes_rows(self, rows, specline, lines, dv=1400*u.km/u.s):
+		""" 
+		return the line fluxes and their variances [1e-17 erg / (cm2 s)] of shape (n_rows, n_lines) of the line spectra specline of rows, see lineflux.calc_line_fluxes_uless(). The windows are cut at the edges of the coverage of each spectrum. 
+		"""
+		beta = (dv/const.c).to_value(u.dimensionless_unscaled)
+		ws_line = np.outer(1.+self.zs[rows], filters.getllambdas(lines, vacuum=True))
+
+		# integrate over the pixels w0 < ws < w1 within the coverage
+		ws_lo = np.append(-np.inf, self.ws)[self.istarts[rows]]
+		ws_hi = np.append(self.ws, np.inf)[self.istops[rows]]
+		w0s = np.maximum(ws_line*(1-beta), ws_lo[:, np.newaxis])
+		w1s = np.minimum(ws_line*(1+beta), ws_hi[:, np.newaxis])
+
+		with np.errstate(divide='ignore'):
+			var = 1./self.ivar.data[rows]
+
+		return lineflux.calc_line_fluxes_uless(specline, self.ws, var, w0s, w1s)
+
+
+	def _to_line_fluxes(self, fs, fvars, u_flux):
+		""" return the line fluxes and the errors, boosted by 20% for pixel covariance, in u_flux """
+		u_integral = self.u_spec*self.u_ws
+		fs = (fs*u_integral).to(u_flux)
+		ferrs = (np.sqrt(fvars)*u_integral).to(u_flux) * 1.2
+
+		return fs, ferrs
+
+
+
+def _read_loglam_coverage(fn):
+	""" return the first loglam and the number of pixels of the coadded spectrum (HDU 1) of spec.fits fn, without reading the other columns """
+	if not os.path.isfile(fn):
+		raise IOError("[specstack] spec fits file {} does not exist".format(fn))
+
+	with fits.open(fn, memmap=True) as hdus:
+		spectable = hdus[1].data
+		loglam_start, n = float(spectable['loglam'][0]), len(spectable)
+		del spectable
+
+	return loglam_start, n
+
+
+def get_specmag_colname(band, component, fluxquantity):
+	"""
+	return the column name of the spec_mag table, e.g., 'speclineFnu_i', same as those of Spector.make_spec_mag()
+
+	band : e.g. 'i'
+	component: from ['all', 'cont', 'line', 'contextrp']
+	fluxquantity: from ['fnu', 'mag']
+	"""
+	tag_component = {'all': '', 'cont': 'cont', 'line': 'line', 'contextrp': 'contextrp'}
+	tag_quantity = {'fnu': 'Fnu', 'mag': 'Mag'}
+	return 'spec{0}{1}_{2}'.format(tag_component[component], tag_quantity[fluxquantity], band)
@@ -12,11 +12,14 @@ import modelBC03
 import os
 
 from ..obsobj import Operator
+from ..obsobj.sdss import sdssSpec
 from .. import filters
 from . import getconti
 from . import extrap
 from . import linelist
 from . import lineflux
+from . import linefluxmc
+from . import bc03cache
 
 
 class Spector(Operator):
@@ -42,10 +45,10 @@ class Spector(Operator):
 			survey of the photometric system
 			if not provided, use self.obj.survey. Raise exception if self.obj.survey does not exist. 
 		z (float):  
-			redshift, if not provided, use obj.z or obj.sdss.z
+			redshift, if not provided, use obj.z or obj.sdss.z, which is looked up on first use
 		survey_spec (str): 
 			survey of the spectrum
-			if not provided, use the instrument of sdss_xid.csv
+			if not provided, use the instrument of sdss_xid.csv, which is looked up on first use
 		decompose_method = 'modelBC03' (str)
 			'modelBC03' or 'running_median'
 			the method for decomposing spectrum into continuum and lines, and extrapolate the continum. 
@@ -69,7 +72,7 @@ class Spector(Operator):
 		decompose_method (str)
 			'modelBC03' or 'running_median'
 		conti_model
-			if decompose_method is modelBC03 then this is an instance of modelBC03
+			if decompose_method is modelBC03 and the fit is done by this Spector then this is the results of the fit, see bc03cache.BC03Fit
 		"""
 		
 		super(Spector, self).__init__(**kwargs)
@@ -81,28 +84,9 @@ class Spector(Operator):
 		else: 
 			self.survey = kwargs.pop('survey')
 
-		# set survey_spec
-		self.survey_spec = kwargs.pop('survey_spec', 'auto')
-
-		if self.survey_spec in ['sdss', 'boss', 'eboss', 'auto']:
-			if self.survey_spec == 'auto':
-				self.obj.add_sdss(toload_photoobj=False)
-				self.survey_spec = self.obj.sdss.instrument.lower()
-
-			# # sanity check - spec name consistent
-			# if (self.survey_spec != self.obj.sdss.instrument.lower()):
-			# 	raise Exception("[spector] survey_spec inconsistent with sdss_xid.csv:instrument")
-
-		# set z
-		if 'z' in kwargs:
-			self.z = kwargs.pop('z')
-
-		elif hasattr(self.obj, 'z'):
-			self.z = self.obj.z
-
-		elif self.survey_spec in ['sdss', 'boss', 'eboss', 'auto']:
-			self.obj.add_sdss(toload_photoobj=False)
-			self.z = kwargs.pop('z', self.obj.sdss.z) 
+		# set survey_spec and z, which are resolved on first use, see properties survey_spec and z
+		self._survey_spec = kwargs.pop('survey_spec', 'auto')
+		self._z = kwargs.pop('z', None)
 
 		# set self.decompose_method
 		self.decompose_method = kwargs.pop('decompose_method', 'modelBC03')
@@ -114,20 +98,81 @@ class Spector(Operator):
 
 		# define paths
 		self.fp_spec = self.dir_obj+'spec.fits'
-		self.fp_spec_decomposed = self.dir_obj+'spec_decomposed.ecsv'
-		self.fp_spec_contextrp = self.dir_obj+'spec_contextrp.ecsv'
+		self.fp_spec_decomposed = self.dir_obj+'spec_decomposed.fits'
+		self.fp_spec_contextrp = self.dir_obj+'spec_contextrp.fits'
+		self.fp_spec_decomposed_ecsv = self.dir_obj+'spec_decomposed.ecsv'
+		self.fp_spec_contextrp_ecsv = self.dir_obj+'spec_contextrp.ecsv'
+		self.fp_spec_bc03fit = self.dir_obj+'spec_bc03fit.fits'
 		self.fp_spec_mag = self.dir_obj+'spec_mag.csv'
 		self.fp_spec_lineflux = self.dir_obj+'spec_lineflux.csv'
 		self.fp_spec_linefrac = self.dir_obj+'spec_linefrac.csv'
 
-		self.spec, self.ws = self.get_spec_ws()
+		self._spectabs = {} # spectrum tables kept in memory, see _read_spectab()
+		self._spec_handle = None # spec.fits in memory, see _get_spec_handle()
+
+		self._spec_ws = None # spec and ws, see properties spec and ws
 		self.u_spec = 1.e-17*u.Unit('erg / (Angstrom cm2 s)') # default unit of spec
 		self.u_ws = u.AA # default unit of ws
 
 
+	@property
+	def survey_spec(self):
+		""" survey of the spectrum, if 'auto' then it is resolved on first use to the instrument of sdss_xid.csv """
+		if self._survey_spec == 'auto':
+			self.obj.add_sdss(toload_photoobj=False)
+			self._survey_spec = self.obj.sdss.instrument.lower()
+
+		return self._survey_spec
+
+
+	@survey_spec.setter
+	def survey_spec(self, value):
+		self._survey_spec = value
+
+
+	@property
+	def z(self):
+		""" redshift, if not provided then it is resolved on first use to obj.z or obj.sdss.z """
+		if self._z is None:
+			if hasattr(self.obj, 'z'):
+				self._z = self.obj.z
+
+			elif self._survey_spec in ['sdss', 'boss', 'eboss', 'auto']:
+				self.obj.add_sdss(toload_photoobj=False)
+				self._z = self.obj.sdss.z
+
+			else: 
+				raise AttributeError("[spector] z is not available")
+
+		return self._z
+
+
+	@z.setter
+	def z(self, value):
+		self._z = value
+
+
+	@property
+	def spec(self):
+		""" spectrum (astropy table column with unit), read on first use, see get_spec_ws() """
+		if self._spec_ws is None:
+			self._spec_ws = self.get_spec_ws()
+
+		return self._spec_ws[0]
+
+
+	@property
+	def ws(self):
+		""" wavelength (astropy table column with unit), read on first use, see get_spec_ws() """
+		if self._spec_ws is None:
+			self._spec_ws = self.get_spec_ws()
+
+		return self._spec_ws[1]
+
+
 	def get_spec_ws(self, forceload_from_fits=False):
 		"""
-		read spec and ws, either from spec_decomposed.ecsv or spec.fits (if forced or spec_decomposed.ecsv does not exist)
+		read spec and ws, either from spec_decomposed or spec.fits (if forced or spec_decomposed does not exist)
 
 		Param
 		-----
@@ -147,27 +192,27 @@ class Spector(Operator):
 
 		fn = self.fp_spec_decomposed
 
-		if not os.path.isfile(fn) or forceload_from_fits:
+		if not self._has_spectab(fn) or forceload_from_fits:
 			spec, ws, __ = self.__read_spec_ws_ivar_from_fits()
 			return spec, ws
 		else: 
-			tab = at.Table.read(fn, format='ascii.ecsv')
+			tab = self._read_spectab(fn)
 			return tab['spec'], tab['ws']
 
 
 	def get_spec_ws_from_spectab(self, component, fn=None):
 		"""
-		read certain spec table.ecsv to get spec of a given component
+		read certain spec table to get spec of a given component. The table is read once and then kept in memory, see _read_spectab(). 
 		if fn not specified then use the default file that would contain the specified component,
 		e.g.:
-			'spec_decomposed.ecsv' for component = "all", "cont", "line"
-			'spec_contextrp.ecsv'    for component = "contextrp"
+			'spec_decomposed.fits' for component = "all", "cont", "line"
+			'spec_contextrp.fits'    for component = "contextrp"
 
 		Param
 		-----
 		component: 
 			either ['all', 'line', 'cont', 'contextrp']
-		fn='spec_decomposed.ecsv'
+		fn='spec_decomposed.fits'
 
 		Return
 		------
@@ -182,14 +227,14 @@ class Spector(Operator):
 		if fn == None:
 			if component in ['all', 'cont', 'line']:
 				fn = self.fp_spec_decomposed
-				self.make_spec_decomposed_ecsv(overwrite=False)
+				self.make_spec_decomposed(overwrite=False)
 			elif component in ['contextrp']:
 				fn = self.fp_spec_contextrp
-				self.make_spec_contextrp_ecsv(overwrite=False)
+				self.make_spec_contextrp(overwrite=False)
 			else: 
 				raise Exception("[spector] component not recognized")
 
-		tab = at.Table.read(fn, format='ascii.ecsv')
+		tab = self._read_spectab(fn)
 		col = self.__get_spectab_colname(component)
 
 		return tab[col], tab['ws']
@@ -197,12 +242,28 @@ class Spector(Operator):
 
 	def make_spec_decomposed_ecsv(self, overwrite=False):
 		""" 
-		saving seperated continuum and line spectrum in csv file 
+		export the seperated continuum and line spectrum to spec_decomposed.ecsv, see make_spec_decomposed(). 
+
+		Return
+		------
+		status
+		"""
+		self.make_spec_decomposed(overwrite=overwrite, toexport_ecsv=True)
+
+		status = os.path.isfile(self.fp_spec_decomposed_ecsv)
+		return status 
+
+
+	def make_spec_decomposed(self, overwrite=False, toexport_ecsv=False):
+		""" 
+		saving seperated continuum and line spectrum in fits binary table spec_decomposed.fits, which is also kept in memory. 
 
 		Params
 		------
 		self
 		overwrite=False
+		toexport_ecsv=False
+			if true, also export the table to spec_decomposed.ecsv
 
 		Return
 		------
@@ -214,16 +275,14 @@ class Spector(Operator):
 
 		fn = self.fp_spec_decomposed
 
-		if (not os.path.isfile(fn)) or overwrite:
+		if (not self._has_spectab(fn)) or overwrite:
 
-			spec, ws = self.get_spec_ws()
+			spec_uless, ws_uless = self._get_spec_ws_uless()
 
-			ws_uless = np.array((ws/self.u_ws).to(u.dimensionless_unscaled))
-			spec_uless = np.array((spec/self.u_spec).to(u.dimensionless_unscaled))
+			# the modelBC03 fit is persisted in spec_bc03fit.fits and reused, see get_bc03fit_task()
+			iscon, speccont, specline, __, model = getconti.decompose_cont_line_t2AGN(spec_uless, ws_uless, self.z, method=self.decompose_method, fn_bc03fit=self.fp_spec_bc03fit)
 
-			iscon, speccont, specline, __, model = getconti.decompose_cont_line_t2AGN(spec_uless, ws_uless, self.z, method=self.decompose_method)
-
-			self.conti_model = model # modelBC03 instance if set method='modelBC03', otherwise None.
+			self.conti_model = model # results of the modelBC03 fit (bc03cache.BC03Fit) if set method='modelBC03' and fitted, otherwise None.
 
 			tab = at.Table([ws_uless, spec_uless, speccont, specline, iscon], names=['ws', 'spec', 'speccont', 'specline', 'iscon'])
 			tab['ws'].unit = self.u_ws
@@ -231,28 +290,57 @@ class Spector(Operator):
 			tab['speccont'].unit = self.u_spec
 			tab['specline'].unit = self.u_spec
 
-			tab.write(fn, format='ascii.ecsv', overwrite=overwrite)
-
 			# sanity check: units are identical
 			units = [tab[col].unit for col in ['spec', 'speccont', 'specline']]
 			if len(set(units)) > 1:
 				raise Exception("[spector] units in table spec_decomposed are not identical")
 
-		status = os.path.isfile(fn)
+			self._write_spectab(tab, fn)
+
+		if toexport_ecsv:
+			self._export_spectab_ecsv(fn, self.fp_spec_decomposed_ecsv, overwrite=overwrite)
+
+		status = self._has_spectab(fn)
 		return status 
 
 
 	def make_spec_contextrp_ecsv(self, overwrite=False, refit=False):
 		""" 
-		extrapolate continuum to cover all of the wavelength range of filters 
+		export the extrapolated continuum to spec_contextrp.ecsv, see make_spec_contextrp(). 
+
+		Return
+		------
+		status
+		"""
+		self.make_spec_contextrp(overwrite=overwrite, refit=refit, toexport_ecsv=True)
+
+		status = os.path.isfile(self.fp_spec_contextrp_ecsv)
+		return status 
+
+
+	def make_spec_contextrp(self, overwrite=False, refit=False, toexport_ecsv=False):
+		""" 
+		extrapolate continuum to cover all of the wavelength range of filters, saved in fits binary table spec_contextrp.fits, which is also kept in memory. 
 		there are two methods:
-			for self.conti_model modelBC03: use the bestfit
+			for modelBC03: use the bestfit of the decomposition, which is persisted in spec_bc03fit.fits, see get_bc03fit_task()
 			for running_median: polynomial fit
 
+		Params
+		------
+		self
+		overwrite=False
+		refit=False
+			if true, redo the modelBC03 fit instead of reusing the cached or in-memory one
+		toexport_ecsv=False
+			if true, also export the table to spec_contextrp.ecsv
+
+		Return
+		------
+		status
 		"""
 		fn = self.fp_spec_contextrp
 
-		if (not os.path.isfile(fn)) or overwrite:
+		if (not self._has_spectab(fn)) or overwrite:
 			speccont, ws = self.get_spec_ws_from_spectab(component='cont')
 			ws_uless = np.array((ws/self.u_ws).to(u.dimensionless_unscaled))
 			speccont_uless = np.array((speccont/self.u_spec).to(u.dimensionless_unscaled))
@@ -260,13 +348,8 @@ class Spector(Operator):
 			l0, l1 = self.waverange
 
 			if self.decompose_method == 'modelBC03':
-				if self.conti_model is None or refit:
-					m = modelBC03.modelBC03(extinction_law='none')
-					m.fit(ws=ws_uless, spec=speccont_uless, z=self.z)
-				else: 
-					m = self.conti_model # reuse 
-				speccon_ext = m.bestfit
-				ws_ext = m.ws_bestfit
+				# the fit is only redone if the spectrum, z or settings change, or if refit
+				ws_ext, speccon_ext, __, __ = bc03cache.get_bestfit(force=refit, **self.get_bc03fit_task())
 
 			elif self.decompose_method == 'running_median':			
 				speccon_ext, ws_ext = extrap.extrap_to_ends(ys=speccont_uless, xs=ws_uless, x_end0=l0, x_end1=l1, polydeg=1, extbase_length=2000.)
@@ -278,16 +361,92 @@ class Spector(Operator):
 			tab = at.Table([ws_ext, speccon_ext], names=['ws', col_contextrp])
 			tab['ws'].unit = self.u_ws
 			tab[col_contextrp].unit = self.u_spec
-			tab.write(fn, format='ascii.ecsv', overwrite=overwrite)
 
-		status = os.path.isfile(fn)
+			self._write_spectab(tab, fn)
+
+		if toexport_ecsv:
+			self._export_spectab_ecsv(fn, self.fp_spec_contextrp_ecsv, overwrite=overwrite)
+
+		status = self._has_spectab(fn)
 		return status 
 
 
+	def get_bc03fit_task(self):
+		""" 
+		return the modelBC03 fit of the line masked spectrum that make_spec_decomposed() and make_spec_contextrp() use, as a task of bc03cache.get_bestfits(), such that the fits of many objects can be done in a process pool beforehand, see getconti.get_bc03fit_task(). 
+
+		Return
+		------
+		task (dict): with keys 'ws', 'spec', 'z', 'fn', 'extinction_law', 'ws_predict'
+		"""
+		spec_uless, ws_uless = self._get_spec_ws_uless()
+
+		return getconti.get_bc03fit_task(spec_uless, ws_uless, self.z, fn_bc03fit=self.fp_spec_bc03fit)
+
+
+	def _get_spec_ws_uless(self):
+		""" return spec and ws from spec.fits as arrays in units of u_spec and u_ws """
+		spec, ws = self.get_spec_ws(forceload_from_fits=True)
+
+		spec_uless = np.array((spec/self.u_spec).to(u.dimensionless_unscaled))
+		ws_uless = np.array((ws/self.u_ws).to(u.dimensionless_unscaled))
+
+		return spec_uless, ws_uless
+
+
+	def _has_spectab(self, fn):
+		""" return whether the spectrum table fn is in memory or on disk, either as fits or as the ecsv export """
+		return (fn in self._spectabs) or os.path.isfile(fn) or os.path.isfile(self.__get_fp_spectab_ecsv(fn))
+
+
+	def _read_spectab(self, fn):
+		""" 
+		return the spectrum table fn, e.g., spec_decomposed.fits. It is read from file on the first call and kept in memory afterwards. If the fits file does not exist but the ecsv export does, e.g., produced by an earlier version, the ecsv file is read. 
+
+		Params
+		------
+		fn (str): path to the table
+
+		Return
+		------
+		tab (astropy table)
+		"""
+		if fn not in self._spectabs:
+			fn_ecsv = self.__get_fp_spectab_ecsv(fn)
+
+			if fn.endswith('.ecsv'):
+				tab = at.Table.read(fn, format='ascii.ecsv')
+			elif os.path.isfile(fn):
+				tab = at.Table.read(fn, format='fits')
+			elif os.path.isfile(fn_ecsv):
+				tab = at.Table.read(fn_ecsv, format='ascii.ecsv')
+			else:
+				raise IOError("[spector] spectrum table {} does not exist".format(fn))
+
+			self._spectabs[fn] = tab
+
+		return self._spectabs[fn]
+
+
+	def _write_spectab(self, tab, fn):
+		""" write spectrum table to fn as fits binary table and keep it in memory """
+		tab.write(fn, format='fits', overwrite=True)
+		self._spectabs[fn] = tab
+
+
+	def _export_spectab_ecsv(self, fn, fn_ecsv, overwrite=False):
+		""" export the spectrum table fn to ecsv file fn_ecsv """
+		if (not os.path.isfile(fn_ecsv)) or overwrite:
+			tab = self._read_spectab(fn)
+			tab.write(fn_ecsv, format='ascii.ecsv', overwrite=True)
+
+
 	def make_spec_mag(self, overwrite=False):
 		"""
 		make table spec_mag.csv that contains the convolved spectral magnitude and fnu in each band
 
+		Each of the components ['all', 'cont', 'line', 'contextrp'] is loaded once and its fnu in all the bands is calculated at once with the band weight matrix, see _calc_Fnu_in_bands(). The cells (component, band) that fail are reported and left out of the table, and are listed in the comments of the table. 
+
 		Params
 		------
 		self
@@ -301,36 +460,51 @@ class Spector(Operator):
 
 		fn = self.fp_spec_mag
 
-		self.make_spec_decomposed_ecsv(overwrite=False)
+		self.make_spec_decomposed(overwrite=False)
 
 		if not os.path.isfile(fn) or overwrite:
 			print("[spector] making spec_mag")
-			tabmag = at.Table()
-			tabfnu = at.Table()
-
-			for component in ['all', 'cont', 'line', 'contextrp']:
-				for band in self.bands:
-					colfnu = self.__get_specmag_colname(band, component=component, fluxquantity='fnu')
-					colmag = self.__get_specmag_colname(band, component=component, fluxquantity='mag')
-					try:
-						fnu = self._calc_Fnu_in_band(band=band, component=component)
-					except KeyboardInterrupt:
-						sys.exit(0) 
-					except:
-						print(("[spector] skip calculating fnu of {} in band {}".format(component, band)))
-					else: 
-						mag = fnu.to(u.ABmag)
-						fnu_nm = fnu.to(u.nanomaggy)				
-						tabmag[colmag] = [mag.value]
-						tabfnu[colfnu] = [fnu_nm.value]
-
-			tab = at.hstack([tabmag, tabfnu])
+			components = ['all', 'cont', 'line', 'contextrp']
+			Fnus = np.full((len(components), len(self.bands)), np.nan)
+			errors = {}
+
+			for i, component in enumerate(components):
+				try:
+					Fnus[i] = self._calc_Fnu_in_bands(component=component).to_value(filters.inttools.u_fnu)
+				except KeyboardInterrupt:
+					sys.exit(0) 
+				except Exception as e:
+					for band in self.bands:
+						errors[(component, band)] = "{}: {}".format(type(e).__name__, e)
+				else: 
+					for band, Fnu in zip(self.bands, Fnus[i]):
+						if not np.isfinite(Fnu):
+							errors[(component, band)] = "non-finite fnu"
+
+			for (component, band), error in errors.items():
+				print(("[spector] skip calculating fnu of {} in band {} as {}".format(component, band, error)))
+
+			Fnus = Fnus*filters.inttools.u_fnu
+			with np.errstate(invalid='ignore', divide='ignore'):
+				mags = Fnus.to(u.ABmag)
+			fnus_nm = Fnus.to(u.nanomaggy)
+
+			cols = {}
+			for fluxquantity, values in [('mag', mags), ('fnu', fnus_nm)]:
+				for i, component in enumerate(components):
+					for j, band in enumerate(self.bands):
+						if (component, band) not in errors:
+							colname = self.__get_specmag_colname(band, component=component, fluxquantity=fluxquantity)
+							cols[colname] = [values[i, j].value]
+
+			tab = at.Table(cols)
 			tab.meta['comments'] = [
 									"survey_photo: {}".format(self.survey),
 									"survey_spec: {}".format(self.survey_spec),
 									"unit_mag: ABmag",
 									"unit_fnu: nanomaggy",
 									]
+			tab.meta['comments'] += ["failed: {} {} {}".format(component, band, error) for (component, band), error in errors.items()]
 
 			tab.write(fn, comment='#', format='ascii.csv', overwrite=overwrite)
 		else:
@@ -549,11 +723,13 @@ class Spector(Operator):
 
 			tab = at.Table([[band]], names=['lineband'])
 
+			ws = np.array([self._get_line_obs_wave(line=line, wunit=False) for line in lines])
+			ltt = filters.linetranstable.get_linetranstable(lines=lines, survey=self.survey)
+			Ts = ltt.get_norm_trans(z=self.z, bands=[band])[:, 0]
+
 			fwt_sum = 0.
-			for line in lines:
+			for line, w, T in zip(lines, ws, Ts):
 				f, __ = self._get_line_flux(line=line, wunit=False)
-				w = self._get_line_obs_wave(line=line, wunit=False)
-				T = self._get_norm_trans(wavelength=w, band=band, bounds_error=False)
 
 				fwt = max(f*w*T, 0)
 				fwt_sum = fwt_sum + fwt
@@ -581,7 +757,7 @@ class Spector(Operator):
 		return status 
 
 
-	def make_lineflux(self, lines=['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366'], u_flux=u.Unit("1E-17 erg cm-2 s-1"), overwrite=False):
+	def make_lineflux(self, lines=['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366'], u_flux=u.Unit("1E-17 erg cm-2 s-1"), overwrite=False, ferr_method='analytic', nreal=1000, kernel=None, seed=None):
 		""" 
 		make file spec_lineflux.csv that contains the flux of the specified lines. The fluxes are calculated by integrating the line component of the spectrum over a window of +/- 1400 km/s. 
 
@@ -593,6 +769,11 @@ class Spector(Operator):
 		u_flux=u.Unit("1E-17 erg cm-2 s-1")
 			the unit of the output
 		overwrite=False
+		ferr_method='analytic' (str):
+			'analytic': the error propagated from ivar, boosted by 20% to account for pixel covariance, see _calc_line_fluxes()
+			'mc': the standard deviation of nreal Monte Carlo realizations, see _calc_line_fluxes_mc(), with additional columns of the 16, 50, 84 percentiles, e.g., f_OIII5008_p16
+		nreal=1000 (int), kernel=None (array), seed=None (int):
+			for ferr_method 'mc'
 
 		Return
 		------
@@ -600,19 +781,30 @@ class Spector(Operator):
 		"""
 		fn = self.fp_spec_lineflux
 
-		self.make_spec_decomposed_ecsv(overwrite=False)
+		self.make_spec_decomposed(overwrite=False)
 
 		if not os.path.isfile(fn) or overwrite:
 			print("[spector] making spec_lineflux")
-			tab = at.Table()
+			fs, ferrs = self._calc_line_fluxes(lines=lines, u_flux=u_flux, wunit=False)
 
-			for line in lines:
-				f, ferr = self._calc_line_flux(line=line, u_flux=u_flux, wunit=False)
+			if ferr_method == 'mc':
+				fs_mc = self._calc_line_fluxes_mc(lines=lines, u_flux=u_flux, nreal=nreal, kernel=kernel, seed=seed, wunit=False)
+				ferrs, fpercentiles = linefluxmc.summarize_realizations(fs_mc, percentiles=[15.87, 50., 84.13])
+			elif ferr_method != 'analytic':
+				raise Exception("[spector] ferr_method not recognized")
 
-				col_new = at.Table([[f], [ferr]], names=['f_{}'.format(line), 'ferr_{}'.format(line)])
-				tab = at.hstack([tab, col_new])
+			tab = at.Table()
+			for i, (line, f, ferr) in enumerate(zip(lines, fs, ferrs)):
+				tab['f_{}'.format(line)] = [f]
+				tab['ferr_{}'.format(line)] = [ferr]
+
+				if ferr_method == 'mc':
+					for tag, fpercentile in zip(['p16', 'p50', 'p84'], fpercentiles[:, i]):
+						tab['f_{}_{}'.format(line, tag)] = [fpercentile]
 
 			tab.meta['comments'] = ["unit_flux: {}".format(u_flux.to_string()),]
+			if ferr_method == 'mc':
+				tab.meta['comments'] += ["ferr_method: mc nreal={}".format(nreal)]
 
 			tab.write(fn, comment='#', format='ascii.csv', overwrite=overwrite)
 
@@ -653,29 +845,94 @@ class Spector(Operator):
 			same unit as f
 		"""
 
+		fs, ferrs = self._calc_line_fluxes(lines=[line], dv=dv, u_flux=u_flux, wunit=wunit)
+
+		return fs[0], ferrs[0]
+
+
+	def _calc_line_fluxes(self, lines=['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366'], dv=1400*u.km/u.s, u_flux=u.Unit("1E-17 erg cm-2 s-1"), wunit=False):
+		"""
+		calculate the fluxes of the lines in one pass over the spectrum, see _calc_line_flux() and lineflux.calc_line_fluxes(). 
+
+		Params
+		------
+		lines (list of str)
+		dv=1400*u.km/u.s (quantity)
+		u_flux=u.Unit("1E-17 erg cm-2 s-1")
+		wunit=False
+
+		Return
+		------
+		fs (array or quantity): of shape (n_lines,)
+		ferrs (array or quantity): of shape (n_lines,)
+		"""
+
 		# sanity check
-		if line not in ['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366']:
-			raise Exception("[spector] _calc_line_flux does not support lines other than Hb and OIII as those are not tested. ")
+		for line in lines:
+			if line not in ['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366']:
+				raise Exception("[spector] _calc_line_flux does not support lines other than Hb and OIII as those are not tested. ")
 
 		# get w range
-		beta = (dv/const.c).to_value(u.dimensionless_unscaled)
-		w = self._get_line_obs_wave(line=line, wunit=False)
-		w0 = w*(1-beta)
-		w1 = w*(1+beta)
+		w0s, w1s = self._get_line_windows(lines=lines, dv=dv)
 
 		# get spectrum
 		spec, ws = self.get_spec_ws_from_spectab(component='line')
 		__, __, ivar = self.__read_spec_ws_ivar_from_fits()
 
-		f, ferr = lineflux.calc_line_flux(spec, ws, ivar, w0, w1, u_flux)
+		fs, ferrs = lineflux.calc_line_fluxes(spec, ws, ivar, w0s, w1s, u_flux)
 
 		# artificially boost the error to account for pixel covariance
-		ferr = ferr * 1.2
+		ferrs = ferrs * 1.2
 
 		if wunit:
-			return f, ferr
+			return fs, ferrs
+		else: 
+			return fs.to_value(u_flux), ferrs.to_value(u_flux)
+
+
+	def _calc_line_fluxes_mc(self, lines=['NeIII3870', 'NeIII3969', 'Hg', 'Hb', 'OIII4960', 'OIII5008', 'OI6302', 'OI6366'], dv=1400*u.km/u.s, u_flux=u.Unit("1E-17 erg cm-2 s-1"), nreal=1000, kernel=None, seed=None, wunit=False):
+		"""
+		return nreal Monte Carlo realizations of the fluxes of the lines, drawn from the ivar of the spectrum and each decomposed and integrated as in _calc_line_fluxes(), see linefluxmc.calc_line_fluxes_mc(). For decompose_method 'modelBC03' the continuum is fixed to that of spec_decomposed. 
+
+		Params
+		------
+		lines (list of str)
+		dv=1400*u.km/u.s (quantity)
+		u_flux=u.Unit("1E-17 erg cm-2 s-1")
+		nreal=1000 (int)
+		kernel=None (array): noise correlation kernel in pixels
+		seed=None (int)
+		wunit=False
+
+		Return
+		------
+		fs (array or quantity): of shape (nreal, n_lines)
+		"""
+		w0s, w1s = self._get_line_windows(lines=lines, dv=dv)
+
+		spec, ws, ivar = self.__read_spec_ws_ivar_from_fits(wunit=False)
+
+		if self.decompose_method == 'running_median':
+			speccont = None
+		else: 
+			speccont, __ = self.get_spec_ws_from_spectab(component='cont')
+			speccont = np.array(speccont)
+
+		fs = linefluxmc.calc_line_fluxes_mc(np.array(spec), np.array(ws), np.array(ivar), self.z, w0s, w1s, nreal=nreal, kernel=kernel, speccont=speccont, seed=seed)
+		fs = (fs*self.u_spec*self.u_ws).to(u_flux)
+
+		if wunit:
+			return fs
 		else: 
-			return f.to_value(u_flux), ferr.to_value(u_flux)
+			return fs.to_value(u_flux)
+
+
+	def _get_line_windows(self, lines, dv=1400*u.km/u.s):
+		""" return the observed wavelength ranges w0s, w1s [AA] of +/- dv around the lines """
+		beta = (dv/const.c).to_value(u.dimensionless_unscaled)
+		ws_line = np.array([self._get_line_obs_wave(line=line, wunit=False) for line in lines])
+
+		return ws_line*(1-beta), ws_line*(1+beta)
 
 
 	def _get_line_flux(self, line='OIII5008', wunit=False):
@@ -715,6 +972,8 @@ class Spector(Operator):
 		It is measured by Gaussian fit, for details, see:
 		http://classic.sdss.org/dr7/dm/flatFiles/spZline.html
 
+		Not available for spec.fits made from spPlate files by obsobj.sdss.speclocal, which have no spZline extension (HDU 3). 
+
 		PARAMS
 		------
 		line = 'OIII5008' (str)
@@ -734,7 +993,11 @@ class Spector(Operator):
 		linename = linelist.sdssLINENAME[line]
 
 		# read flux
-		table = self.obj.sdss.get_spec()[3].data
+		hdus = self.obj.sdss.get_spec()
+		if len(hdus) < 4:
+			raise Exception("[spector] spec.fits has no spZline extension (HDU 3) to read the sdss line flux from")
+
+		table = hdus[3].data
 		i = [table['LINENAME']==linename]
 		f = table[i]['LINEAREA'][0]
 		ferr = table[i]['LINEAREA_ERR'][0]
@@ -777,7 +1040,7 @@ class Spector(Operator):
 
 	def _list_stronglines_in_band(self, band, threshold=0.01):
 		""" 
-		return a list of strong lines in band where the filter transmission function is higher than threshold (in fraction) 
+		return a list of strong lines in band, i.e., whose redshifted wavelengths are within the boundaries of the band where the filter transmission function is higher than threshold (in fraction), see filters.filtertools.getFilterBoundaries(). The boundaries and the rest-frame line wavelengths, see filters.getllambdas(), are kept in memory. 
 
 		Params
 		------
@@ -794,11 +1057,9 @@ class Spector(Operator):
 		"""
 		w1, w2 = filters.filtertools.getFilterBoundaries(threshold=threshold, band=band, survey=self.survey, withunit=False)
 
-		llist = []
-		for line in linelist.strongline:
-			w = self._get_line_obs_wave(line=line, wunit=False)
-			if (w > w1) & (w < w2):
-				llist += [line]
+		ws = filters.getllambdas(linelist.strongline, vacuum=True) * (1. + self.z)
+
+		llist = [line for line, w in zip(linelist.strongline, ws) if (w > w1) & (w < w2)]
 
 		return llist
 
@@ -823,16 +1084,9 @@ class Spector(Operator):
 		u_spec = 1.e-17*u.Unit('erg / (Angstrom cm2 s)')
 		u_ws = u.AA
 		"""
-		fn = self.fp_spec
 		if self.survey_spec in ['sdss', 'boss', 'boss']:
-			if os.path.isfile(fn):
-				hdus = fits.open(fn)
-			else: 
-				raise IOError("[Spector] spec fits file does not exist")
-
-			hdus[0].header
-			spectable = hdus[1].data
-			spec, ws, ivar = spectable['flux'], 10.**spectable['loglam'], spectable['ivar']
+			spechdl = self._get_spec_handle()
+			spec, ws, ivar = spechdl.flux, spechdl.ws, spechdl.ivar
 
 			if wunit:
 				spec = spec*u_spec
@@ -849,6 +1103,17 @@ class Spector(Operator):
 			raise NameError("[Spector] survey_spec not recognized")
 
 
+	def _get_spec_handle(self):
+		""" return the content of spec.fits in memory (obsobj.sdss.sdssSpec), which is read once per Spector and then reused """
+		if self._spec_handle is None:
+			if os.path.isfile(self.fp_spec):
+				self._spec_handle = sdssSpec(self.fp_spec)
+			else: 
+				raise IOError("[Spector] spec fits file does not exist")
+
+		return self._spec_handle
+
+
 	def _get_norm_trans_func(self, band='i'):
 		"""
 		return normalized transmission function and its wavelength coordinate
@@ -870,48 +1135,74 @@ class Spector(Operator):
 
 	def _get_norm_trans(self, wavelength, band='i', bounds_error=False):
 		"""
-		return normalized transmission function at a specific wavelenth, see filters.getNormTrans()
+		return normalized transmission function at a specific wavelenth, see filters.filterbank.FilterBank.get_norm_trans()
 		the normalization is such that int{ trans{l} * dlnl} = 1.
 
 		Params
 		------
 		self
-		wave (float): wavelength to evaluate the function at
+		wave (float or array): wavelength(s) to evaluate the function at
 		band='i'
 		bounds_error (bool): 
 			whether to raise error when interpolation outside of array is attempted
 
 		Return
 		------
-		trans  (float)
+		trans  (float or array)
 		"""
-		trans = filters.filtertools.getNormTrans(wavelength, band=band, survey=self.survey, bounds_error=bounds_error) 
+		fb = filters.filterbank.get_filterbank(survey=self.survey)
+		trans = fb.get_norm_trans(wavelength, bands=[band], bounds_error=bounds_error)[0]
 		return trans
 
 
 	def _calc_Fnu_in_band(self, band, component='all'):
 		"""
+		calculate Fnu in one band, taken from _calc_Fnu_in_bands() such that it is identical to that of make_spec_mag()
+
 		Params
 		------
 		band=band
-		component='all': from ['all', 'cont', 'line']
+		component='all': from ['all', 'cont', 'line', 'contextrp']
 			which spectral component to operate on
 
 		Return
 		------
 		Fnu (quantity in units "erg s-1 cm-2 Hz-1")
 		"""
+		bands = self.bands if band in self.bands else [band]
+		Fnus = self._calc_Fnu_in_bands(component=component, bands=bands)
+
+		return Fnus[bands.index(band)]
+
+
+	def _calc_Fnu_in_bands(self, component='all', bands=None):
+		"""
+		calculate Fnu in all the bands self.bands at once, see filters.synphot.calc_Fnu_in_bands_from_fl()
+
+		Params
+		------
+		component='all': from ['all', 'cont', 'line', 'contextrp']
+			which spectral component to operate on
+		bands=None (list of str):
+			default to self.bands
+
+		Return
+		------
+		Fnu (quantity in units "erg s-1 cm-2 Hz-1" of shape (n_bands,))
+		"""
+		if bands is None:
+			bands = self.bands
 
 		spec, ws = self.get_spec_ws_from_spectab(component=component)
 
-		trans, ws_trans = self._get_norm_trans_func(band=band)
+		fl_uless = u.Quantity(spec, dtype='float').to_value(filters.inttools.u_fl)
+		ws_uless = u.Quantity(ws, dtype='float').to_value(filters.inttools.u_ws)
 
-		Fnu = filters.inttools.calc_Fnu_in_band_from_fl(fl=spec, ws=ws, trans=trans, ws_trans=ws_trans, isnormed=True)
-		return Fnu
+		return filters.synphot.calc_Fnu_in_bands_from_fl(fl_uless, ws_uless, survey=self.survey, bands=bands)
 
 
 	def _calc_mAB_in_band(self, band, component='all'):
-		Fnu = self._calc_Fnu_in_band(band=band, component='all')
+		Fnu = self._calc_Fnu_in_band(band=band, component=component)
 		return Fnu.to(u.ABmag)
 
 
@@ -926,6 +1217,11 @@ class Spector(Operator):
 		return 'spec{0}{1}_{2}'.format(tag_component[component], tag_quantity[fluxquantity], band)
 
 
+	def __get_fp_spectab_ecsv(self, fn):
+		""" return the path of the ecsv export of spectrum table fn, e.g., spec_decomposed.fits -> spec_decomposed.ecsv """
+		return os.path.splitext(fn)[0]+'.ecsv'
+
+
 	def __get_spectab_colname(self, component):
 		"""
 		band : e.g. 'i'
@@ -0,0 +1,221 @@
+import pytest
+import shutil
+import os
+import numpy as np
+import multiprocessing as mtp
+
+from .. import bc03cache
+from .. import getconti
+
+dir_parent = './testing/'
+fn = './testing/spec_bc03fit.fits'
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setUp_tearDown():
+	""" rm ./testing/ before and after testing"""
+
+	# setup
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+	os.makedirs(dir_parent)
+
+	yield
+	# tear down
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+
+@pytest.fixture
+def spec1():
+	ws = np.linspace(4000., 9000., 500)
+	spec = np.sin(ws/300.).astype('float32') + 2.
+	return ws, spec
+
+
+def test_bc03cache_calc_fit_key(spec1):
+	ws, spec = spec1
+
+	key = bc03cache.calc_fit_key(ws, spec, z=0.4)
+
+	assert key == bc03cache.calc_fit_key(ws, spec.astype('float64'), z=0.4)
+	assert key != bc03cache.calc_fit_key(ws, spec, z=0.41)
+	assert key != bc03cache.calc_fit_key(ws, spec, z=0.4, extinction_law='cal')
+
+	spec2 = np.array(spec)
+	spec2[100] += 1.e-3
+	assert key != bc03cache.calc_fit_key(ws, spec2, z=0.4)
+
+
+def test_bc03cache_write_read_bestfit(spec1):
+	ws, spec = spec1
+	key = bc03cache.calc_fit_key(ws, spec, z=0.4)
+
+	ws_bestfit = np.linspace(1000., 20000., 1000)
+	bestfit = np.exp(-ws_bestfit/10000.)
+
+	assert bc03cache.read_bestfit(fn, key) == (None, None, None)
+
+	bc03cache.write_bestfit(fn, key, ws_bestfit, bestfit, z=0.4)
+
+	ws_read, bestfit_read, predict_read = bc03cache.read_bestfit(fn, key)
+	assert np.array_equal(ws_read, ws_bestfit)
+	assert np.array_equal(bestfit_read, bestfit)
+	assert predict_read is None
+
+	assert bc03cache.read_bestfit(fn, bc03cache.calc_fit_key(ws, spec, z=0.5)) == (None, None, None)
+
+	# the cached fit is returned without fitting
+	ws_get, bestfit_get, predict_get, m = bc03cache.get_bestfit(ws, spec, z=0.4, fn=fn)
+	assert m is None
+	assert np.array_equal(bestfit_get, bestfit)
+
+	# with prediction
+	key_predict = bc03cache.calc_fit_key(ws, spec, z=0.4, ws_predict=ws_bestfit)
+	assert key_predict != key
+
+	bc03cache.write_bestfit(fn, key_predict, ws_bestfit, bestfit, z=0.4, ws_predict=ws_bestfit, predict=bestfit*2.)
+	__, __, predict_read = bc03cache.read_bestfit(fn, key_predict)
+	assert np.array_equal(predict_read, bestfit*2.)
+
+
+def test_bc03cache_get_bestfits_skips_cached(spec1):
+	ws, spec = spec1
+
+	ws_bestfit = np.linspace(1000., 20000., 1000)
+	bestfit = np.exp(-ws_bestfit/10000.)
+
+	tasks = []
+	for i in range(3):
+		fn_i = dir_parent+'spec_bc03fit_{}.fits'.format(i)
+		tasks += [{'ws': ws, 'spec': spec*(i+1), 'z': 0.4, 'fn': fn_i}]
+		key = bc03cache.calc_fit_key(ws, spec*(i+1), z=0.4)
+		bc03cache.write_bestfit(fn_i, key, ws_bestfit, bestfit*(i+1), z=0.4)
+
+	statuses = bc03cache.get_bestfits(tasks, processes=-1)
+
+	assert statuses == [True, True, True]
+	for i, task in enumerate(tasks):
+		__, bestfit_get, __, m = bc03cache.get_bestfit(**task)
+		assert m is None
+		assert np.array_equal(bestfit_get, bestfit*(i+1))
+
+
+def test_bc03cache_get_bestfit_force(spec1, monkeypatch):
+	ws, spec = spec1
+	key = bc03cache.calc_fit_key(ws, spec, z=0.4)
+	fn_force = dir_parent+'spec_bc03fit_force.fits'
+
+	bc03cache.write_bestfit(fn_force, key, ws, spec*0., z=0.4)
+	monkeypatch.setattr(bc03cache.modelBC03, 'modelBC03', StubModelBC03, raising=False)
+	monkeypatch.setattr(bc03cache, '_worker_models', {})
+
+	__, bestfit, __, m = bc03cache.get_bestfit(ws, spec, z=0.4, fn=fn_force)
+	assert m is None
+	assert np.all(bestfit == 0.)
+
+	__, bestfit, __, m = bc03cache.get_bestfit(ws, spec, z=0.4, fn=fn_force, force=True)
+	assert isinstance(m, bc03cache.BC03Fit)
+	assert np.array_equal(bestfit, m.bestfit)
+	assert np.array_equal(bc03cache.read_bestfit(fn_force, key)[1], m.bestfit)
+
+
+def test_bc03cache_get_bestfit_detached(spec1, monkeypatch):
+	""" the returned fit is not changed by the later fits of the model of the process """
+	ws, spec = spec1
+	monkeypatch.setattr(bc03cache.modelBC03, 'modelBC03', StubModelBC03, raising=False)
+	monkeypatch.setattr(bc03cache, '_worker_models', {})
+
+	__, bestfit1, predict1, fit1 = bc03cache.get_bestfit(ws, spec, z=0.4, fn=dir_parent+'spec_bc03fit_detached1.fits', ws_predict=ws)
+	bestfit1_copy = bestfit1.copy()
+	__, bestfit2, __, fit2 = bc03cache.get_bestfit(ws, spec*2., z=0.4, fn=dir_parent+'spec_bc03fit_detached2.fits', ws_predict=ws)
+
+	assert fit1 is not fit2
+	assert not isinstance(fit1, StubModelBC03)
+	assert fit1 is not bc03cache._worker_models['none']
+	assert np.array_equal(fit1.bestfit, bestfit1_copy)
+	assert np.array_equal(fit1.predict, predict1)
+	assert not np.array_equal(fit1.bestfit, fit2.bestfit)
+	assert fit1.z == 0.4
+	assert fit1.extinction_law == 'none'
+
+
+def test_bc03cache_get_bestfits_pool(spec1, monkeypatch):
+	ws, spec = spec1
+
+	if mtp.get_start_method() != 'fork':
+		pytest.skip("the stub model only reaches the workers by fork")
+
+	monkeypatch.setattr(bc03cache.modelBC03, 'modelBC03', StubModelBC03, raising=False)
+	monkeypatch.setattr(bc03cache, '_worker_models', {})
+	if os.path.isfile(fn_inits):
+		os.remove(fn_inits)
+
+	tasks = [{'ws': ws, 'spec': spec*(i+1), 'z': 0.4, 'fn': dir_parent+'spec_bc03fit_pool_{}.fits'.format(i), 'ws_predict': ws[::2]} for i in range(6)]
+
+	statuses = bc03cache.get_bestfits(tasks, processes=2)
+	assert statuses == [True]*6
+
+	# one model per worker
+	with open(fn_inits) as f:
+		pids = f.read().split()
+	assert 1 <= len(pids) <= 2
+	assert len(set(pids)) == len(pids)
+	assert str(os.getpid()) not in pids
+
+	for task in tasks:
+		m = StubModelBC03()
+		m.fit(ws=task['ws'], spec=task['spec'], z=task['z'])
+
+		ws_get, bestfit_get, predict_get, m_get = bc03cache.get_bestfit(**task)
+		assert m_get is None
+		assert np.array_equal(ws_get, m.ws_bestfit)
+		assert np.array_equal(bestfit_get, m.bestfit)
+		assert np.array_equal(predict_get, m.predict(ws[::2]))
+
+
+def test_bc03cache_decompose_cont_line_t2AGN(monkeypatch):
+	monkeypatch.setattr(bc03cache.modelBC03, 'modelBC03', StubModelBC03, raising=False)
+	monkeypatch.setattr(bc03cache, '_worker_models', {})
+
+	ws = np.linspace(4000., 9000., 2000)
+	spec = np.sin(ws/300.) + 2.
+	z = 0.4114
+	fn_decomposed = dir_parent+'spec_bc03fit_decomposed.fits'
+
+	selcon, speccon, specline, __, model = getconti.decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03', fn_bc03fit=fn_decomposed)
+	assert isinstance(model, bc03cache.BC03Fit)
+	assert np.array_equal(model.predict, speccon)
+
+	# the fit is of the line masked spectrum and is predicted at all of ws
+	m = StubModelBC03()
+	m.fit(ws=ws[selcon], spec=spec[selcon], z=z)
+	assert np.array_equal(speccon, m.predict(ws))
+	assert np.array_equal(speccon, getconti.decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03')[1])
+
+	# reused by a later decomposition and by the task of the same spectrum
+	selcon2, speccon2, specline2, __, model2 = getconti.decompose_cont_line_t2AGN(spec, ws, z, method='modelBC03', fn_bc03fit=fn_decomposed)
+	assert model2 is None
+	assert np.array_equal(speccon2, speccon)
+	assert np.array_equal(specline2, specline)
+
+	task = getconti.get_bc03fit_task(spec, ws, z, fn_bc03fit=fn_decomposed)
+	assert bc03cache.get_bestfit(**task)[3] is None
+
+
+fn_inits = dir_parent+'stub_inits.txt'
+
+class StubModelBC03(object):
+	""" stand-in of modelBC03.modelBC03 that 'fits' by smoothing and extending the spectrum, and records the pid of the process of each instance in fn_inits """
+	def __init__(self, extinction_law='none'):
+		self.extinction_law = extinction_law
+
+		with open(fn_inits, 'a') as f:
+			f.write("{}\n".format(os.getpid()))
+
+	def fit(self, ws, spec, z):
+		self.ws_bestfit = np.linspace(1000., 30000., 3000)
+		self.bestfit = np.interp(self.ws_bestfit, ws, np.convolve(np.asarray(spec, dtype='float'), np.ones(5)/5., mode='same'))
+
+	def predict(self, ws):
+		return np.interp(ws, self.ws_bestfit, self.bestfit)
@@ -0,0 +1,152 @@
+import numpy as np
+import scipy.ndimage as scind
+import warnings
+
+from .. import getconti
+from .. import linelist
+from ...filters import getllambdas
+
+
+def medianfilter_generic(spec, selcon, size=300):
+	""" the reference implementation with scipy.ndimage.generic_filter """
+	spec_nan = np.array(spec)
+	spec_nan[~selcon] = np.nan
+
+	with warnings.catch_warnings():
+		warnings.simplefilter('ignore', category=RuntimeWarning)
+		return scind.generic_filter(spec_nan, np.nanmedian, size=size)
+
+
+def test_getcont_medianfilter_identical_to_generic_filter():
+
+	rng = np.random.RandomState(0)
+
+	for n, size in [(2000, 300), (1000, 301), (120, 300), (50, 7)]:
+		for dtype in ['float32', 'float64']:
+			spec = rng.normal(size=n).astype(dtype)
+			selcon = rng.uniform(size=n) > 0.3
+			selcon[n//3:n//3+min(n//2, 400)] = False # large masked region
+
+			speccon = getconti.getcont_medianfilter(spec, selcon, size=size)
+			speccon_generic = medianfilter_generic(spec, selcon, size=size)
+
+			assert speccon.dtype == speccon_generic.dtype
+			assert np.array_equal(speccon, speccon_generic, equal_nan=True)
+
+
+def test_getcont_medianfilter_stack():
+
+	rng = np.random.RandomState(1)
+	specs = rng.normal(size=(4, 1500))
+	selcons = rng.uniform(size=(4, 1500)) > 0.3
+
+	speccons = getconti.getcont_medianfilter(specs, selcons)
+	assert speccons.shape == specs.shape
+
+	for spec, selcon, speccon in zip(specs, selcons, speccons):
+		assert np.array_equal(speccon, medianfilter_generic(spec, selcon), equal_nan=True)
+
+	# shared mask
+	speccons = getconti.getcont_medianfilter(specs, selcons[0])
+	for spec, speccon in zip(specs, speccons):
+		assert np.array_equal(speccon, medianfilter_generic(spec, selcons[0]), equal_nan=True)
+
+
+def selectcont_loop(spec, xcoord, z, NLcutwidth=70.):
+	""" reference implementation that compares the pixels to each of the narrow lines in turn """
+	llambdas = getllambdas(linelist.narrowline, vacuum=True)*(1.+z)
+
+	selcut = (spec == 0)
+	for llambda in llambdas:
+		selcut = selcut | (np.absolute(xcoord-llambda) < NLcutwidth/2.)
+
+	selkeep = ~selcut
+	selkeep[1871:1905] = False
+	return selkeep
+
+
+def test_selectcont():
+
+	xcoord = 10.**(3.55 + 1.e-4*np.arange(4600))
+	rng = np.random.RandomState(2)
+	spec = rng.normal(size=xcoord.size)
+	spec[100:120] = 0.
+
+	for z in [0., 0.1, 0.4114, 0.8]:
+		selkeep = getconti.selectcont(spec, xcoord, z, AGN_TYPE=2, NLcutwidth=70.)
+
+		assert selkeep.dtype == bool
+		assert np.array_equal(selkeep, selectcont_loop(spec, xcoord, z, NLcutwidth=70.))
+
+	# type 1 AGN masks more pixels
+	selkeep1 = getconti.selectcont(spec, xcoord, 0.3, AGN_TYPE=1)
+	selkeep2 = getconti.selectcont(spec, xcoord, 0.3, AGN_TYPE=2)
+	assert np.all(selkeep2[selkeep1])
+	assert selkeep1.sum() < selkeep2.sum()
+
+
+def test_selectcont_batch():
+
+	xcoord = 10.**(3.55 + 1.e-4*np.arange(4600))
+	rng = np.random.RandomState(3)
+	specs = rng.normal(size=(3, xcoord.size))
+	zs = np.array([0.1, 0.4114, 0.8])
+
+	selkeeps = getconti.selectcont(specs, xcoord, zs, AGN_TYPE=1)
+	assert selkeeps.shape == specs.shape
+
+	for spec, z, selkeep in zip(specs, zs, selkeeps):
+		assert np.array_equal(selkeep, getconti.selectcont(spec, xcoord, z, AGN_TYPE=1))
+
+
+def test_select_near_lines():
+
+	xcoord = np.arange(0., 100., 0.5)
+	llambdas = np.array([50., 10., 52., 10.])
+
+	selline = getconti.select_near_lines(xcoord, llambdas, 3.)
+	selline_loop = np.any([np.absolute(xcoord - l) < 3. for l in llambdas], axis=0)
+
+	assert np.array_equal(selline, selline_loop)
+	assert not getconti.select_near_lines(xcoord, np.array([]), 3.).any()
+
+
+def test_getcont_medianfilter_indices():
+
+	rng = np.random.RandomState(2)
+	spec = rng.normal(size=(3, 1000))
+	selcon = rng.uniform(size=1000) > 0.3
+	indices = np.array([0, 5, 6, 7, 500, 998, 999])
+
+	speccon = getconti.getcont_medianfilter(spec, selcon, size=300)
+	speccon_indices = getconti.getcont_medianfilter(spec, selcon, size=300, indices=indices)
+
+	assert speccon_indices.shape == (3, len(indices))
+	assert np.array_equal(speccon_indices, speccon[:, indices])
+
+
+def test_getcont_medianfilter_edges():
+
+	rng = np.random.RandomState(3)
+	spec = rng.normal(size=(3, 1000))
+	selcon = rng.uniform(size=(3, 1000)) > 0.3
+	edges = np.array([[0, 1000], [50, 930], [400, 450]])
+
+	speccon = getconti.getcont_medianfilter(spec, selcon, size=300, edges=edges)
+
+	for row, sel, con, (istart, istop) in zip(spec, selcon, speccon, edges):
+		assert np.array_equal(con[istart:istop], getconti.getcont_medianfilter(row[istart:istop], sel[istart:istop], size=300))
+		assert np.all(np.isnan(con[:istart]))
+		assert np.all(np.isnan(con[istop:]))
+
+
+def test_selectcont_istarts():
+
+	xcoord = np.arange(3000., 9000., 1.)
+	specs = np.ones((2, len(xcoord)))
+	istarts = np.array([0, 100])
+
+	selkeeps = getconti.selectcont(specs, xcoord, 0.3, istarts=istarts)
+
+	assert np.array_equal(selkeeps[0], getconti.selectcont(specs[0], xcoord, 0.3))
+	assert np.array_equal(selkeeps[1, 100:], getconti.selectcont(specs[1, 100:], xcoord[100:], 0.3))
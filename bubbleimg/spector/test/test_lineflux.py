@@ -1,4 +1,5 @@
 import numpy as np
+import astropy.units as u
 
 from .. import lineflux
 
@@ -23,3 +24,51 @@ def test_trazperr_trapz_var():
 
 	assert integral == 1.5
 	assert variance == np.sum(yvar**2)*(1.5**2)
+
+
+def test_calc_line_fluxes():
+	u_spec = 1.e-17*u.Unit('erg / (Angstrom cm2 s)')
+	u_flux = u.Unit("1E-17 erg cm-2 s-1")
+
+	rng = np.random.RandomState(0)
+	ws = 10.**(3.55 + 1.e-4*np.arange(4000)) * u.AA
+	spec = rng.normal(size=ws.size) * u_spec
+	ivar = rng.uniform(0.5, 2., size=ws.size) / u_spec**2
+	ivar[1000] = 0. # infinite variance
+
+	w0s = np.array([4000., 4500., 4450., 6000.])
+	w1s = w0s + 40.
+
+	fs, ferrs = lineflux.calc_line_fluxes(spec, ws, ivar, w0s, w1s, u_flux)
+
+	assert fs.unit == u_flux
+	assert len(fs) == len(w0s)
+
+	for w0, w1, f, ferr in zip(w0s, w1s, fs, ferrs):
+		f_single, ferr_single = lineflux.calc_line_flux(spec, ws, ivar, w0, w1, u_flux)
+
+		assert np.isclose(f.value, f_single.value, rtol=1.e-10, atol=1.e-10)
+		assert (ferr == ferr_single) or np.isclose(ferr.value, ferr_single.value, rtol=1.e-10)
+
+	assert np.isinf(ferrs[2])
+
+
+def test_calc_line_fluxes_uless_batch():
+	rng = np.random.RandomState(1)
+	ws = np.linspace(4000., 6000., 2001)
+	specs = rng.normal(size=(3, ws.size))
+	var = np.ones((3, ws.size))
+	w0s = np.array([[4100., 5000.], [4200., 5100.], [4300., 5200.]])
+	w1s = w0s + 50.
+
+	fs, fvars = lineflux.calc_line_fluxes_uless(specs, ws, var, w0s, w1s)
+
+	assert fs.shape == (3, 2)
+
+	for k in range(3):
+		for j in range(2):
+			sel = (ws > w0s[k, j]) & (ws < w1s[k, j])
+			f, fvar = lineflux.trapz_var(x=ws[sel], y=specs[k][sel], yvar=var[k][sel])
+
+			assert np.isclose(fs[k, j], f, rtol=1.e-10, atol=1.e-12)
+			assert np.isclose(fvars[k, j], fvar, rtol=1.e-10)
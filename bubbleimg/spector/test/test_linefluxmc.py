@@ -0,0 +1,78 @@
+import pytest
+import numpy as np
+
+from .. import linefluxmc
+from .. import getconti
+from .. import lineflux
+from ...obsobj.sdss import sdssSpec
+from ...filters import getllambdas
+
+fn_spec = 'test_verification_data/SDSSJ0920+0034/spec.fits'
+z = 0.4114
+lines = ['Hb', 'OIII4960', 'OIII5008']
+
+
+@pytest.fixture
+def spec1():
+	s = sdssSpec(fn_spec)
+
+	beta = 1400./299792.458
+	ws_line = getllambdas(lines, vacuum=True)*(1.+z)
+
+	return s.flux.astype('float'), s.ws.astype('float'), s.ivar.astype('float'), ws_line*(1-beta), ws_line*(1+beta)
+
+
+def test_linefluxmc_draw_realizations():
+	rng = np.random.default_rng(0)
+	spec = np.linspace(1., 2., 200)
+	ivar = np.full(200, 4.)
+	ivar[:10] = 0.
+
+	specs = linefluxmc.draw_realizations(spec, ivar, nreal=4000, rng=rng)
+
+	assert specs.shape == (4000, 200)
+	assert np.all(specs[:, :10] == spec[:10])
+	assert np.allclose(np.std(specs[:, 10:], axis=0), 0.5, rtol=0.1)
+
+	# correlated noise keeps the variance of each pixel
+	specs = linefluxmc.draw_realizations(spec, ivar, nreal=4000, kernel=[0.5, 1., 0.5], rng=rng)
+	noise = specs[:, 10:] - spec[10:]
+	assert np.allclose(np.std(noise, axis=0), 0.5, rtol=0.1)
+	assert np.corrcoef(noise[:, 50], noise[:, 51])[0, 1] > 0.5
+
+
+def test_linefluxmc_noiseless_identical_to_decomposition(spec1):
+	spec, ws, ivar, w0s, w1s = spec1
+
+	selcon, speccont, specline, __, __ = getconti.decompose_cont_line_t2AGN(spec, ws, z, method='running_median')
+	fs, __ = lineflux.calc_line_fluxes_uless(specline, ws, np.zeros(len(ws)), w0s, w1s)
+
+	fs_mc = linefluxmc.calc_line_fluxes_mc(spec, ws, np.zeros(len(ws)), z, w0s, w1s, nreal=3)
+
+	assert fs_mc.shape == (3, len(lines))
+	assert np.allclose(fs_mc, np.broadcast_to(fs, fs_mc.shape), rtol=1.e-13, atol=0.)
+
+	# fixed continuum
+	fs_mc = linefluxmc.calc_line_fluxes_mc(spec, ws, np.zeros(len(ws)), z, w0s, w1s, nreal=2, speccont=speccont)
+	assert np.allclose(fs_mc, fs)
+
+
+def test_linefluxmc_calc_line_fluxes_mc(spec1):
+	spec, ws, ivar, w0s, w1s = spec1
+
+	fs_mc = linefluxmc.calc_line_fluxes_mc(spec, ws, ivar, z, w0s, w1s, nreal=200, seed=1, chunksize=64)
+	fs_mc2 = linefluxmc.calc_line_fluxes_mc(spec, ws, ivar, z, w0s, w1s, nreal=200, seed=1, chunksize=64)
+
+	assert fs_mc.shape == (200, len(lines))
+	assert np.array_equal(fs_mc, fs_mc2)
+
+	fstd, fpercentiles = linefluxmc.summarize_realizations(fs_mc)
+	assert fpercentiles.shape == (3, len(lines))
+	assert np.all(fstd > 0.)
+	assert np.all(fpercentiles[0] < fpercentiles[2])
+
+	# the errors are at least those from ivar alone
+	with np.errstate(divide='ignore'):
+		var = 1./ivar
+	__, fvar = lineflux.calc_line_fluxes_uless(spec, ws, var, w0s, w1s)
+	assert np.all(fstd > 0.8*np.sqrt(fvar))
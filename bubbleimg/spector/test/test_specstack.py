@@ -0,0 +1,194 @@
+import pytest
+import shutil
+import os
+import numpy as np
+import astropy.table as at
+import astropy.units as u
+from astropy.io import fits
+
+from .. import specstack
+from .. import getconti
+from .. import spector
+
+z = 0.4114
+dir_parent = './testing/'
+dir_obj1 = './testing/SDSSJ0920+0034/'
+dir_obj2 = './testing/SDSSJ0920+0034_copy/'
+dir_obj3 = './testing/SDSSJ0920+0034_sliced/'
+dir_verif = 'test_verification_data/SDSSJ0920+0034/'
+survey = 'hsc'
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setUp_tearDown():
+	""" rm ./testing/ before and after testing"""
+
+	# setup
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+	for dir_obj in [dir_obj1, dir_obj2, dir_obj3]:
+		os.makedirs(dir_obj)
+
+	shutil.copyfile(dir_verif+'spec.fits', dir_obj1+'spec.fits')
+	shutil.copyfile(dir_verif+'spec.fits', dir_obj2+'spec.fits')
+
+	# a spectrum with narrower coverage on the same grid
+	with fits.open(dir_verif+'spec.fits') as hdus:
+		hdus_sliced = fits.HDUList([hdu.copy() for hdu in hdus])
+	hdus_sliced[1].data = hdus_sliced[1].data[50:-70]
+	hdus_sliced.writeto(dir_obj3+'spec.fits')
+
+	yield
+	# tear down
+	if os.path.isdir(dir_parent):
+		shutil.rmtree(dir_parent)
+
+
+@pytest.fixture
+def stack1():
+	return specstack.SpecStack(dirs_obj=[dir_obj1, dir_obj2, dir_obj3], zs=[z, z, z], survey=survey)
+
+
+def test_specstack_init(stack1):
+	st = stack1
+
+	assert st.flux.shape == (3, len(st.ws))
+	assert st.ivar.shape == st.flux.shape
+
+	assert np.sum(~st.flux.mask[0]) == len(st.ws)
+	assert np.sum(~st.flux.mask[2]) == len(st.ws) - 120
+	assert np.all(st.flux.mask[2, :50])
+	assert np.all(st.flux.mask[2, -70:])
+	assert np.array_equal(st.flux.data[2, 50:-70], st.flux.data[0, 50:-70])
+
+
+def test_specstack_init_reads_one_spec_at_a_time(monkeypatch):
+	""" the spectra are read into the float64 stack one by one, none is alive when the next is read """
+	import weakref
+
+	sdssSpec = specstack.sdssSpec
+	refs = []
+
+	def sdssSpec_tracked(fn):
+		assert all(ref() is None for ref in refs)
+		spec = sdssSpec(fn)
+		refs.append(weakref.ref(spec))
+		return spec
+
+	monkeypatch.setattr(specstack, 'sdssSpec', sdssSpec_tracked)
+	st = specstack.SpecStack(dirs_obj=[dir_obj1, dir_obj2, dir_obj3], zs=[z, z, z], survey=survey)
+
+	assert len(refs) == 3
+	assert st.flux.dtype == np.float64
+	assert st.ivar.dtype == np.float64
+	with fits.open(dir_verif+'spec.fits') as hdus:
+		assert np.all(st.flux.data[0] == hdus[1].data['flux'])
+
+
+def test_specstack_init_error_no_file():
+
+	with pytest.raises(IOError):
+		specstack.SpecStack(dirs_obj=[dir_obj1, dir_parent+'not_an_obj/'], zs=[z, z], survey=survey)
+
+
+def test_specstack_init_error_nzs():
+
+	with pytest.raises(ValueError):
+		specstack.SpecStack(dirs_obj=[dir_obj1, dir_obj2], zs=[z], survey=survey)
+
+
+def test_specstack_decompose_identical_to_single(stack1):
+	st = stack1
+	st.decompose()
+
+	for i in range(3):
+		isin = ~st.flux.mask[i]
+		spec = st.flux.data[i, isin].astype('float')
+		ws = st.ws[isin]
+
+		selcon, speccont, specline, __, __ = getconti.decompose_cont_line_t2AGN(spec, ws, z, method='running_median')
+
+		assert np.array_equal(st.selcon.data[i, isin], selcon)
+		assert np.array_equal(st.speccont.data[i, isin], speccont)
+		assert np.array_equal(st.specline.data[i, isin], specline)
+
+
+def test_specstack_make_spec_table(stack1):
+	st = stack1
+	lines = ['Hb', 'OIII4960', 'OIII5008']
+
+	tab = st.make_spec_table(lines=lines)
+
+	assert len(tab) == 3
+	assert list(tab['dir_obj']) == [dir_obj1, dir_obj2, dir_obj3]
+
+	for component in ['', 'cont', 'line']:
+		for band in st.bands:
+			for quantity in ['Mag', 'Fnu']:
+				col = 'spec{}{}_{}'.format(component, quantity, band)
+				assert col in tab.colnames
+				assert tab[col][0] == tab[col][1]
+
+	# band i is fully covered by the sliced spectrum
+	assert np.isclose(tab['specFnu_i'][2], tab['specFnu_i'][0], rtol=1.e-10)
+
+	for line in lines:
+		assert tab['f_'+line][0] == tab['f_'+line][1]
+		assert np.isclose(tab['f_'+line][2], tab['f_'+line][0], rtol=1.e-10)
+		assert tab['ferr_'+line][0] > 0.
+
+	assert tab['f_OIII5008'][0] > tab['f_OIII4960'][0] > tab['f_Hb'][0] > 0.
+
+
+def test_specstack_make_spec_table_chunks(stack1):
+	st = stack1
+	lines = ['Hb', 'OIII5008']
+
+	tab = st.make_spec_table(lines=lines)
+	assert st.specline is None
+
+	st_chunked = specstack.SpecStack(dirs_obj=[dir_obj1, dir_obj2, dir_obj3], zs=[z, z, z], survey=survey, chunksize=2)
+	st_chunked.decompose()
+	tab_chunked = st_chunked.make_spec_table(lines=lines)
+
+	for col in tab.colnames[2:]:
+		assert np.allclose(tab_chunked[col], tab[col], rtol=1.e-14, atol=0.)
+
+
+def test_specstack_identical_to_spector(stack1):
+	st = stack1
+	lines = ['Hb', 'OIII5008']
+
+	tab = st.make_spec_table(lines=lines)
+
+	for i in [0, 2]:
+		s = spector.Spector(dir_obj=st.dirs_obj[i], z=z, survey_spec='boss', survey=survey, decompose_method='running_median')
+
+		for component in ['all', 'cont', 'line']:
+			Fnu = s._calc_Fnu_in_bands(component=component).to(u.nanomaggy).value
+
+			for band, fnu in zip(st.bands, Fnu):
+				col = specstack.get_specmag_colname(band, component=component, fluxquantity='fnu')
+				assert np.isclose(tab[col][i], fnu, rtol=1.e-10, atol=0.)
+
+		fs, ferrs = s._calc_line_fluxes(lines=lines)
+		for line, f, ferr in zip(lines, fs, ferrs):
+			assert np.isclose(tab['f_'+line][i], f, rtol=1.e-10, atol=0.)
+			assert np.isclose(tab['ferr_'+line][i], ferr, rtol=1.e-10, atol=0.)
+
+		os.remove(st.dirs_obj[i]+'spec_decomposed.fits')
+
+
+def test_specstack_write_spec_decomposed(stack1):
+	st = stack1
+
+	status = st.write_spec_decomposed(2, overwrite=True)
+	assert status
+
+	fn = dir_obj3+'spec_decomposed.fits'
+	tab = at.Table.read(fn)
+
+	assert tab.colnames == ['ws', 'spec', 'speccont', 'specline', 'iscon']
+	assert len(tab) == np.sum(~st.flux.mask[2])
+	assert np.array_equal(tab['specline'], st.specline.data[2, ~st.flux.mask[2]])
@@ -97,6 +97,25 @@ def test_spector_init_error_no_survey(obj_dirobj):
 
 
 
+def test_spector_make_spec_decomposed(spector1):
+	s = spector1
+	s.make_spec_decomposed(overwrite=True)
+
+	fn = s.dir_obj+'spec_decomposed.fits'
+	assert os.path.isfile(fn)
+
+	tab = at.Table.read(fn, format='fits')
+	assert tab['spec'].unit == u.Unit("1e-17 erg / (Angstrom cm2 s)")
+	assert tab['ws'].unit == u.AA
+
+	# the table is kept in memory
+	spec, ws = s.get_spec_ws_from_spectab(component='line')
+	spec2, ws2 = s.get_spec_ws_from_spectab(component='line')
+
+	assert spec2 is spec
+	assert np.all(spec == tab['specline'])
+
+
 def test_spector_make_spec_decomposed_ecsv(spector1):
 	s = spector1
 	s.make_spec_decomposed_ecsv(overwrite=True)
@@ -162,6 +181,36 @@ def test_spector_calc_Fnu_in_band(obj_dirobj):
 		assert np.absolute(mAB.value - fiber2mag) < 1.
 
 
+def test_spector_calc_Fnu_in_bands(obj_dirobj):
+	s = spector.Spector(obj=obj_dirobj, survey_spec='boss', survey='hsc', z=z, decompose_method='running_median')
+
+	Fnus = s._calc_Fnu_in_bands(component='all')
+	assert Fnus.shape == (len(s.bands), )
+
+	for band, Fnu in zip(s.bands, Fnus):
+		assert np.isclose(Fnu.to_value(u.nanomaggy), s._calc_Fnu_in_band(band=band, component='all').to_value(u.nanomaggy), rtol=1.e-10, atol=0.)
+
+
+def test_spector_make_spec_mag_failures_reported(obj_dirobj):
+	s = spector.Spector(obj=obj_dirobj, survey_spec='boss', survey='hsc', z=z, decompose_method='running_median')
+
+	def calc_Fnu_in_bands(component='all'):
+		if component == 'contextrp':
+			raise IOError("no contextrp")
+		return spector.Spector._calc_Fnu_in_bands(s, component=component)
+
+	s._calc_Fnu_in_bands = calc_Fnu_in_bands
+	s.make_spec_mag(overwrite=True)
+
+	tab = at.Table.read(s.fp_spec_mag, comment='#', format='ascii.csv')
+
+	for band in s.bands:
+		assert 'specMag_{0}'.format(band) in tab.colnames
+		assert 'speclineFnu_{0}'.format(band) in tab.colnames
+		assert 'speccontextrpFnu_{0}'.format(band) not in tab.colnames
+		assert "failed: contextrp {} OSError: no contextrp".format(band) in tab.meta['comments']
+
+
 def test_spector_make_spec_mag(spector1): 
 	s = spector1
 	s.make_spec_mag(overwrite=True)
@@ -354,3 +403,139 @@ def test_spector_calc_fline_over_fnuband(spector1):
 		r = s.calc_fline_over_fnuband(band='i', line='Ha')
 
 
+
+
+def test_spector_list_lines_in_band_edges():
+	""" lines are in band if their redshifted wavelengths are strictly within the filter boundaries """
+	from ... import filters
+
+	dir_obj_nospec = './testing/SDSSJ0920+0034_nospec/'
+	if not os.path.isdir(dir_obj_nospec):
+		os.makedirs(dir_obj_nospec)
+
+	obj = obsObj(ra=ra, dec=dec, dir_obj=dir_obj_nospec)
+	s = spector.Spector(obj=obj, survey='hsc', survey_spec='boss')
+
+	l_OIII = filters.getllambda(ion='OIII5008')[0]
+
+	for band, threshold in [('r', 0.01), ('i', 0.2), ('z', 0.6)]:
+		w1, w2 = filters.filtertools.getFilterBoundaries(threshold=threshold, band=band, survey='hsc', withunit=False)
+
+		for w, isin in [(w1-0.01, False), (w1+0.01, True), (w2-0.01, True), (w2+0.01, False)]:
+			s.z = w/l_OIII - 1.
+			assert ('OIII5008' in s._list_stronglines_in_band(band=band, threshold=threshold)) == isin
+
+
+def test_spector_init_lazy():
+	""" spectrum and sdss xid are not read at init, but on first use """
+	dir_obj_nospec = './testing/SDSSJ0920+0034_nospec/'
+	if not os.path.isdir(dir_obj_nospec):
+		os.makedirs(dir_obj_nospec)
+
+	obj = obsObj(ra=ra, dec=dec, dir_obj=dir_obj_nospec)
+	s = spector.Spector(obj=obj, survey='hsc', survey_spec='boss')
+
+	assert s._spec_ws is None
+	assert s._z is None
+	assert not os.path.isfile(dir_obj_nospec+'xid.csv')
+
+	s.z = z
+	assert s.z == z
+
+	with pytest.raises(IOError):
+		s.spec
+
+
+def test_spector_spec_ws(spector1):
+	s = spector1
+
+	assert s._spec_ws is None
+	assert len(s.spec) == len(s.ws)
+	assert s._spec_ws is not None
+
+
+def test_spector_make_lineflux_mc(obj_dirobj):
+	s = spector.Spector(obj=obj_dirobj, survey_spec='boss', survey='hsc', z=z, decompose_method='running_median')
+	lines = ['Hb', 'OIII4960', 'OIII5008']
+
+	s.make_lineflux(lines=lines, overwrite=True)
+	tab_analytic = at.Table.read(s.fp_spec_lineflux, comment='#', format='ascii.csv')
+
+	s.make_lineflux(lines=lines, overwrite=True, ferr_method='mc', nreal=200, seed=0)
+	tab = at.Table.read(s.fp_spec_lineflux, comment='#', format='ascii.csv')
+
+	for line in lines:
+		assert tab['f_'+line][0] == tab_analytic['f_'+line][0]
+		assert tab['ferr_'+line][0] > 0.
+		assert tab['f_{}_p16'.format(line)][0] < tab['f_{}_p50'.format(line)][0] < tab['f_{}_p84'.format(line)][0]
+
+	assert "ferr_method: mc nreal=200" in tab.meta['comments']
+
+	with pytest.raises(Exception):
+		s.make_lineflux(lines=lines, overwrite=True, ferr_method='bootstrap')
+
+
+def test_spector_bc03fit_cached(monkeypatch):
+	from .. import bc03cache
+	from .test_bc03cache import StubModelBC03
+
+	monkeypatch.setattr(bc03cache.modelBC03, 'modelBC03', StubModelBC03, raising=False)
+	monkeypatch.setattr(bc03cache, '_worker_models', {})
+
+	# count the fits
+	nfits = []
+	fit = bc03cache._fit
+	monkeypatch.setattr(bc03cache, '_fit', lambda **kwargs: nfits.append(1) or fit(**kwargs))
+
+	dir_obj_bc03 = dir_parent+'SDSSJ0920+0034_bc03/'
+	os.makedirs(dir_obj_bc03)
+	shutil.copyfile(dir_verif+'spec.fits', dir_obj_bc03+'spec.fits')
+
+	s = spector.Spector(dir_obj=dir_obj_bc03, z=z, survey_spec='boss', survey=survey, decompose_method='modelBC03')
+	s.make_spec_decomposed()
+	assert isinstance(s.conti_model, bc03cache.BC03Fit)
+	assert len(nfits) == 1
+
+	# the decomposition fit is of the line masked spectrum
+	task = s.get_bc03fit_task()
+	assert len(task['spec']) < len(s.spec)
+	ws_bestfit, bestfit, predict, m = bc03cache.get_bestfit(**task)
+	assert m is None
+	assert np.array_equal(s.get_spec_ws_from_spectab(component='cont')[0], predict)
+
+	# and is reused by contextrp and by new instances
+	s.make_spec_contextrp()
+	assert np.array_equal(s.get_spec_ws_from_spectab(component='contextrp')[0], bestfit)
+
+	s2 = spector.Spector(dir_obj=dir_obj_bc03, z=z, survey_spec='boss', survey=survey, decompose_method='modelBC03')
+	s2.make_spec_decomposed(overwrite=True)
+	s2.make_spec_contextrp(overwrite=True)
+	assert s2.conti_model is None
+	assert len(nfits) == 1
+
+	s2.make_spec_contextrp(overwrite=True, refit=True)
+	assert len(nfits) == 2
+
+
+def test_spector_get_line_flux_sdss_no_spzline():
+	""" spec.fits made from spPlate by speclocal has no spZline extension """
+	from astropy.io import fits
+	from ...obsobj.sdss import sdssSpec
+
+	dir_obj_spplate = dir_parent+'SDSSJ0920+0034_spplate/'
+	os.makedirs(dir_obj_spplate)
+	with fits.open(dir_verif+'spec.fits') as hdus:
+		fits.HDUList([hdus[0].copy(), hdus[1].copy()]).writeto(dir_obj_spplate+'spec.fits')
+
+	class sdssSpecLocal(object):
+		def get_spec(self):
+			return sdssSpec(dir_obj_spplate+'spec.fits').hdus
+
+	obj = obsObj(ra=ra, dec=dec, dir_obj=dir_obj_spplate)
+	obj.sdss = sdssSpecLocal()
+	s = spector.Spector(obj=obj, survey='hsc', survey_spec='boss', z=z)
+
+	with pytest.raises(Exception) as excinfo:
+		s._get_line_flux_sdss(line='OIII5008')
+	assert 'spZline' in str(excinfo.value)
+